@@ -1,14 +1,31 @@
-from typing import Literal
+import importlib
+import math
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Literal, cast
 
 from pympler.asizeof import asizeof  # type: ignore
 from typing_extensions import TypeAlias
 
-from zbitvector import Constraint, Int, Uint
+from zbitvector import Array, Constraint, Int, Options, Solver, Symbolic, Uint, stats
 
 # pyright: reportUnusedExpression=false
 
 Uint64: TypeAlias = Uint[Literal[64]]
 Int64: TypeAlias = Int[Literal[64]]
+Uint8: TypeAlias = Uint[Literal[8]]
+Uint16: TypeAlias = Uint[Literal[16]]
+Uint32: TypeAlias = Uint[Literal[32]]
+
+
+def _needs_solver(*params: Any) -> None:
+    # The concrete backend's solver only handles small searches, so it can't
+    # decide the realistic queries in benchmarks that use this as their setup.
+    if os.getenv("ZBITVECTOR_SOLVER", "bitwuzla").lower() == "concrete":
+        raise NotImplementedError  # skipped by asv
 
 
 class TimeConstraintSuite:
@@ -28,6 +45,9 @@ class TimeConstraintSuite:
             Constraint(False) ^ Constraint(False)
             Constraint(True).ite(Constraint(False), Constraint(True))
 
+    def time_all(self):
+        Constraint.all(Uint64("ALL") != Uint64(i) for i in range(1000))
+
 
 class TimeUintSuite:
     def track_size(self):
@@ -79,3 +99,754 @@ class IntSuite:
             Int64(13 * i) * Int64(17 * i)
             Int64(19 * i) / Int64(i + 6)
             Int64(23 * i) % Int64(i + 16)
+
+
+class ArraySuite:
+    def time_concrete_stores(self):
+        A = Array[Uint64, Uint8](Uint8(0))
+        for i in range(500):
+            A[Uint64(i % 100)] = Uint8(i)
+            A[Uint64((7 * i) % 100)]
+
+    def time_symbolic_store(self):
+        A = Array[Uint64, Uint8](Uint8(0))
+        for i in range(200):
+            A[Uint64(i)] = Uint8(i)
+        A[Uint64("ARRAYX")] = Uint8(0)
+        for i in range(200):
+            A[Uint64(i)] = Uint8(i)
+            A[Uint64(i)]
+
+
+class SelectSuite:
+    # Compares a linear chain of if-then-elses against `select()`'s balanced
+    # tree, for a jump table of 1024 entries.
+    def setup(self):
+        self.table = [Uint16((i * 40503) & 0xFFFF) for i in range(1024)]
+
+    def _linear(self, index: Uint16) -> Uint16:
+        result = Uint16(0)
+        for i in reversed(range(len(self.table))):
+            result = (index == Uint16(i)).ite(self.table[i], result)
+        return result
+
+    def _solve(self, result: Uint16, index: Uint16):
+        s = Solver()
+        s.add(result * Uint16(3) > index * Uint16(5) + Uint16(7))
+        s.add(index < Uint16(len(self.table)))
+        s.check()
+
+    def time_build_linear(self):
+        self._linear(Uint16("SELECTX"))
+
+    def time_build_balanced(self):
+        Uint16.select(Uint16("SELECTX"), self.table)
+
+    def time_solve_linear(self):
+        index = Uint16("SELECTX")
+        self._solve(self._linear(index), index)
+
+    time_solve_linear.setup = _needs_solver  # pyright: ignore[reportFunctionMemberAccess]
+
+    def time_solve_balanced(self):
+        index = Uint16("SELECTX")
+        self._solve(Uint16.select(index, self.table), index)
+
+
+class SubstituteSuite:
+    # Specializes one input of a symbolic computation, either by substituting
+    # into the expressions or by re-running the computation from scratch.
+    def setup(self):
+        self.outputs = self._compute(Uint64("SUBSTX"), Uint64("SUBSTY"))
+
+    def _compute(self, x: Uint64, y: Uint64) -> List[Uint64]:
+        outputs: List[Uint64] = []
+        for i in range(30):
+            x = (x ^ (y << Uint64(i % 64))) * Uint64(0x9E3779B97F4A7C15)
+            y = y + (x >> Uint64(7))
+            outputs.append(x | y)
+        return outputs
+
+    def time_rebuild(self):
+        for i in range(20):
+            self._compute(Uint64("SUBSTX"), Uint64(i))
+
+    def time_substitute(self):
+        for i in range(20):
+            Symbolic.substitute_many(self.outputs, {"SUBSTY": Uint64(i)})
+
+
+class OptimizeSuite:
+    # Finds the smallest feasible value, either with `minimize()` or with a
+    # loop that asks the solver for any smaller value until there is none.
+    def setup(self):
+        _needs_solver()
+        self.x, self.y = Uint32("OPTIMIZEX"), Uint32("OPTIMIZEY")
+        self.solver = Solver()
+        self.solver.add((self.x * Uint32(0x9E3779B1)) ^ self.y > Uint32(0x7F4A7C15))
+        self.solver.add(self.y + self.x < Uint32(0xDEADBEEF))
+        self.solver.add(self.x * self.x > Uint32(0xDEADBEEF))
+
+    def time_minimize(self):
+        self.solver.minimize(self.x)
+
+    def time_minimize_naive(self):
+        best = None
+        while self.solver.check(*([] if best is None else [self.x < best])):
+            best = Uint32(self.solver.evaluate(self.x))
+
+
+class IterModelsSuite:
+    # Enumerates solutions to a small constraint system, either with
+    # `iter_models()` or by passing every blocking constraint found so far as
+    # an assumption to `check()`.
+    def setup(self):
+        _needs_solver()
+        self.x, self.y = Uint16("ITERMODELSX"), Uint16("ITERMODELSY")
+        self.solver = Solver()
+        self.solver.add(self.x * self.y == Uint16(0x1000))
+        self.solver.add(self.x < self.y)
+
+    def time_iter_models(self):
+        for _ in self.solver.iter_models([self.x, self.y], limit=100):
+            pass
+
+    def time_iter_models_naive(self):
+        blocks: List[Constraint] = []
+        while len(blocks) < 100 and self.solver.check(*blocks):
+            x, y = self.solver.evaluate(self.x), self.solver.evaluate(self.y)
+            blocks.append((self.x != Uint16(x)) | (self.y != Uint16(y)))
+
+
+class FailedAssumptionsSuite:
+    # Finds which of a set of branch conditions conflict, either from a single
+    # unsatisfiable check or by dropping conditions one at a time.
+    def setup(self):
+        _needs_solver()
+        self.x = Uint32("FAILEDX")
+        self.solver = Solver()
+        self.solver.add(self.x * Uint32(0x9E3779B1) > Uint32(0x7F4A7C15))
+        self.conditions = [self.x != Uint32(i * 0x01000193) for i in range(63)]
+        self.conditions.insert(40, self.x & Uint32(0xFF) == Uint32(0x17))
+        self.conditions.insert(50, self.x & Uint32(0x0F) == Uint32(0x03))
+
+    def time_failed_assumptions(self):
+        assert not self.solver.check(*self.conditions)
+        self.solver.failed_assumptions()
+
+    def time_failed_assumptions_naive(self):
+        core, i = list(self.conditions), 0
+        while i < len(core):
+            rest = core[:i] + core[i + 1 :]
+            if self.solver.check(*rest):
+                i += 1
+            else:
+                core = rest
+
+
+class InterleavedSuite:
+    # Checks several solvers in turn, then reads values back from each one,
+    # either directly or by checking each solver again first.
+    def setup(self):
+        _needs_solver()
+        self.x = Uint32("INTERLEAVEDX")
+        self.solvers: List[Solver] = []
+        for i in range(16):
+            s = Solver()
+            s.add((self.x * Uint32(0x9E3779B1)) >> Uint32(16) == Uint32(i * 0x0123))
+            self.solvers.append(s)
+
+    def time_interleaved(self):
+        for s in self.solvers:
+            s.check()
+        for s in self.solvers:
+            s.evaluate(self.x)
+
+    def time_interleaved_recheck(self):
+        for s in self.solvers:
+            s.check()
+        for s in self.solvers:
+            s.check()
+            s.evaluate(self.x)
+
+
+class RevealSuite:
+    # Reveals concrete values in between unsatisfiable checks, like a symbolic
+    # executor that tests for concrete values after pruning each branch.
+    def setup(self):
+        x = Uint64("REVEALX")
+        self.solver = Solver()
+        self.solver.add(x * x == Uint64(3))
+        self.values = [Uint64(i * 0x9E3779B97F4A7C15 % (1 << 64)) for i in range(64)]
+
+    def time_reveal(self):
+        for v in self.values:
+            self.solver.check(Constraint(False))
+            v.reveal()
+
+
+class StatsSuite:
+    # Runs many small checks, with and without native solver statistics.
+    def setup(self):
+        _needs_solver()
+        self.x = Uint64("STATSX")
+        self.solver = Solver()
+        self.solver.add(self.x * self.x != Uint64(0))
+        self.values = [Uint64(i) for i in range(64)]
+
+    def time_check(self):
+        for v in self.values:
+            self.solver.check(self.x == v)
+
+    def time_check_native(self):
+        with stats.scope(native=True):
+            for v in self.values:
+                self.solver.check(self.x == v)
+
+
+Uint256: TypeAlias = Uint[Literal[256]]
+Uint512: TypeAlias = Uint[Literal[512]]
+Int32: TypeAlias = Int[Literal[32]]
+
+
+class IncrementalCheckSuite:
+    # Grows a path condition one branch at a time, checking that each branch
+    # is feasible before taking it, like a symbolic executor following a path.
+    def setup(self):
+        x, y = Uint32("PATHX"), Uint32("PATHY")
+        self.branches = [
+            ((x + Uint32(i)) ^ (y >> Uint32(i % 24)))
+            != Uint32(i * 0x9E3779B1 % (1 << 32))
+            for i in range(50)
+        ]
+
+    def time_check_incremental(self):
+        s = Solver()
+        for branch in self.branches:
+            s.add(branch)
+            s.check()
+
+    def time_check_both_sides(self):
+        s = Solver()
+        for branch in self.branches:
+            s.check(~branch)
+            s.add(branch)
+            s.check()
+
+    time_check_both_sides.setup = _needs_solver  # pyright: ignore[reportFunctionMemberAccess]
+
+
+class EvaluateSuite:
+    # Reads many values out of a single model.
+    def setup(self):
+        self.vars = [Uint64(f"EVALX{i}") for i in range(100)]
+        self.exprs = [
+            a * b + (a >> Uint64(3)) for a, b in zip(self.vars, self.vars[1:])
+        ]
+        self.solver = Solver()
+        for i, (a, b) in enumerate(zip(self.vars, self.vars[1:])):
+            self.solver.add(a + b != Uint64(i + 1))
+        assert self.solver.check()
+
+    def time_evaluate_constants(self):
+        for v in self.vars:
+            self.solver.evaluate(v)
+
+    def time_evaluate_expressions(self):
+        for e in self.exprs:
+            self.solver.evaluate(e)
+
+
+class ArrayChainSuite:
+    # Builds and queries arrays whose stores are all at symbolic addresses, so
+    # that no store can be skipped over when reading.
+    def setup(self):
+        self.base = Uint32("CHAINBASE")
+        self.chain = self._store(200)
+
+    def _store(self, n: int) -> "Array[Uint32, Uint8]":
+        A = Array[Uint32, Uint8](Uint8(0))
+        for i in range(n):
+            A[self.base + Uint32(i * 4)] = Uint8(i)
+        return A
+
+    def time_store_chain(self):
+        self._store(200)
+
+    def time_select_chain(self):
+        for i in range(50):
+            self.chain[self.base + Uint32(i * 3)]
+
+    def time_solve_chain(self):
+        s = Solver()
+        s.check(self.chain[self.base + Uint32(0x40)] == Uint8(16))
+
+
+class IntoSuite:
+    # Converts between widths, in both directions, with and without sign
+    # extension.
+    def setup(self):
+        self.symbolic = [Uint32(f"INTOX{i}") for i in range(50)]
+        self.concrete = [Uint32(i * 0x9E3779B1 % (1 << 32)) for i in range(50)]
+
+    def _convert(self, values: List[Uint32]):
+        for v in values:
+            v.into(Uint64)
+            v.into(Uint8)
+            v.into(Int32).into(Int64)
+
+    def time_into_symbolic(self):
+        self._convert(self.symbolic)
+
+    def time_into_concrete(self):
+        self._convert(self.concrete)
+
+
+class ReprSuite:
+    # Renders a large expression, with no shared subterms.
+    def setup(self):
+        x = Uint64("REPRX")
+        for i in range(100):
+            x = (x ^ Uint64(f"REPRY{i}")) * Uint64(2 * i + 3)
+        self.expr = x
+
+    def time_repr(self):
+        repr(self.expr)
+
+
+class WideSuite:
+    # Works with bitvectors wider than a machine word.
+    def setup(self):
+        self.x256, self.y256 = Uint256("WIDEX256"), Uint256("WIDEY256")
+        self.x512, self.y512 = Uint512("WIDEX512"), Uint512("WIDEY512")
+
+    def time_create(self):
+        for i in range(200):
+            Uint256((1 << 255) - i)
+            Uint512((1 << 511) - i)
+
+    def time_arithmetic_256(self):
+        x, y = self.x256, self.y256
+        for i in range(50):
+            x = (x * Uint256(i + 3) + y) ^ (y >> Uint256(i))
+
+    def time_arithmetic_512(self):
+        x, y = self.x512, self.y512
+        for i in range(50):
+            x = (x * Uint512(i + 3) + y) ^ (y >> Uint512(i))
+
+    def time_solve_256(self):
+        s = Solver()
+        s.add(self.x256 * Uint256(3) + self.y256 == Uint256((1 << 255) + 7))
+        s.check(self.y256 < Uint256(1 << 128))
+
+    time_solve_256.setup = _needs_solver  # pyright: ignore[reportFunctionMemberAccess]
+
+    def time_solve_512(self):
+        s = Solver()
+        s.add(self.x512 * Uint512(3) + self.y512 == Uint512((1 << 511) + 7))
+        s.check(self.y512 < Uint512(1 << 256))
+
+    time_solve_512.setup = _needs_solver  # pyright: ignore[reportFunctionMemberAccess]
+
+
+class SymbolicExecutionSuite:
+    # A synthetic symbolic execution of a small register machine: arithmetic
+    # on symbolic registers, conversions, loads and stores to symbolic memory,
+    # and a feasibility check at every branch. Reads the final state back
+    # from the model, and renders it.
+    def setup(self):
+        _needs_solver()
+
+    def time_execute(self):
+        mem = Array[Uint32, Uint8](Uint8(0))
+        regs = [Uint32(f"SYMEXR{i}") for i in range(4)]
+        solver = Solver()
+        for pc in range(60):
+            a, b = regs[pc % 4], regs[(pc + 1) % 4]
+            op = pc % 5
+            if op == 0:
+                regs[pc % 4] = a + (b << Uint32(pc % 3)) + Uint32(pc)
+            elif op == 1:
+                mem[b & Uint32(0xFF)] = a.into(Uint8)
+            elif op == 2:
+                regs[pc % 4] = mem[a & Uint32(0xFF)].into(Uint32) ^ b
+            elif op == 3:
+                regs[pc % 4] = (a.into(Int32) >> Uint32(pc % 8)).into(Uint32)
+            else:
+                branch = a < b
+                if solver.check(branch):
+                    solver.add(branch)
+                else:
+                    solver.add(~branch)
+        solver.check()
+        for r in regs:
+            solver.evaluate(r)
+            repr(r)
+
+
+STATM = "/proc/self/statm"
+
+
+def _rss() -> int:
+    # The current resident set size, in bytes. Unlike `asizeof`, this includes
+    # the memory that the solver allocates natively.
+    with open(STATM) as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class MemorySoakSuite:
+    # Tracks how much resident memory grows over a long run of terms, checks
+    # and array updates. Results are scaled up from a shorter run, so that a
+    # regression in native memory use shows up as a change in bytes per
+    # million operations.
+    timeout = 600
+
+    def setup(self):
+        if not os.path.exists(STATM):
+            # Other platforms only report the peak, which can't show growth.
+            raise NotImplementedError  # skipped by asv
+
+    def track_rss_per_million_terms(self):
+        x, n = Uint64("SOAKX"), 200_000
+        start = _rss()
+        for i in range(n // 4):
+            y = x + Uint64(i)
+            y = y * Uint64(i | 1)
+            y = y ^ x
+            _ = y < x
+        return (_rss() - start) * 1_000_000 // n
+
+    track_rss_per_million_terms.unit = "bytes"  # pyright: ignore[reportFunctionMemberAccess]
+
+    def track_rss_per_million_checks(self):
+        x, n = Uint64("SOAKCHECKX"), 5_000
+        solver = Solver()
+        solver.add(x * x != Uint64(0))
+        values = [Uint64(i + 1) for i in range(64)]
+        start = _rss()
+        for i in range(n):
+            solver.check(x == values[i % 64])
+        return (_rss() - start) * 1_000_000 // n
+
+    track_rss_per_million_checks.unit = "bytes"  # pyright: ignore[reportFunctionMemberAccess]
+
+    def track_rss_per_array_chain(self):
+        base, n = Uint32("SOAKBASE"), 20
+        start = _rss()
+        for _ in range(n):
+            A = Array[Uint32, Uint8](Uint8(0))
+            for i in range(500):
+                A[base + Uint32(i * 4)] = Uint8(i)
+            A[base]
+        return (_rss() - start) // n
+
+    track_rss_per_array_chain.unit = "bytes"  # pyright: ignore[reportFunctionMemberAccess]
+
+
+def _per_call(*fns: Callable[[], Any], n: int = 5_000, repeat: int = 15) -> List[float]:
+    # Interleaves the functions so that drift over the run (e.g. as the
+    # solver's term table grows) affects them all alike.
+    best = [math.inf] * len(fns)
+    for _ in range(repeat):
+        for i, fn in enumerate(fns):
+            start = time.perf_counter()
+            for _ in range(n):
+                fn()
+            best[i] = min(best[i], time.perf_counter() - start)
+    return [t / n for t in best]
+
+
+class LayersSuite:
+    # Attributes the cost of building `a + b` to each layer it passes through:
+    # looking up the class with `Uint[Literal[64]]`, the solver's API
+    # (for Z3, through ctypes; for Bitwuzla, through the Cython bindings),
+    # constructing the Python object, the rest of `Symbolic._from_expr`, and
+    # the operator's own dispatch. Each layer is timed once, in setup_cache,
+    # and the track_ benchmarks report its share of the total. The concrete
+    # backend has no native layer, so it's skipped.
+    def _build(self) -> bool:
+        solver = os.getenv("ZBITVECTOR_SOLVER", "bitwuzla").lower()
+        # Typed as Any to reach into the backend's private attributes.
+        self.a: Any = Uint64("LAYERA")
+        self.b: Any = Uint64("LAYERB")
+        self.cls: Any = Uint64
+        ta, tb = self.a._term, self.b._term
+        if solver == "z3":
+            backend: Any = importlib.import_module("zbitvector._z3")
+            z3, ctx = backend.z3, backend.CTX
+            self.kind: Any = z3.Z3_mk_bvadd
+            # The backend simplifies every term it builds, so count that too.
+            self.native: Callable[[], Any] = lambda: z3.Z3_simplify(
+                ctx, z3.Z3_mk_bvadd(ctx, ta, tb)
+            )
+        elif solver == "bitwuzla":
+            backend = importlib.import_module("zbitvector._bitwuzla")
+            bzla, kind = backend.BZLA, backend.Kind.BV_ADD
+            self.kind = kind
+            self.native = lambda: bzla.mk_term(kind, (ta, tb))
+        else:
+            return False
+        self.init: Callable[..., None] = backend.Symbolic.__init__
+        return True
+
+    def _construct(self, term: Any) -> Any:
+        result = self.cls.__new__(self.cls)
+        self.init(result, term)
+        return result
+
+    def _wrapper(self) -> Any:
+        return self.cls._from_expr(self.kind, self.a, self.b)
+
+    def _operator(self) -> Any:
+        return self.a + self.b
+
+    def setup_cache(self) -> Dict[str, float]:
+        if not self._build():
+            return {}
+        term = self.native()
+        lookup, native, construct, wrapper = _per_call(
+            lambda: Uint[Literal[64]],
+            self.native,
+            lambda: self._construct(term),
+            self._wrapper,
+        )
+        # The operator's own work is much smaller than the native call's
+        # jitter, so time it directly, with _from_expr stubbed out, rather
+        # than as the difference between two noisy measurements.
+        result = self._construct(term)
+
+        def stub(cls: Any, kind: Any, *syms: Any) -> Any:
+            return result
+
+        self.cls._from_expr = classmethod(stub)
+        try:
+            (dispatch,) = _per_call(self._operator)
+        finally:
+            del self.cls._from_expr
+        parts = {
+            "class_lookup": lookup,
+            "native": native,
+            "construct": construct,
+            # Can come out slightly negative when it's within the noise.
+            "from_expr": max(wrapper - native - construct, 0),
+            "dispatch": dispatch,
+        }
+        total = sum(parts.values())
+        return {layer: 100 * t / total for layer, t in parts.items()}
+
+    def setup(self, shares: Dict[str, float]):
+        if not shares:
+            raise NotImplementedError  # skipped by asv
+        self._build()
+
+    def time_class_lookup(self, shares: Dict[str, float]):
+        for _ in range(1000):
+            Uint[Literal[64]]
+
+    def time_native(self, shares: Dict[str, float]):
+        for _ in range(1000):
+            self.native()
+
+    def time_wrapper(self, shares: Dict[str, float]):
+        for _ in range(1000):
+            self._wrapper()
+
+    def time_operator(self, shares: Dict[str, float]):
+        for _ in range(1000):
+            self._operator()
+
+    def track_class_lookup_percent(self, shares: Dict[str, float]):
+        return shares["class_lookup"]
+
+    track_class_lookup_percent.unit = "%"  # pyright: ignore[reportFunctionMemberAccess]
+
+    def track_native_percent(self, shares: Dict[str, float]):
+        return shares["native"]
+
+    track_native_percent.unit = "%"  # pyright: ignore[reportFunctionMemberAccess]
+
+    def track_construct_percent(self, shares: Dict[str, float]):
+        return shares["construct"]
+
+    track_construct_percent.unit = "%"  # pyright: ignore[reportFunctionMemberAccess]
+
+    def track_wrapper_percent(self, shares: Dict[str, float]):
+        return shares["from_expr"]
+
+    track_wrapper_percent.unit = "%"  # pyright: ignore[reportFunctionMemberAccess]
+
+    def track_operator_percent(self, shares: Dict[str, float]):
+        return shares["dispatch"]
+
+    track_operator_percent.unit = "%"  # pyright: ignore[reportFunctionMemberAccess]
+
+
+class ImportSuite:
+    # Measures startup in a fresh interpreter: importing the package, which
+    # defers loading the backend, and then using it for the first time. The
+    # budget for track_first_use is enforced by test_import_budget.
+    def timeraw_import(self):
+        return "import zbitvector"
+
+    def timeraw_first_use(self):
+        return "import zbitvector; zbitvector.Uint"
+
+    def track_first_use(self):
+        code = (
+            "import time; start = time.perf_counter(); import zbitvector; "
+            "zbitvector.Uint; print(time.perf_counter() - start)"
+        )
+        return min(
+            float(subprocess.check_output([sys.executable, "-c", code], text=True))
+            for _ in range(5)
+        )
+
+    track_first_use.unit = "seconds"  # pyright: ignore[reportFunctionMemberAccess]
+
+
+class ParameterizeSuite:
+    # Looks up parameterized classes inline, like generic code that works with
+    # widths only known at runtime.
+    def setup(self):
+        self.widths = [8, 16, 32, 64] * 250
+        self.literals = [cast(Any, Literal)[w] for w in self.widths]
+
+    def time_literal(self):
+        uint: Any = Uint
+        for n in self.literals:
+            uint[n]
+
+    def time_literal_inline(self):
+        uint: Any = Uint
+        for w in self.widths:
+            uint[cast(Any, Literal)[w]]
+
+    def time_of_width(self):
+        for w in self.widths:
+            Uint.of_width(w)
+
+    def time_array(self):
+        for _ in range(1000):
+            Array[Uint64, Uint8]
+
+
+# Option presets compared by TuningSuite, for each backend that has options.
+PRESETS: Dict[str, Dict[str, Options]] = {
+    "bitwuzla": {
+        "default": {},
+        "preprop": {"fun_preprop": True},
+        "presls": {"fun_presls": True},
+        "ackermann": {"pp_ackermann": True},
+        "skeleton": {"pp_skeleton_preproc": True},
+        "no_var_subst": {"pp_var_subst": False},
+        "no_eliminate_extracts": {"pp_eliminate_extracts": False},
+    },
+    "z3": {
+        "default": {},
+        "all": {"logic": "ALL"},
+        "qf_bv": {"logic": "QF_BV"},
+        "qf_abv": {"logic": "QF_ABV"},
+        "bit_blast": {"tactic": "simplify; bit-blast; sat"},
+        "solve_eqs": {"tactic": "simplify; solve-eqs; bit-blast; sat"},
+    },
+}
+
+
+def _presets() -> Dict[str, Options]:
+    return PRESETS.get(os.getenv("ZBITVECTOR_SOLVER", "bitwuzla").lower(), {})
+
+
+def _corpus() -> List[List[Constraint]]:
+    # A small mix of queries: factoring, shift arithmetic, array chains and
+    # a lookup table, each solved from scratch.
+    x, y = Uint32("TUNEX"), Uint32("TUNEY")
+    factor = [
+        x * y == Uint32(65521 * 65519),
+        x > Uint32(1),
+        y > Uint32(1),
+        x < Uint32(1 << 16),
+        y < Uint32(1 << 16),
+    ]
+    z = x
+    for i in range(32):
+        z = (z ^ (z << Uint32(3))) + Uint32(i * 0x9E3779B9 & 0xFFFFFFFF)
+    shifts = [z == Uint32(0xDEADBEEF)]
+    a = Array[Uint32, Uint32](Uint32(0))
+    for i in range(64):
+        a[x + Uint32(i)] = a[y + Uint32(i)] + Uint32(i)
+    chain = [a[x] == Uint32(2016), x != y]
+    k = Uint8("TUNEK")
+    table = Uint32(0)
+    for i in range(256):
+        table = (k == Uint8(i)).ite(Uint32(i * 2654435761 & 0xFFFFFFFF), table)
+    lookup = [table == Uint32(0x81AF14C1)]
+    return [factor, shifts, chain, lookup]
+
+
+def _tune(preset: str, incremental: bool = False) -> float:
+    # Solves the corpus with one preset, returning the total time in seconds.
+    # Incremental runs check after every assertion, rather than once at the
+    # end of each query.
+    corpus, options = _corpus(), _presets()[preset]
+    start = time.perf_counter()
+    for query in corpus:
+        s = Solver(options)
+        for c in query:
+            s.add(c)
+            if incremental:
+                s.check()
+        s.check()
+    return time.perf_counter() - start
+
+
+def _tune_subprocess(preset: str, incremental: bool = False) -> float:
+    # Each preset runs in a fresh process, since Bitwuzla may reject some
+    # option changes once terms exist.
+    root = Path(__file__).parent.parent
+    command = [sys.executable, "-m", "benchmarks.benchmarks", preset]
+    if incremental:
+        command.append("incremental")
+    return float(subprocess.check_output(command, cwd=root, text=True))
+
+
+class TuningSuite:
+    # Solves the query corpus with each option preset. Run this module directly
+    # to print the presets from fastest to slowest.
+    params = sorted({preset for presets in PRESETS.values() for preset in presets})
+    param_names = ["preset"]
+    timeout = 600
+
+    def setup(self, preset: str):
+        if preset not in _presets():
+            raise NotImplementedError  # the preset is for another backend
+
+    def track_corpus(self, preset: str):
+        return _tune_subprocess(preset)
+
+    track_corpus.unit = "seconds"  # pyright: ignore[reportFunctionMemberAccess]
+
+    def track_corpus_incremental(self, preset: str):
+        return _tune_subprocess(preset, incremental=True)
+
+    track_corpus_incremental.unit = "seconds"  # pyright: ignore[reportFunctionMemberAccess]
+
+    def track_speedup(self, preset: str):
+        return _tune_subprocess("default") / _tune_subprocess(preset)
+
+    track_speedup.unit = "x"  # pyright: ignore[reportFunctionMemberAccess]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(_tune(sys.argv[1], incremental="incremental" in sys.argv[2:]))
+    else:
+        times = {
+            preset: (_tune_subprocess(preset), _tune_subprocess(preset, True))
+            for preset in _presets()
+        }
+        print(f"{'preset':24} {'one-shot':>9} {'incremental':>12}")
+        for preset, (elapsed, incremental) in sorted(
+            times.items(), key=lambda item: item[1][0]
+        ):
+            print(f"{preset:24} {elapsed:8.3f}s {incremental:11.3f}s")
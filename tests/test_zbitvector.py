@@ -1,12 +1,36 @@
 from __future__ import annotations
 
+import copy
+import os
+import subprocess
+import sys
 from collections.abc import Hashable
-from typing import Any, Literal, TypeVar, Union
+from typing import Any, List, Literal, Tuple, TypeVar, Union
 
 import pytest
 
-from zbitvector import Array, Constraint, Int, Solver, Uint
-from zbitvector.conftest import Int8, Uint8, Uint64
+from zbitvector import (
+    Array,
+    Constraint,
+    Int,
+    Memory,
+    Solver,
+    Symbolic,
+    Uint,
+    concolic,
+    stats,
+    trace,
+)
+from zbitvector.conftest import (
+    Int8,
+    Int16,
+    Int32,
+    Int64,
+    Uint8,
+    Uint16,
+    Uint32,
+    Uint64,
+)
 
 
 def test_bitvector_validations():
@@ -38,6 +62,19 @@ def test_bitvector_validations():
     assert repr(Int8) == "<class 'zbitvector.Int8'>"
 
 
+def test_of_width():
+    assert Uint.of_width(8) is Uint8
+    assert Int.of_width(16) is Int16
+    assert Uint8.of_width(32) is Uint32
+    assert Uint[Literal[64]] is Uint64
+    assert Array[Uint8, Int16] is Array[Uint8, Int16]
+
+    with pytest.raises(TypeError, match="positive width"):
+        Uint.of_width(0)
+    with pytest.raises(TypeError, match="integer width"):
+        Int.of_width("8")  # type: ignore
+
+
 def test_array_validations():
     with pytest.raises(AttributeError, match="has no attribute '_sort'"):
         Array("A")
@@ -133,6 +170,42 @@ def test_hash():
         _ = {Array[Uint8, Uint8]("UHA"): 0}  # pyright: ignore[reportUnhashable]
 
 
+def test_reveal_literals():
+    assert Uint8(0xFF).reveal() == 0xFF
+    assert Int8(-1).reveal() == -1
+    assert Int64(-(1 << 63)).reveal() == -(1 << 63)
+    assert Constraint(True).reveal() is True
+    assert Constraint(False).reveal() is False
+    assert Uint8("RL").reveal() is None
+
+    # Bitwuzla prints literals in hex or binary, depending on the width
+    Uint1, Uint4, Int4 = Uint[Literal[1]], Uint[Literal[4]], Int[Literal[4]]
+    assert Uint1(1).reveal() == 1
+    assert Uint4(0xA).reveal() == 0xA
+    assert Int4(-6).reveal() == -6
+    assert Uint8(3).reveal() == 3
+    assert (Uint8(3) + Uint8(4)).reveal() == 7
+    assert Uint64(0x0123456789ABCDEF).reveal() == 0x0123456789ABCDEF
+    assert Int64(-2).reveal() == -2
+
+    # Decoding the literal agrees with the model, which Bitwuzla reports
+    # through `get_value_str()` instead, at every width up to 130
+    s = Solver()
+    assert s.check()
+    for width in range(1, 131):
+        cls = Uint8.of_width(width)
+        mask = (1 << width) - 1
+        for value in (0, 1, mask, 0xA5A5A5A5A5A5A5A5A5A5A5A5A5A5A5A5A5 & mask):
+            assert cls(value).reveal() == value
+            assert s.evaluate(cls(value)) == value
+
+    # Revealing a literal doesn't disturb the state of the last check
+    s = Solver()
+    assert not s.check(Constraint(False))
+    assert Uint8(1).reveal() == 1
+    assert len(s.failed_assumptions()) == 1
+
+
 def test_array_equality():
     A = Array[Uint8, Uint8]("EQA")
     B = Array[Uint8, Uint8]("EQB")
@@ -167,3 +240,707 @@ def test_solver_validations():
     with pytest.raises(ValueError, match="solver is not ready for model evaluation"):
         s.evaluate(Uint8("X"))
     assert t.evaluate(Uint8("X")) == 254
+
+
+def test_concolic():
+    assert Uint8("CCX").witness() is None
+
+    with concolic({"CCX": 200, "CCY": -3, "CCB": True}):
+        x = Uint8("CCX")
+        y = Int8("CCY")
+        assert x.witness() == 200
+        assert (x + Uint8(100)).witness() == 44
+        assert (x / Uint8(0)).witness() == 255
+        assert (y / Int8(2)).witness() == -1
+        assert (y % Int8(2)).witness() == -1
+        assert (y >> Uint8(1)).witness() == -2
+        assert y.into(Uint8).witness() == 253
+        assert y.into(Int64).witness() == -3
+        assert x.into(Int8).witness() == -56
+
+        c = x < Uint8(100)
+        assert c.witness() is False
+        assert (Constraint("CCB") & ~c).witness() is True
+        assert c.ite(x, Uint8(7)).witness() == 7
+
+        # Variables missing from the seed have no shadow value.
+        assert (x + Uint8("CCZ")).witness() is None
+
+    assert (x + Uint8(1)).witness() is None
+
+
+def test_concolic_arrays():
+    with concolic({"CAX": 3, "CAY": 7, "CAV": 0x42, "CAP": 0x100}):
+        x, y, v = Uint8("CAX"), Uint8("CAY"), Uint8("CAV")
+        A = Array[Uint8, Uint8](Uint8(0))
+        A[x] = v
+        A[Uint8(5)] = Uint8(9)
+        assert A[x].witness() == 0x42
+        assert A[y].witness() == 0
+        assert A[Uint8(5)].witness() == 9
+        assert A[x + Uint8(2)].witness() == 9
+
+        B = copy.copy(A)
+        B[y] = x
+        assert B[Uint8(7)].witness() == 3
+        assert A[Uint8(7)].witness() == 0
+
+        # Named arrays have no shadow value, and neither do stores of values
+        # without one.
+        assert Array[Uint8, Uint8]("CAA")[x].witness() is None
+        A[Uint8(6)] = Uint8("CAZ")
+        assert A[y].witness() is None
+
+        M = Memory(Array[Uint64, Uint8](Uint8(0)))
+        p = Uint64("CAP")
+        M.store(p, Uint32(0x11223344))
+        M.store(Uint64(0x102), v.into(Uint16))
+        assert M.load(p, Uint32).witness() == 0x00423344
+        assert M.load(Uint64(0x100), Uint16).witness() == 0x3344
+
+
+def test_memory():
+    with pytest.raises(TypeError, match="memory must be backed by an array of 8-bit"):
+        Memory(Array[Uint64, Uint64](Uint64(0)))
+
+    base = Array[Uint64, Uint8](Uint8(0))
+    M = Memory(base)
+    M.write(Uint64(0x10), bytes(range(1, 9)))
+    assert M.load(Uint64(0x10), Uint64).reveal() == 0x0807060504030201
+    assert M.load(Uint64(0x10), Uint32, byteorder="big").reveal() == 0x01020304
+    assert M.load(Uint64(0x20), Uint16).reveal() == 0
+    assert base[Uint64(0x10)].reveal() == 0  # backing array is copied
+
+    M.store(Uint64(0x11), Int8(-1).into(Int16))
+    assert M.load(Uint64(0x10), Int32).reveal() == 0x04FFFF01
+
+    # Stores wrap around the end of the address space.
+    M.write(Uint64(0xFFFFFFFFFFFFFFFF), b"\xaa\xbb")
+    assert M[Uint64(0)].reveal() == 0xBB
+
+    with pytest.raises(ValueError, match="width must be a multiple of 8"):
+        M.store(Uint64(0), Uint[Literal[12]](0))
+
+    # Symbolic bytes round-trip through concrete addresses.
+    X = Uint32("MEMX")
+    M.store(Uint64(0x40), X, byteorder="big")
+    s = Solver()
+    s.add(X == Uint32(0x11223344))
+    assert s.check() is True
+    assert s.evaluate(M.load(Uint64(0x40), Uint32, byteorder="big")) == 0x11223344
+    assert s.evaluate(M[Uint64(0x43)]) == 0x44
+
+    # Symbolic addresses see earlier concrete writes, and vice versa.
+    A = Uint64("MEMA")
+    N = M.__copy__()
+    N.store(A, Uint16(0xCAFE))
+    s = Solver()
+    s.add(A == Uint64(0x12))
+    assert s.check() is True
+    assert s.evaluate(N.load(Uint64(0x10), Uint32)) == 0xCAFEFF01
+    assert s.evaluate(M.load(A, Uint16)) == 0x04FF
+    assert M.load(Uint64(0x12), Uint8).reveal() == 0xFF
+
+
+def test_array_stores():
+    A = Array[Uint8, Uint8](Uint8(0))
+    A[Uint8(1)] = Uint8(5)
+    A[Uint8(1)] = Uint8(6)
+    A[Uint8(2)] = Uint8(7)
+    assert A[Uint8(1)].reveal() == 6
+    assert A[Uint8(3)].reveal() == 0
+
+    # A store to a symbolic key may alias earlier and later concrete stores.
+    X = Uint8("ASX")
+    A[X] = Uint8(8)
+    A[Uint8(2)] = Uint8(9)
+    s = Solver()
+    assert s.check(X == Uint8(1)) is True
+    assert s.evaluate(A[Uint8(1)]) == 8
+    assert s.evaluate(A[Uint8(2)]) == 9
+    assert s.evaluate(A[X]) == 8
+    assert s.check(X == Uint8(2)) is True
+    assert s.evaluate(A[Uint8(1)]) == 6
+    assert s.evaluate(A[X]) == 9
+
+    B = A.__copy__()
+    B[Uint8(1)] = Uint8(10)
+    assert B[Uint8(1)].reveal() == 10
+    assert s.check(X == Uint8(2)) is True
+    assert s.evaluate(A[Uint8(1)]) == 6
+
+
+def test_evaluate_array():
+    A = Array[Int8, Int8](Int8(-1))
+    A[Int8("EAK")] = Int8("EAV")
+    A[Int8(3)] = Int8(4)
+    s = Solver()
+    with pytest.raises(ValueError, match="solver is not ready for model evaluation"):
+        s.evaluate(A)
+
+    s.add(Int8("EAK") == Int8(-2))
+    s.add(Int8("EAV") == Int8(-3))
+    assert s.check() is True
+    m = s.evaluate(A)
+    assert {k: m[k] for k in (-2, 3)} == {-2: -3, 3: 4}
+    assert m[0] == -1
+    assert m[100] == -1
+
+
+def test_constraint_all_any():
+    P, Q = Constraint("ALLP"), Constraint("ALLQ")
+    assert Constraint.all([Constraint(True), Constraint(True)]).reveal() is True
+    assert Constraint.all([P, Constraint(False), Q]).reveal() is False
+    assert Constraint.any([P, Constraint(True), Q]).reveal() is True
+    assert Constraint.any([Constraint(False)]).reveal() is False
+    assert Constraint.all(c for c in (P, P, Constraint(True))) is P
+
+    xs = [Uint8("ALLX") != Uint8(i) for i in range(100)]
+    s = Solver()
+    assert s.check(Constraint.all(xs)) is True
+    assert s.evaluate(Uint8("ALLX")) >= 100
+    assert s.check(Constraint.all(xs), Uint8("ALLX") < Uint8(100)) is False
+    assert s.check(Constraint.all([P, Q]), ~Constraint.any([P, ~Q])) is False
+
+    with concolic({"ALLP": True, "ALLQ": False}):
+        p, q = Constraint("ALLP"), Constraint("ALLQ")
+        assert Constraint.all([p, q]).witness() is False
+        assert Constraint.any([p, q]).witness() is True
+
+
+def test_concat_extract():
+    with pytest.raises(ValueError, match="cannot concatenate Uint8, Uint8 into Uint32"):
+        Uint32.concat(Uint8(0), Uint8(0))
+    with pytest.raises(
+        ValueError, match="cannot extract bits 8:0 of Uint16 into Uint8"
+    ):
+        Uint16(0).extract(8, 0, Uint8)
+    with pytest.raises(
+        ValueError, match="cannot extract bits 16:9 of Uint16 into Uint8"
+    ):
+        Uint16(0).extract(16, 9, Uint8)
+
+    assert Uint32.concat(Uint8(1), Uint16(0x0203), Uint8(4)).reveal() == 0x01020304
+    assert Int16.concat(Uint8(0xFF), Int8(-2)).reveal() == -2
+    assert Uint32(0x01020304).extract(23, 16, Int8).reveal() == 2
+
+    # Constant operands fold, whether or not their widths are byte-aligned
+    Uint6, Uint12 = Uint[Literal[6]], Uint[Literal[12]]
+    Z = Uint32.concat(Uint6(0x2A), Uint12(0xABC), Uint8(0x5E), Uint6(0x15))
+    assert Z.reveal() == (0x2A << 26) | (0xABC << 14) | (0x5E << 6) | 0x15
+    assert Z.extract(25, 14, Uint12).reveal() == 0xABC
+    W = Uint16.concat(Uint8(0xF0), Uint8("CEW"))
+    assert W.extract(15, 8, Uint8).reveal() == 0xF0
+    assert Uint32.concat(W, Uint16(0xBEEF)).extract(15, 0, Uint16).reveal() == 0xBEEF
+
+    # Slices of the same bitvector collapse back into the original.
+    X = Uint32("CEX")
+    parts = [X.extract(8 * i + 7, 8 * i, Uint8) for i in reversed(range(4))]
+    assert repr(Uint32.concat(*parts)) == "Uint32(`CEX`)"
+    Y = Uint32.concat(Uint8(1), Uint8("CEY"), X.extract(15, 0, Uint16))
+    assert repr(Y.extract(23, 16, Uint8)) == "Uint8(`CEY`)"
+    assert repr(Y.extract(15, 0, Uint16).into(Uint32)) == repr(
+        X.into(Uint16).into(Uint32)
+    )
+
+    s = Solver()
+    s.add(X == Uint32(0xAABBCCDD))
+    s.add(Uint8("CEY") == Uint8(0x11))
+    assert s.check() is True
+    assert s.evaluate(Y) == 0x0111CCDD
+    assert s.evaluate(Y.extract(19, 4, Uint16)) == 0x1CCD
+
+    with concolic({"CEX": 0x12345678}):
+        x = Uint32("CEX")
+        assert x.extract(15, 8, Uint8).witness() == 0x56
+        assert Uint16.concat(x.extract(7, 0, Uint8), Uint8(1)).witness() == 0x7801
+
+
+def test_select():
+    table = [Int16(-1), Int16(7), Int16(7), Int16(300), Int16(-5)]
+    assert Int16.select(Uint8(3), table).reveal() == 300
+    assert Int16.select(Uint8(9), table).reveal() == 0
+    assert Int16.select(Uint8(9), table, Int16(42)).reveal() == 42
+    assert Int16.select(Uint8("SEL"), [], Int16(42)).reveal() == 42
+
+    i = Uint8("SEL")
+    r = Int16.select(i, table, Int16(42))
+    for k in range(8):
+        s = Solver()
+        s.add(i == Uint8(k))
+        assert s.check() is True
+        assert s.evaluate(r) == (table[k] if k < len(table) else Int16(42)).reveal()
+
+    # A table covering every index needs no default.
+    full = [Uint8((k ^ 0x5A) & 0xFF) for k in range(300)]
+    s = Solver()
+    s.add(Uint8.select(i, full) == Uint8(0x5A))
+    assert s.check() is True
+    assert s.evaluate(i) == 0
+
+    with concolic({"SEL": 4}):
+        assert Int16.select(Uint8("SEL"), table).witness() == -5
+        assert Int16.select(Uint8("SEL") + Uint8(1), table).witness() == 0
+
+
+def test_substitute():
+    x, y = Uint32("SUBX"), Int8("SUBY")
+    expr = (x * Uint32(3) + y.into(Int32).into(Uint32)) >> Uint32(1)
+    assert expr.substitute({"SUBX": Uint32(5), "SUBY": Int8(-3)}).reveal() == 6
+    assert expr.substitute({}) is expr
+    assert expr.substitute({"SUBNEVER": Uint8(1)}) is expr
+
+    partial = expr.substitute({"SUBY": Int8(1)})
+    assert partial.reveal() is None
+    assert partial.substitute({"SUBX": Uint32(1)}).reveal() == 2
+
+    with pytest.raises(ValueError, match=r'cannot substitute Uint8 for Int8\("SUBY"\)'):
+        expr.substitute({"SUBY": Uint8(1)})
+
+    # Variables can be replaced with other expressions, too.
+    z = Uint64("SUBZ")
+    wide = Uint64.concat(x, x.extract(31, 0, Uint32)) ^ z
+    swapped = wide.substitute({"SUBX": x.extract(15, 0, Uint16).into(Uint32)})
+    s = Solver()
+    s.add(x == Uint32(0x12345678))
+    s.add(z == Uint64(1))
+    assert s.check() is True
+    assert s.evaluate(swapped) == 0x5678_0000_5679
+
+    a = Array[Uint8, Uint8]("SUBA")
+    b = Array[Uint8, Uint8](Uint8(7))
+    b[Uint8(1)] = Uint8(9)
+    lookup = a[Uint8("SUBK")] + Uint8(1)
+    assert lookup.substitute({"SUBA": b, "SUBK": Uint8(1)}).reveal() == 10
+    assert lookup.substitute({"SUBA": b, "SUBK": Uint8(2)}).reveal() == 8
+
+    c = Constraint("SUBC")
+    results = Symbolic.substitute_many(
+        [c & (x == Uint32(1)), y, c.ite(y, Int8(0))],
+        {"SUBC": Constraint(True), "SUBY": Int8(-1)},
+    )
+    assert [type(r) for r in results] == [Constraint, Int8, Int8]
+    assert results[0].reveal() is None
+    assert results[1].reveal() == -1
+    assert results[2].reveal() == -1
+
+
+def test_introspection():
+    x, y = Uint32("INTX"), Uint32("INTY")
+    assert x.free_constants() == {"INTX"}
+    assert (x.dag_size(), x.depth()) == (1, 0)
+    assert Uint32(5).free_constants() == frozenset()
+    assert (Uint32(5).dag_size(), Uint32(5).depth()) == (1, 0)
+
+    c = (x + y == Uint32(1)) | Constraint("INTC")
+    assert c.free_constants() == {"INTX", "INTY", "INTC"}
+    assert c.substitute({"INTY": x}).free_constants() == {"INTX", "INTC"}
+
+    a = Array[Uint32, Uint8]("INTA")
+    assert a[x].free_constants() == {"INTA", "INTX"}
+
+    # Shared subexpressions are only visited once, so metrics of deep DAGs
+    # are cheap to compute even though the equivalent trees are enormous.
+    z = x
+    for _ in range(200):
+        z = (z ^ y) >> z
+    assert z.free_constants() == {"INTX", "INTY"}
+    assert 200 <= z.depth() <= z.dag_size() <= 2000
+
+
+def test_deep_terms():
+    # Chains deeper than Python's recursion limit
+    x = Uint8("DEEPX")
+    y, z = Uint8(0), Uint8(0)
+    for i in range(1500):
+        y = y + x
+        z = (x == Uint8(i % 7)).ite(z + Uint8(1), z)
+    s = Solver()
+    assert s.check(y == Uint8(0xDC))
+    v = s.evaluate(x)
+    assert (v * 1500) & 0xFF == 0xDC
+    assert s.evaluate(z) == sum(1 for i in range(1500) if i % 7 == v) & 0xFF
+    assert y.substitute({"DEEPX": Uint8(1)}).reveal() == 1500 & 0xFF
+    assert "DEEPX" in repr(y)
+
+    def shared(depth: int) -> Uint8:
+        w = x
+        for _ in range(depth):
+            w = w * (w + Uint8(1))
+        return w
+
+    # DAGs with exponentially large trees
+    w, w2 = shared(24), shared(24)
+    if Solver.check.__module__ != "zbitvector._z3":  # Z3 prints the full tree
+        assert len(repr(w)) < 2000
+    assert hash(w) == hash(w2)
+    assert (w == w2).reveal() in (True, None)
+
+
+def test_minimize_maximize():
+    x = Uint8("OPTX")
+    s = Solver()
+    s.add(x * Uint8(3) > Uint8(100))
+    s.add(x & Uint8(1) == Uint8(1))
+    assert s.minimize(x) == 35
+    assert s.evaluate(x) == 35
+    assert s.maximize(x) == 255
+    assert s.evaluate(x * Uint8(3)) == 253
+
+    y = Int8("OPTY")
+    s = Solver()
+    s.add(y * Int8(3) > Int8(100))
+    assert s.minimize(y) == -51
+    assert s.maximize(y) == 127
+    assert s.minimize(y + Int8(127)) == -95
+
+    s.add(y < Int8(-127))
+    assert s.minimize(y) is None
+    assert s.maximize(y) is None
+    with pytest.raises(ValueError, match="not ready"):
+        s.evaluate(y)
+
+
+def test_options():
+    x = Uint8("OPTX")
+    s = Solver({"seed": 1, "pp_var_subst": False})
+    s.add(x > Uint8(5))
+    assert s.check(options={"seed": 2, "fun_preprop": True})
+    assert not s.check(x < Uint8(5), options={"seed": 3})
+    assert s.check()
+
+    with pytest.raises(ValueError, match="unknown solver option: bogus"):
+        Solver({"bogus": 1})  # type: ignore
+    with pytest.raises(ValueError, match="unknown solver option: bogus"):
+        s.check(options={"bogus": 1})  # type: ignore
+
+
+def test_options_strategy():
+    Uint4 = Uint[Literal[4]]
+    x, y = Uint4("OPTSX"), Uint4("OPTSY")
+    p = Constraint("OPTSP")
+    s = Solver({"logic": "QF_ABV", "tactic": "simplify; bit-blast; sat"})
+    s.add(x * y == Uint4(15))
+    s.add(x > Uint4(1))
+    assert s.check()
+    assert (s.evaluate(x) * s.evaluate(y)) & 0xF == 15
+
+    # Assumptions and arrays go to the incremental solver
+    s.add(p.ite(x == Uint4(1), x != Uint4(1)))
+    assert not s.check(p)
+    assert s.failed_assumptions() == [p]
+    a = Array[Uint4, Uint4](Uint4(0))
+    a[Uint4(3)] = Uint4(9)
+    s.add(a[x] == Uint4(9))
+    assert s.check()
+    assert s.evaluate(x) == 3
+    assert len(list(s.iter_models([y], limit=3))) == 1
+    assert s.check()
+
+    with pytest.raises(ValueError, match="cannot be set per check: tactic"):
+        s.check(options={"tactic": "sat"})
+
+
+def test_iter_models():
+    Uint4, Int4 = Uint[Literal[4]], Int[Literal[4]]
+    x, y = Uint4("IMX"), Int4("IMY")
+    s = Solver()
+    s.add(x < Uint4(4))
+    s.add(y > Int4(-3))
+    s.add(y < Int4(1))
+
+    models = list(s.iter_models([x, y]))
+    assert sorted(models) == [(a, b) for a in range(4) for b in (-2, -1, 0)]
+
+    # Blocking constraints are discarded afterwards
+    assert s.check()
+    assert len(list(s.iter_models([x], limit=5))) == 4
+    assert len(list(s.iter_models([x, y], limit=5))) == 5
+    assert list(s.iter_models([x], limit=0)) == []
+    assert list(s.iter_models([])) == [()]
+
+    # ...including when the generator is closed early
+    it = s.iter_models([y])
+    assert next(it)[0] in (-2, -1, 0)
+    it.close()
+    assert len(list(s.iter_models([y]))) == 3
+
+    s.add(x > Uint4(10))
+    assert list(s.iter_models([x])) == []
+
+
+def test_iter_models_seed():
+    def run(seed: int) -> List[Tuple[int, ...]]:
+        z = Uint8("IMZ")
+        s = Solver()
+        s.add(z & Uint8(0x0F) == Uint8(0x05))
+        return list(s.iter_models([z], seed=seed))
+
+    first = run(1)
+    assert sorted(first) == [((i << 4) | 5,) for i in range(16)]
+    if Solver.check.__module__ != "zbitvector._bitwuzla":
+        assert run(1) == first  # Bitwuzla reuses state from earlier checks
+
+
+def test_failed_assumptions():
+    x = Uint8("FAX")
+    s = Solver()
+    with pytest.raises(ValueError, match="not ready"):
+        s.failed_assumptions()
+
+    s.add(x > Uint8(5))
+    a, b, c = x < Uint8(3), x != Uint8(7), x == Uint8(9)
+    assert not s.check(b, a, c)
+    failed = s.failed_assumptions()
+    assert any(f is a for f in failed)
+    assert all(any(f is g for g in (a, b, c)) for f in failed)
+    assert not s.check(*failed)
+
+    # Neither assumption fails alone, so both must be reported, in order
+    d = x == Uint8(8)
+    assert not s.check(c, b, d)
+    failed = [f for f in s.failed_assumptions() if f is not b]
+    assert len(failed) == 2 and failed[0] is c and failed[1] is d
+
+    assert not s.check(Constraint(False), b)
+    assert any(f.reveal() is False for f in s.failed_assumptions())
+
+    assert s.check(b)
+    with pytest.raises(ValueError, match="not ready"):
+        s.failed_assumptions()
+
+    s.add(x < Uint8(5))
+    assert not s.check(b)
+    assert all(f is b for f in s.failed_assumptions())
+    s.add(x == Uint8(1))
+    with pytest.raises(ValueError, match="not ready"):
+        s.failed_assumptions()
+
+
+def test_evaluate_interleaved():
+    x, y = Uint8("EIX"), Uint8("EIY")
+    A = Array[Uint8, Uint8](Uint8(0))
+    A[x] = Uint8(0x42)
+    s, t = Solver(), Solver()
+    s.add(x * Uint8(3) == Uint8(0x2D))
+    assert s.check()
+
+    t.add(x == Uint8(1))
+    assert t.check()
+    p = Constraint("EIP")
+    u = Solver()
+    u.add(~p)
+    assert not u.check(p)
+
+    assert s.evaluate(x) == 0x0F
+    assert s.evaluate(A[x] + Uint8(1)) == 0x43
+    assert s.evaluate(A)[0x0F] == 0x42
+    # Evaluating an old model doesn't disturb the last unsat core
+    assert u.failed_assumptions() == [p]
+    # Constants unconstrained by the model get a consistent value
+    assert s.evaluate(y) == s.evaluate(y)
+    assert t.evaluate(x) == 1
+
+    s.add(y == Uint8(2))
+    with pytest.raises(ValueError, match="not ready"):
+        s.evaluate(x)
+    assert t.evaluate(x + y - y) == 1
+    assert u.failed_assumptions() == [p]
+    u.add(p | ~p)
+    assert t.check()
+    with pytest.raises(ValueError, match="not ready"):
+        u.failed_assumptions()
+
+
+def test_z3_arrays_after_solver():
+    # Z3 solvers are specialized for QF_BV until the first array is created,
+    # then switch to QF_ABV, even in the middle of enumerating models
+    pytest.importorskip("z3")
+    code = """
+from typing import Literal
+from zbitvector import Array, Solver, Uint
+Uint4 = Uint[Literal[4]]
+x = Uint4("AAX")
+s, t = Solver(), Solver()
+s.add(x != Uint4(3))
+t.add(x != Uint4(3))
+assert s.check() and t.check()
+models = s.iter_models([x])
+next(models)
+A, B = Array[Uint4, Uint4]("AAA"), Array[Uint4, Uint4]("AAA")
+B[x] = Uint4(5)
+for u in (s, t):
+    u.add(B[Uint4(3)] == Uint4(5))
+    u.add(A[Uint4(3)] == Uint4(7))
+assert list(models) == []
+assert s.check()
+assert not t.check()
+"""
+    env = {**os.environ, "ZBITVECTOR_SOLVER": "z3"}
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+
+def test_stats():
+    before = stats.snapshot()
+    with stats.scope() as outer:
+        x = Uint8("STATSX") + Uint8(1)
+        with stats.scope(native=True) as inner:
+            s = Solver()
+            assert s.check(x == Uint8(3))
+            assert not s.check(x == Uint8(3), x != Uint8(3))
+        _ = Uint8("STATSX") * Uint8("STATSY")
+    assert outer.result is not None and inner.result is not None
+
+    assert outer.result.constants == 2
+    assert inner.result.constants == 0
+    assert sum(outer.result.terms.values()) >= 5
+    assert outer.result.checks == {"sat": 1, "unsat": 1, "unknown": 0}
+    assert inner.result.checks == outer.result.checks
+    assert 0 < inner.result.check_time <= outer.result.check_time
+    assert all(v > 0 for v in outer.result.native.values())
+
+    diff = stats.snapshot() - before
+    assert diff.checks == outer.result.checks
+    assert diff.terms == outer.result.terms
+    flat = diff.flatten()
+    assert flat["constants"] == 2 and flat["checks.sat"] == 1
+    assert sum(v for k, v in flat.items() if k.startswith("terms.")) == sum(
+        diff.terms.values()
+    )
+
+    stats.reset()
+    assert stats.snapshot().constants == 0
+    assert sum(stats.snapshot().checks.values()) == 0
+
+
+def test_capture_slow_queries(tmp_path: Any):
+    z3 = pytest.importorskip("z3")
+    found: List[stats.SlowQuery] = []
+    x, A = Uint8("SLOWX"), Array[Uint8, Uint8](Uint8(0))
+    A[x] = Uint8(7)
+    s = Solver()
+    s.add(A[Uint8(5)] == Uint8(7))
+    try:
+        stats.capture_slow_queries(
+            0.0, directory=tmp_path, callback=found.append, keep=2
+        )
+        assert s.check(x > Uint8(3))
+        c, d, gt = Constraint("SLOWC"), Constraint("SLOWD"), x > Uint8(3)
+        assert s.check(
+            (x == Uint8(1)) | gt,
+            gt ^ (x == Uint8(6)),
+            Constraint.any([c ^ d, x == Uint8(9), gt & c]),
+            Constraint.any([x == Uint8(2), gt]) ^ c,
+        )
+        assert not s.check(x > Uint8(3), Constraint("SLOWC"), ~Constraint("SLOWC"))
+        assert s.check()
+        stats.capture_slow_queries(3600.0, directory=tmp_path, callback=found.append)
+        assert s.check()
+    finally:
+        stats.capture_slow_queries(None)
+    assert s.check()
+
+    assert [q.outcome for q in found] == ["sat", "sat", "unsat", "sat"]
+    assert all(q.elapsed >= 0 for q in found)
+    files = sorted(tmp_path.iterdir())
+    assert [str(f) for f in files] == [q.path for q in found[2:]]
+
+    # Each query can be replayed by another solver
+    for q in found:
+        replay = z3.Solver()
+        replay.from_string(q.smtlib)
+        assert str(replay.check()) == q.outcome
+    text = files[0].read_text()
+    assert text.startswith("; elapsed: ") and "; outcome: unsat\n" in text
+    assert text.endswith("(check-sat)\n")
+
+    with pytest.raises(ValueError, match="keep"):
+        stats.capture_slow_queries(1.0, keep=0)
+
+
+def test_trace(tmp_path: Any):
+    path = tmp_path / "app.trace"
+    add = Uint8.__add__
+    with trace.record(path):
+        x, y = Uint8("TX"), Uint8("TY")
+        A = Array[Uint8, Uint8](Uint8(0))
+        A[x] = y
+        c = Constraint.all(v > Uint8(1) for v in (x, y))
+        s = Solver()
+        s.add(c)
+        assert s.check(A[Uint8(3)] == Uint8(2))
+        s.evaluate(x)
+        Memory(A)[Uint8(4)]
+        assert len(list(Solver().iter_models([Uint[Literal[4]]("TW")], limit=3))) == 3
+        (z,) = Symbolic.substitute_many([x + y], {"TX": Uint8(1)})
+        Uint16.concat(z, Uint8(2)).extract(15, 8, Uint8).into(Uint16)
+        with pytest.raises(TypeError):
+            A == A  # type: ignore  # noqa: B015 -- raises, so not recorded
+    assert Uint8.__add__ is add
+
+    r = trace.replay(path)
+    assert r.calls > 20 and r.construction_time >= 0 and r.solve_time > 0
+
+    # Only the two constructors are recorded, not the comparison
+    small = tmp_path / "small.trace"
+    with trace.record(small):
+        B = Array[Uint8, Uint8](Uint8(0))
+        with pytest.raises(TypeError):
+            B == B  # type: ignore  # noqa: B015
+    assert trace.replay(small).calls == 2
+
+    # Objects aren't kept alive, and reused ids get new identities
+    with trace.record(small):
+        for i in range(100):
+            Uint8(i) + Uint8(1)  # pyright: ignore[reportUnusedExpression]
+        c = Constraint.all([Uint8("TZ") == Uint8(7)])
+        Solver().check(c)
+    assert trace.replay(small).calls == 306
+
+    # Replay against another backend
+    env = {**os.environ, "ZBITVECTOR_SOLVER": "concrete"}
+    out = subprocess.run(
+        [sys.executable, "-m", "zbitvector.trace", str(path)],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert f"{r.calls} calls" in out and "[concrete]" in out
+
+    # Objects created before recording can't be replayed
+    with trace.record(path):
+        x + Uint8(1)  # pyright: ignore[reportUnusedExpression]
+    with pytest.raises(ValueError, match="before recording started"):
+        trace.replay(path)
+    (tmp_path / "bad.trace").write_bytes(b"")
+    with pytest.raises(ValueError, match="not a zbitvector trace"):
+        trace.replay(tmp_path / "bad.trace")
+
+
+def test_lazy_import():
+    # The backend is only loaded when one of its classes is first used
+    code = (
+        "import sys, zbitvector; "
+        "assert not [m for m in sys.modules if m.startswith(('z3', 'zbitvector._'))]; "
+        "zbitvector.Uint; "
+        "assert zbitvector._backend.__name__ in sys.modules; "
+        "print(zbitvector.__version__)"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+
+
+def test_import_budget():
+    # Importing the package and loading the backend stays within a budget, in
+    # seconds. ImportSuite.track_first_use records the same measurement.
+    budget = {"bitwuzla": 0.2, "z3": 0.2, "concrete": 0.1, "dummy": 0.1}
+    code = (
+        "import time; start = time.perf_counter(); import zbitvector; "
+        "zbitvector.Uint; print(time.perf_counter() - start)"
+    )
+    elapsed = min(
+        float(subprocess.check_output([sys.executable, "-c", code], text=True))
+        for _ in range(5)
+    )
+    solver = os.getenv("ZBITVECTOR_SOLVER", "bitwuzla").lower()
+    assert elapsed <= budget[solver], f"import took {elapsed:.3f}s"
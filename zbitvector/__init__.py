@@ -1,27 +1,34 @@
 """zbitvector: an efficient, well-typed interface to the Z3 and Bitwuzla SMT solvers."""
 
+import importlib
 import os
-from importlib import metadata
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, List
 
-try:
-    __version__ = metadata.version(__name__)
-except metadata.PackageNotFoundError:
-    __version__ = "dev"
-
-
-__all__ = ("Array", "BitVector", "Constraint", "Int", "Solver", "Symbolic", "Uint")
+__all__ = (
+    "Array",
+    "BitVector",
+    "Constraint",
+    "Int",
+    "Memory",
+    "Options",
+    "Solver",
+    "Symbolic",
+    "Uint",
+    "concolic",
+)
 
 
 _solver = os.getenv("ZBITVECTOR_SOLVER", "bitwuzla").lower()
 
-if _solver == "dummy":
-    from . import _abstract as _backend
-elif _solver == "bitwuzla":
-    from . import _bitwuzla as _backend
-elif _solver == "z3":
-    from . import _z3 as _backend
-else:
+# The backend is imported on first use, not here: loading a solver (and, for
+# Z3, its Python bindings) dominates the cost of `import zbitvector`.
+_modules = {
+    "dummy": "._abstract",
+    "bitwuzla": "._bitwuzla",
+    "z3": "._z3",
+    "concrete": "._concrete",
+}
+if _solver not in _modules:
     raise ValueError(f"unknown solver: {_solver}")
 
 if TYPE_CHECKING:
@@ -30,11 +37,34 @@ if TYPE_CHECKING:
     from ._abstract import BitVector as BitVector
     from ._abstract import Constraint as Constraint
     from ._abstract import Int as Int
+    from ._abstract import Memory as Memory
+    from ._abstract import Options as Options
     from ._abstract import Solver as Solver
     from ._abstract import Symbolic as Symbolic
     from ._abstract import Uint as Uint
+    from ._abstract import concolic as concolic
 else:
-    for _name in __all__:
-        _member = getattr(_backend, _name)
-        _member.__module__ = __name__
-        globals()[_name] = _member
+
+    def __getattr__(name: str) -> Any:
+        if name == "__version__":
+            # Reading package metadata is slow, so it's also deferred.
+            from importlib import metadata
+
+            try:
+                version = metadata.version(__name__)
+            except metadata.PackageNotFoundError:
+                version = "dev"
+            globals()["__version__"] = version
+            return version
+        elif name in __all__ or name == "_backend":
+            backend = importlib.import_module(_modules[_solver], __name__)
+            for member in __all__:
+                value = getattr(backend, member)
+                value.__module__ = __name__
+                globals()[member] = value
+            globals()["_backend"] = backend
+            return globals()[name]
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    def __dir__() -> List[str]:
+        return sorted({*globals(), *__all__, "__version__"})
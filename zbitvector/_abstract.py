@@ -1,18 +1,40 @@
 """
 Abstract solver backend.
 
-For specific implementations, see _bitwuzla.py and _z3.py.
+For specific implementations, see _bitwuzla.py, _z3.py and _concrete.py.
 """
 
 from __future__ import annotations
 
 import abc
-from typing import Any, ClassVar, Final, Generic, TypeVar, Union, overload
+import contextlib
+from typing import (
+    Any,
+    ClassVar,
+    DefaultDict,
+    Final,
+    FrozenSet,
+    Generator,
+    Generic,
+    Iterable,
+    List,
+    Mapping,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    overload,
+)
 
 from typing_extensions import Never, Self
 
+# Memory is implemented once, in terms of the other classes.
+from ._memory import Memory as Memory
+from ._util import Options as Options
+
 N = TypeVar("N", bound=int)
 M = TypeVar("M", bound=int)
+S = TypeVar("S", bound="Symbolic")
 
 # pyright: reportIncompatibleMethodOverride=false
 
@@ -63,6 +85,69 @@ class Symbolic(abc.ABC):
     def __hash__(self) -> int:
         raise NotImplementedError
 
+    def substitute(self, mapping: Mapping[str, Symbolic | Array[Any, Any]], /) -> Self:
+        """
+        Replace the named variables in this expression with the given values,
+        and simplify the result. Each value must have the same type as the
+        variable it replaces.
+
+        >>> X = Uint8("SX") + Uint8("SY")
+        >>> X.substitute({"SX": Uint8(1)})
+        Uint8(`(bvadd #x01 SY)`)
+
+        >>> X.substitute({"SX": Uint8(1), "SY": Uint8(2)})
+        Uint8(`#x03`)
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def substitute_many(
+        cls, exprs: Iterable[S], mapping: Mapping[str, Symbolic | Array[Any, Any]], /
+    ) -> List[S]:
+        """
+        Apply the same substitution to each of the given expressions. This is
+        faster than calling :meth:`substitute` on each one separately, because
+        subexpressions shared between them are only rewritten once.
+
+        >>> Symbolic.substitute_many(
+        ...     [Uint8("SZ") + Uint8(1), Uint8("SZ") == Uint8(3)], {"SZ": Uint8(2)}
+        ... )
+        [Uint8(`#x03`), Constraint(`false`)]
+        """
+        raise NotImplementedError
+
+    def free_constants(self) -> FrozenSet[str]:
+        """
+        Return the names of the variables that this expression depends on.
+
+        This method, :meth:`dag_size` and :meth:`depth` are computed together in
+        a single pass over the expression, and cached.
+
+        >>> sorted((Uint8("FA") + Uint8("FB") * Uint8(2)).free_constants())
+        ['FA', 'FB']
+        """
+        raise NotImplementedError
+
+    def dag_size(self) -> int:
+        """
+        Return the number of distinct subexpressions in this expression,
+        including itself. Shared subexpressions are counted once.
+
+        >>> (Uint8("DA") + Uint8("DB")).dag_size()
+        3
+        """
+        raise NotImplementedError
+
+    def depth(self) -> int:
+        """
+        Return the length of the longest path from this expression down to a
+        variable or literal. Variables and literals have a depth of zero.
+
+        >>> (Uint8("DA") + Uint8("DB")).depth()
+        1
+        """
+        raise NotImplementedError
+
 
 class Constraint(Symbolic):
     """
@@ -129,6 +214,36 @@ class Constraint(Symbolic):
         """
         raise NotImplementedError
 
+    @classmethod
+    def all(cls, constraints: Iterable[Constraint], /) -> Constraint:
+        """
+        Compute the boolean AND of all of the given constraints, as a single
+        n-ary term. Duplicates and constant `true` arguments are dropped.
+
+        :SMT-LIB: (and c1 c2 ...)
+
+        >>> Constraint.all([Constraint("P"), Constraint(True), Constraint("P")])
+        Constraint(`P`)
+        >>> Constraint.all([])
+        Constraint(`true`)
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def any(cls, constraints: Iterable[Constraint], /) -> Constraint:
+        """
+        Compute the boolean OR of all of the given constraints, as a single
+        n-ary term. Duplicates and constant `false` arguments are dropped.
+
+        :SMT-LIB: (or c1 c2 ...)
+
+        >>> Constraint.any([Constraint("Q"), Constraint(True)])
+        Constraint(`true`)
+        >>> Constraint.any([])
+        Constraint(`false`)
+        """
+        raise NotImplementedError
+
     def __bool__(self) -> Never:
         """
         Prohibit using :class:`Constraint` in a boolean context.
@@ -182,6 +297,19 @@ class Constraint(Symbolic):
         """
         raise NotImplementedError
 
+    def witness(self) -> bool | None:
+        """
+        Return the concrete shadow value of this constraint, computed from the
+        seed passed to :func:`concolic`. If the constraint was built outside of
+        concolic mode, or depends on a variable missing from the seed, returns
+        `None`.
+
+        >>> with concolic({"CW": True}):
+        ...     (Constraint("CW") & Constraint(False)).witness()
+        False
+        """
+        raise NotImplementedError
+
 
 class BitVector(Symbolic, Generic[N]):
     """
@@ -339,6 +467,85 @@ class BitVector(Symbolic, Generic[N]):
     @abc.abstractmethod
     def __rshift__(self, other: Uint[N], /) -> Self: ...
 
+    @classmethod
+    def of_width(cls, width: int, /) -> type[Self]:
+        """
+        Return the class of this kind of bitvector with the given width, for
+        widths that are only known at runtime. This is the same class as
+        writing the width as a :class:`~typing.Literal`, but faster.
+
+        >>> Uint8.of_width(16) is Uint16
+        True
+
+        >>> Int8.of_width(64)(-1)
+        Int64(`#xffffffffffffffff`)
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def concat(cls, *parts: BitVector[Any]) -> Self:
+        """
+        Concatenate the given bitvectors, with the first part in the most
+        significant position. The widths of the parts must add up to the width
+        of this class.
+
+        Adjacent constants are merged, and adjacent slices of the same
+        bitvector collapse back into a single slice.
+
+        :SMT-LIB: (concat p1 p2 ...)
+
+        >>> Uint16.concat(Uint8(0x12), Uint8(0x34))
+        Uint16(`#x1234`)
+
+        >>> X = Uint16("CX")
+        >>> Uint16.concat(X.extract(15, 8, Uint8), X.extract(7, 0, Uint8))
+        Uint16(`CX`)
+        """
+        raise NotImplementedError
+
+    @overload
+    def extract(self, hi: int, lo: int, other: type[Uint[M]], /) -> Uint[M]: ...
+
+    @overload
+    def extract(self, hi: int, lo: int, other: type[Int[M]], /) -> Int[M]: ...
+
+    def extract(self, hi: int, lo: int, other: type[BitVector[M]], /) -> BitVector[M]:
+        """
+        Extract bits `hi` down to `lo` (inclusive) of this bitvector, as the
+        given type. The width of the type must be `hi - lo + 1`.
+
+        Extracting from a concatenation selects the relevant parts directly.
+
+        :SMT-LIB: ((_ extract hi lo) self)
+
+        >>> Uint16(0x1234).extract(15, 8, Uint8)
+        Uint8(`#x12`)
+
+        >>> Uint16.concat(Uint8("CY"), Uint8(0)).extract(15, 8, Uint8)
+        Uint8(`CY`)
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def select(
+        cls, index: Uint[Any], table: Sequence[Self], default: Self | None = None, /
+    ) -> Self:
+        """
+        Look up `table[index]`, or `default` if the index is out of range. If no
+        default is given, it's zero.
+
+        The lookup is built as a balanced tree of if-then-elses over the bits of
+        the index, which is smaller and solves faster than a chain of
+        comparisons against each entry. Runs of equal entries are merged.
+
+        >>> Uint8.select(Uint8(2), [Uint8(0xA), Uint8(0xB), Uint8(0xC)])
+        Uint8(`#x0c`)
+
+        >>> Uint8.select(Uint8("SI"), [Uint8(0xA), Uint8(0xA)], Uint8(0xA))
+        Uint8(`#x0a`)
+        """
+        raise NotImplementedError
+
 
 class Uint(BitVector[N]):
     """Represents an N-bit unsigned integer."""
@@ -457,6 +664,19 @@ class Uint(BitVector[N]):
         """
         raise NotImplementedError
 
+    def witness(self) -> int | None:
+        """
+        Return the concrete shadow value of this bitvector, computed from the
+        seed passed to :func:`concolic`. If the bitvector was built outside of
+        concolic mode, or depends on a variable missing from the seed, returns
+        `None`.
+
+        >>> with concolic({"UW": 255}):
+        ...     (Uint8("UW") + Uint8(2)).witness()
+        1
+        """
+        raise NotImplementedError
+
 
 class Int(BitVector[N]):
     """Represents an N-bit signed integer in two's complement form."""
@@ -589,6 +809,19 @@ class Int(BitVector[N]):
         """
         raise NotImplementedError
 
+    def witness(self) -> int | None:
+        """
+        Return the concrete shadow value of this bitvector, computed from the
+        seed passed to :func:`concolic`. If the bitvector was built outside of
+        concolic mode, or depends on a variable missing from the seed, returns
+        `None`.
+
+        >>> with concolic({"IW": -1}):
+        ...     (Int8("IW") - Int8(2)).witness()
+        -3
+        """
+        raise NotImplementedError
+
 
 K = TypeVar("K", bound=Union[Uint[Any], Int[Any]])
 V = TypeVar("V", bound=Union[Uint[Any], Int[Any]])
@@ -616,6 +849,8 @@ class Array(Generic[K, V]):
     """
 
     __hash__: ClassVar[None] = None
+    _key: type[K]
+    _value: type[V]
 
     def __init__(self, value: V | str, /) -> None:
         raise NotImplementedError
@@ -677,31 +912,171 @@ class Solver:
     False
     """
 
-    def __init__(self) -> None:
+    def __init__(self, options: Options | None = None) -> None:
+        """Create a solver, with :class:`Options` that apply to every check."""
         raise NotImplementedError
 
     def add(self, assertion: Constraint, /) -> None:
         """Permanently add an assertion to the solver state."""
         raise NotImplementedError
 
-    def check(self, *assumptions: Constraint) -> bool:
+    def check(self, *assumptions: Constraint, options: Options | None = None) -> bool:
         """
         Check whether the solver state is satisfiable.
 
         If provided, *assumptions* are temporarily added to the solver state for
-        this check only.
+        this check only. So are *options*, which take precedence over the
+        solver's own.
         """
         raise NotImplementedError
 
-    def evaluate(self, bv: BitVector[N], /) -> int:
+    def failed_assumptions(self) -> List[Constraint]:
+        """
+        After :func:`check` returns False, return a subset of its assumptions
+        that's sufficient to make the solver state unsatisfiable. The subset is
+        not necessarily minimal. An empty list means the solver's assertions
+        are unsatisfiable on their own.
+
+        The result contains the original :class:`Constraint` objects passed to
+        :func:`check`, in the same order. Raises :class:`ValueError` if the
+        last check was satisfiable or the solver has changed since.
+
+        >>> s = Solver()
+        >>> s.add(Uint8("FA") > Uint8(5))
+        >>> a, b = Uint8("FA") < Uint8(3), Uint8("FA") != Uint8(7)
+        >>> s.check(a, b)
+        False
+        >>> any(c is a for c in s.failed_assumptions())
+        True
+        """
+        raise NotImplementedError
+
+    def minimize(self, expr: BitVector[N], /) -> int | None:
+        """
+        Find the smallest value of `expr` that's consistent with the solver
+        state, or return `None` if the solver state is unsatisfiable. :class:`Int`
+        values are ordered as signed integers.
+
+        On success, the solver is left with a model at the optimum, so
+        :func:`evaluate` can be used to read other values from it.
+
+        >>> s = Solver()
+        >>> s.add(Uint8("MN") > Uint8(5))
+        >>> s.minimize(Uint8("MN"))
+        6
+        >>> s.evaluate(Uint8("MN") + Uint8(1))
+        7
+        """
+        raise NotImplementedError
+
+    def maximize(self, expr: BitVector[N], /) -> int | None:
+        """
+        Find the largest value of `expr` that's consistent with the solver
+        state, or return `None` if the solver state is unsatisfiable. See
+        :func:`minimize`.
+
+        >>> s = Solver()
+        >>> s.add(Int8("MX") < Int8(-3))
+        >>> s.maximize(Int8("MX"))
+        -4
+        """
+        raise NotImplementedError
+
+    def iter_models(
+        self,
+        terms: Sequence[BitVector[Any]],
+        /,
+        limit: int | None = None,
+        seed: int | None = None,
+    ) -> Generator[Tuple[int, ...]]:
+        """
+        Enumerate distinct assignments to `terms` that are consistent with the
+        solver state, yielding a tuple of values for each one. At most `limit`
+        assignments are produced, if set.
+
+        After each assignment, a constraint blocking it is added and the solver
+        is re-checked incrementally. These constraints are scoped to the
+        iteration: they're discarded once the generator finishes or is closed.
+
+        If `seed` is set, each check first tries to flip a randomly-chosen bit
+        of the previous assignment, spreading the results out across the space
+        of solutions. With Z3 and the concrete backend, the sequence is
+        deterministic for a given seed; Bitwuzla's shared instance carries
+        state from earlier checks, so its sequence can vary.
+
+        >>> s = Solver()
+        >>> s.add(Uint8("IM") < Uint8(3))
+        >>> sorted(s.iter_models([Uint8("IM")]))
+        [(0,), (1,), (2,)]
+        """
+        raise NotImplementedError
+
+    @overload
+    def evaluate(self, bv: BitVector[N], /) -> int: ...
+
+    @overload
+    def evaluate(self, bv: Array[K, V], /) -> DefaultDict[int, int]: ...
+
+    def evaluate(
+        self, bv: BitVector[N] | Array[K, V], /
+    ) -> int | DefaultDict[int, int]:
         """
         Return a value for the given :class:`BitVector` consistent with the
         solver's model.
 
+        Given an :class:`Array`, return its value in the model as a
+        :class:`~collections.defaultdict` of the populated entries, whose
+        default is the value at every other key.
+
+        >>> s = Solver()
+        >>> A = Array[Uint8, Uint8](Uint8(0))
+        >>> A[Uint8("EV")] = Uint8(2)
+        >>> s.add(Uint8("EV") == Uint8(1))
+        >>> s.check()
+        True
+        >>> m = s.evaluate(A)
+        >>> m[1], m[2]
+        (2, 0)
+
         Raises a :class:`ValueError` if these preconditions are not met:
          - The most recent call to :func:`check` returned `True`.
          - No subsequent calls to :func:`add` have been made.
-         - With the Bitwuzla backend: no subsequent calls to :func:`check` have
-           been made with any other :class:`Solver` instance.
+
+        The model stays available while other :class:`Solver` instances are
+        checked. (With the Bitwuzla backend, which shares one solver between
+        instances, the values of the model's constants are saved just before
+        another instance replaces it.)
+
+        >>> t = Solver()
+        >>> t.add(Uint8("EV") == Uint8(2))
+        >>> t.check()
+        True
+        >>> s.evaluate(Uint8("EV") + Uint8(1)), t.evaluate(Uint8("EV"))
+        (2, 2)
         """
         raise NotImplementedError
+
+
+@contextlib.contextmanager
+def concolic(seed: Mapping[str, int | bool], /) -> Generator[None]:
+    """
+    Enter concolic mode: within this context, every :class:`Constraint` and
+    :class:`BitVector` carries a concrete shadow value alongside its symbolic
+    term, available from ``witness()``.
+
+    Variables are assigned shadow values from *seed*, by name. Operators compute
+    the shadow value of their result directly from the shadow values of their
+    arguments, so branches can be decided without invoking the solver. Arrays
+    created from a default value track the shadow values stored in them, so
+    reads (including :class:`Memory` loads) have shadow values too; arrays
+    created from a name have none.
+
+    >>> with concolic({"S": 5}):
+    ...     x = Uint8("S") * Uint8(3)
+    ...     c = x < Uint8(10)
+    >>> x.witness(), c.witness()
+    (15, False)
+    >>> x.reveal() is None
+    True
+    """
+    raise NotImplementedError
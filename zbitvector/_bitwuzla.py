@@ -3,14 +3,25 @@
 from __future__ import annotations
 
 import abc
+import functools
+import time
+from collections import defaultdict
 from typing import (
     TYPE_CHECKING,
     Any,
     ClassVar,
+    DefaultDict,
     Dict,
     Final,
+    FrozenSet,
+    Generator,
     Generic,
+    Iterable,
+    Iterator,
     List,
+    Mapping,
+    Sequence,
+    Set,
     Tuple,
     TypeVar,
     Union,
@@ -18,7 +29,12 @@ from typing import (
 
 from typing_extensions import Never, Self
 
-from ._util import ArrayMeta, BitVectorMeta
+from . import _ops as ops
+from . import _util
+from ._memory import Memory as Memory
+from ._util import ArrayMeta, BitVectorMeta, Segment
+from ._util import Options as Options
+from ._util import concolic as concolic
 
 try:
     from . import pybitwuzla
@@ -39,6 +55,7 @@ except ImportError:
 
 N = TypeVar("N", bound=int)
 M = TypeVar("M", bound=int)
+S = TypeVar("S", bound="Symbolic")
 
 # pyright: reportIncompatibleMethodOverride=false
 
@@ -53,9 +70,65 @@ BZLA.set_option(Option.OUTPUT_NUMBER_FORMAT, "hex")
 # Solver responsible for the call, if available, or True otherwise).
 last_check: Solver | bool = False
 
+# The Solver responsible for the last call to `check_sat()`, if it was UNSAT.
+# Bitwuzla can only report failed assumptions until the next call.
+last_unsat: Solver | None = None
+
 
 CACHE: Dict[str, Tuple[type, BitwuzlaTerm]] = {}
 
+# Check results, by name, for `zbitvector.stats`.
+OUTCOMES: Final = {Result.SAT: "sat", Result.UNSAT: "unsat", Result.UNKNOWN: "unknown"}
+
+# Kinds that always produce a Boolean, and kinds that produce a Boolean if their
+# arguments are Booleans, for `Solver._smtlib()`. Bitwuzla lowers Boolean
+# connectives to BV_NOT and BV_AND on 1-bit vectors, so those count too.
+PREDICATES: Final = frozenset(
+    (Kind.EQUAL, Kind.DISTINCT, Kind.BV_ULT, Kind.BV_ULE, Kind.BV_SLT, Kind.BV_SLE)
+)
+CONNECTIVES: Final = frozenset(
+    (
+        Kind.NOT,
+        Kind.AND,
+        Kind.OR,
+        Kind.XOR,
+        Kind.IFF,
+        Kind.IMPLIES,
+        Kind.BV_NOT,
+        Kind.BV_AND,
+    )
+)
+
+# Reference implementations of each kind, for computing shadow values in
+# concolic mode.
+SHADOWS: Dict[Kind, ops.Op] = {
+    Kind.NOT: ops.NOT,
+    Kind.AND: ops.AND,
+    Kind.OR: ops.OR,
+    Kind.XOR: ops.XOR,
+    Kind.EQUAL: ops.EQ,
+    Kind.DISTINCT: ops.DISTINCT,
+    Kind.ITE: ops.ITE,
+    Kind.BV_NOT: ops.BVNOT,
+    Kind.BV_AND: ops.BVAND,
+    Kind.BV_OR: ops.BVOR,
+    Kind.BV_XOR: ops.BVXOR,
+    Kind.BV_ADD: ops.BVADD,
+    Kind.BV_SUB: ops.BVSUB,
+    Kind.BV_MUL: ops.BVMUL,
+    Kind.BV_UDIV: ops.BVUDIV,
+    Kind.BV_UREM: ops.BVUREM,
+    Kind.BV_SDIV: ops.BVSDIV,
+    Kind.BV_SREM: ops.BVSREM,
+    Kind.BV_SHL: ops.BVSHL,
+    Kind.BV_SHR: ops.BVLSHR,
+    Kind.BV_ASHR: ops.BVASHR,
+    Kind.BV_ULT: ops.BVULT,
+    Kind.BV_ULE: ops.BVULE,
+    Kind.BV_SLT: ops.BVSLT,
+    Kind.BV_SLE: ops.BVSLE,
+}
+
 
 def _mk_const(instance: Symbolic | Array[K, V], name: str) -> BitwuzlaTerm:
     # If we call `mk_const` twice with the same name, Bitwuzla will create two
@@ -64,6 +137,7 @@ def _mk_const(instance: Symbolic | Array[K, V], name: str) -> BitwuzlaTerm:
     if name not in CACHE:
         term = BZLA.mk_const(instance._sort, name)  # pyright: ignore[reportPrivateUsage]
         CACHE[name] = (instance.__class__, term)
+        _util.counters.constants += 1
     cls, term = CACHE[name]
     if not isinstance(instance, cls):
         raise ValueError(
@@ -73,13 +147,95 @@ def _mk_const(instance: Symbolic | Array[K, V], name: str) -> BitwuzlaTerm:
     return term
 
 
+def _substitution(
+    mapping: Mapping[str, Symbolic | Array[Any, Any]],
+) -> Dict[BitwuzlaTerm, BitwuzlaTerm]:
+    # Look up the variables to be replaced, and check that each value has the
+    # same type as the variable it replaces.
+    result: Dict[BitwuzlaTerm, BitwuzlaTerm] = {}
+    for name, value in mapping.items():
+        if name not in CACHE:
+            continue  # no expression can refer to this variable
+        cls, term = CACHE[name]
+        if not isinstance(value, cls):
+            raise ValueError(
+                f"cannot substitute {value.__class__.__name__} "
+                f'for {cls.__name__}("{name}")'
+            )
+        if isinstance(value, Array):
+            result[term] = value._flatten()  # pyright: ignore[reportPrivateUsage]
+        else:
+            result[term] = value._term  # pyright: ignore[reportPrivateUsage]
+    return result
+
+
+def _literal(term: BitwuzlaTerm) -> str:
+    # BZLA prints bitvector values in hex, as "#x...", if the width is a
+    # multiple of four, and in binary, as "#b...", otherwise. Boolean values
+    # are "true" or "false". Return the bits, in the same format as
+    # `get_value_str()`.
+    literal = term.dump("smt2")
+    if literal == "true" or literal == "false":
+        return "1" if literal == "true" else "0"
+    prefix, digits = literal[:2], literal[2:]
+    if prefix == "#x":
+        return format(int(digits, 16), f"0{len(digits) * 4}b")
+    assert prefix == "#b", literal
+    return digits
+
+
+def _segments(term: BitwuzlaTerm) -> Iterator[Segment]:
+    # Decompose a bitvector term into a sequence of constants and slices, from
+    # most to least significant.
+    width = term.get_sort().bv_get_size()
+    if term.is_bv_value():
+        yield Segment(width, int(_literal(term), 2))
+        return
+    kind = term.get_kind()
+    if kind == Kind.BV_CONCAT:
+        for child in term.get_children():
+            yield from _segments(child)
+    elif kind == Kind.BV_EXTRACT:
+        (source,) = term.get_children()
+        _, lo = term.get_indices()
+        yield Segment(width, 0, source, source, lo)
+    else:
+        yield Segment(width, 0, term, term)
+
+
+def _analyze(term: BitwuzlaTerm) -> _util.TermInfo:
+    return _util.analyze(
+        term,
+        lambda t: t,
+        lambda t: t.get_children(),
+        lambda t: t.get_symbol() if t.is_const() else None,
+    )
+
+
+def _assemble(segments: List[Segment]) -> BitwuzlaTerm:
+    terms: List[BitwuzlaTerm] = []
+    for s in segments:
+        if s.key is None:
+            terms.append(BZLA.mk_bv_value(BZLA.mk_bv_sort(s.width), s.value))
+        elif s.lo == 0 and s.width == s.source.get_sort().bv_get_size():
+            terms.append(s.source)
+        else:
+            indices = (s.lo + s.width - 1, s.lo)
+            terms.append(BZLA.mk_term(Kind.BV_EXTRACT, (s.source,), indices))
+    if len(terms) == 1:
+        return terms[0]
+    return BZLA.mk_term(Kind.BV_CONCAT, tuple(terms))
+
+
 class Symbolic(abc.ABC):
     _sort: ClassVar[BitwuzlaSort]
-    __slots__ = ("_term",)
+    __slots__ = ("_term", "_shadow", "_info")
 
     @abc.abstractmethod
-    def __init__(self, term: BitwuzlaTerm, /) -> None:
+    def __init__(self, term: BitwuzlaTerm, shadow: int | None = None, /) -> None:
         self._term: BitwuzlaTerm = term
+        self._shadow: int | None = shadow
+        self._info: _util.TermInfo | None = None
 
     @classmethod
     def _from_expr(cls, kind: Kind, *syms: Symbolic | Array[K, V]) -> Self:
@@ -87,10 +243,19 @@ class Symbolic(abc.ABC):
             kind,
             tuple(s._term for s in syms),  # pyright: ignore[reportPrivateUsage]
         )
+        _util.counters.terms[kind] += 1
         result = cls.__new__(cls)
-        Symbolic.__init__(result, term)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            shadow = ops.propagate(SHADOWS.get(kind), getattr(cls, "width", 0), *syms)
+            Symbolic.__init__(result, term, shadow)
         return result
 
+    @classmethod
+    @abc.abstractmethod
+    def _decode(cls, bits: str) -> bool | int: ...
+
     @abc.abstractmethod
     def _evaluate(self) -> bool | int: ...
 
@@ -116,14 +281,45 @@ class Symbolic(abc.ABC):
     def __hash__(self) -> int:
         return self._term.__hash__()
 
+    def free_constants(self) -> FrozenSet[str]:
+        return self._analyze().constants
+
+    def dag_size(self) -> int:
+        return self._analyze().size
+
+    def depth(self) -> int:
+        return self._analyze().depth
+
+    def _analyze(self) -> _util.TermInfo:
+        if self._info is None:
+            self._info = _analyze(self._term)
+        return self._info
+
+    def substitute(self, mapping: Mapping[str, Symbolic | Array[Any, Any]], /) -> Self:
+        return self.substitute_many((self,), mapping)[0]
+
+    @classmethod
+    def substitute_many(
+        cls, exprs: Iterable[S], mapping: Mapping[str, Symbolic | Array[Any, Any]], /
+    ) -> List[S]:
+        exprs = list(exprs)
+        subst = _substitution(mapping)
+        if not subst or not exprs:
+            return exprs
+        terms = BZLA.substitute([e._term for e in exprs], subst)
+        results: List[S] = []
+        for e, term in zip(exprs, terms):
+            result = e.__new__(e.__class__)
+            Symbolic.__init__(result, term)
+            results.append(result)
+        return results
+
     def reveal(self) -> bool | int | None:
-        global last_check
+        # Decode the literal directly: asking Bitwuzla for its value would
+        # require a call to `check_sat()`.
         if not self._term.is_bv_value():
             return None
-        if last_check is False:
-            assert BZLA.check_sat() == Result.SAT
-            last_check = True
-        return self._evaluate()
+        return self._decode(_literal(self._term))
 
 
 class Constraint(Symbolic):
@@ -133,12 +329,20 @@ class Constraint(Symbolic):
     def __init__(self, value: bool | str, /):
         if isinstance(value, str):
             term = _mk_const(self, value)
+            shadow = _util.seeded(value)
+            if shadow is not None:
+                shadow &= 1
         else:
             term = BZLA.mk_bv_value(self._sort, int(value))
-        super().__init__(term)
+            shadow = int(value)
+        super().__init__(term, shadow)
+
+    @classmethod
+    def _decode(cls, bits: str) -> bool:
+        return bool(int(bits, 2))
 
     def _evaluate(self) -> bool:
-        return bool(int(BZLA.get_value_str(self._term), 2))
+        return self._decode(BZLA.get_value_str(self._term))
 
     def __invert__(self) -> Self:
         return self._from_expr(Kind.NOT, self)
@@ -152,12 +356,42 @@ class Constraint(Symbolic):
     def __xor__(self, other: Self, /) -> Self:
         return self._from_expr(Kind.XOR, self, other)
 
+    @classmethod
+    def all(cls, constraints: Iterable[Constraint], /) -> Constraint:
+        return cls._reduce(Kind.AND, constraints, True)
+
+    @classmethod
+    def any(cls, constraints: Iterable[Constraint], /) -> Constraint:
+        return cls._reduce(Kind.OR, constraints, False)
+
+    @classmethod
+    def _reduce(
+        cls, kind: Kind, constraints: Iterable[Constraint], unit: bool
+    ) -> Constraint:
+        # Drop duplicates and constants, then build a single n-ary term.
+        args: Dict[BitwuzlaTerm, Constraint] = {}
+        for c in constraints:
+            if not c._term.is_bv_value():
+                args.setdefault(c._term, c)
+            elif c._term.is_bv_value_one() != unit:
+                return Constraint(not unit)
+        if not args:
+            return Constraint(unit)
+        elif len(args) == 1:
+            return next(iter(args.values()))
+        return Constraint._from_expr(kind, *args.values())
+
     def __bool__(self) -> Never:
         raise TypeError("cannot use Constraint in a boolean context")
 
     def ite(self, then: Symbolic, else_: Symbolic, /) -> Symbolic:
         return then._from_expr(Kind.ITE, self, then, else_)
 
+    def witness(self) -> bool | None:
+        if self._shadow is None:
+            return None
+        return bool(self._shadow)
+
 
 class BitVector(Symbolic, Generic[N], metaclass=BitVectorMeta):
     width: Final[int]  # type: ignore
@@ -167,14 +401,89 @@ class BitVector(Symbolic, Generic[N], metaclass=BitVectorMeta):
     def __init__(self, value: int | str, /) -> None:
         if isinstance(value, str):
             term = _mk_const(self, value)
+            shadow = _util.seeded(value)
         else:
             term = BZLA.mk_bv_value(self._sort, value)
-        super().__init__(term)
+            shadow = value
+        if shadow is not None:
+            shadow &= (1 << self.width) - 1
+        super().__init__(term, shadow)
 
     @classmethod
     def _make_sort(cls, width: int) -> BitwuzlaSort:
         return BZLA.mk_bv_sort(width)
 
+    @classmethod
+    def of_width(cls, width: int, /) -> type[Self]:
+        return _util.of_width(cls, width)
+
+    @classmethod
+    def concat(cls, *parts: BitVector[Any]) -> Self:
+        if sum(p.width for p in parts) != cls.width:
+            raise ValueError(
+                f"cannot concatenate {', '.join(p.__class__.__name__ for p in parts)} "
+                f"into {cls.__name__}"
+            )
+        segments = _util.merge_segments(s for p in parts for s in _segments(p._term))
+        term = _assemble(segments)
+        result = cls.__new__(cls)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            Symbolic.__init__(result, term, ops.propagate_concat(*parts))
+        return result
+
+    def extract(self, hi: int, lo: int, other: type[BitVector[M]], /) -> BitVector[M]:
+        if not 0 <= lo <= hi < self.width or hi - lo + 1 != other.width:
+            raise ValueError(
+                f"cannot extract bits {hi}:{lo} of {self.__class__.__name__} "
+                f"into {other.__name__}"
+            )
+        segments = _util.slice_segments(list(_segments(self._term)), lo, other.width)
+        term = _assemble(_util.merge_segments(segments))
+        result = other.__new__(other)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            shadow = ops.propagate_extract(self, lo, other.width)
+            Symbolic.__init__(result, term, shadow)
+        return result
+
+    @classmethod
+    def select(
+        cls, index: Uint[Any], table: Sequence[Self], default: Self | None = None, /
+    ) -> Self:
+        if default is None:
+            default = cls(0)
+        if (i := index.reveal()) is not None:
+            return table[i] if i < len(table) else default
+        table = table[: 1 << index.width]
+        if not table:
+            return default
+
+        one = BZLA.mk_bv_value(BZLA.mk_bv_sort(1), 1)
+        term = _util.mux(
+            [t._term for t in table],
+            lambda j: BZLA.mk_term(
+                Kind.EQUAL,
+                (BZLA.mk_term(Kind.BV_EXTRACT, (index._term,), (j, j)), one),
+            ),
+            lambda c, t, e: BZLA.mk_term(Kind.ITE, (c, t, e)),
+            lambda t: t,
+        )
+        if len(table) < 1 << index.width:
+            limit = BZLA.mk_bv_value(index._sort, len(table))
+            guard = BZLA.mk_term(Kind.BV_ULT, (index._term, limit))
+            term = BZLA.mk_term(Kind.ITE, (guard, term, default._term))
+
+        result = cls.__new__(cls)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            shadow = ops.propagate_select(index, table, default)
+            Symbolic.__init__(result, term, shadow)
+        return result
+
     @abc.abstractmethod
     def __lt__(self, other: Self, /) -> Constraint: ...
 
@@ -218,8 +527,12 @@ class BitVector(Symbolic, Generic[N], metaclass=BitVectorMeta):
 class Uint(BitVector[N]):
     __slots__ = ()
 
+    @classmethod
+    def _decode(cls, bits: str) -> int:
+        return int(bits, 2)
+
     def _evaluate(self) -> int:
-        return int(BZLA.get_value_str(self._term), 2)
+        return self._decode(BZLA.get_value_str(self._term))
 
     def __lt__(self, other: Self, /) -> Constraint:
         return Constraint._from_expr(Kind.BV_ULT, self, other)
@@ -245,19 +558,29 @@ class Uint(BitVector[N]):
             term = BZLA.mk_term(Kind.BV_EXTRACT, (self._term,), (other.width - 1, 0))
         else:
             term = self._term
+        shadow = self._shadow
+        if shadow is not None:
+            shadow &= (1 << other.width) - 1
         result = other.__new__(other)
-        Symbolic.__init__(result, term)
+        Symbolic.__init__(result, term, shadow)
         return result
 
+    def witness(self) -> int | None:
+        return self._shadow
+
 
 class Int(BitVector[N]):
     __slots__ = ()
 
-    def _evaluate(self) -> int:
-        i = int(BZLA.get_value_str(self._term), 2)
-        if i & (1 << (self.width - 1)) == 0:
+    @classmethod
+    def _decode(cls, bits: str) -> int:
+        i = int(bits, 2)
+        if i & (1 << (cls.width - 1)) == 0:
             return i
-        return i - (1 << self.width)
+        return i - (1 << cls.width)
+
+    def _evaluate(self) -> int:
+        return self._decode(BZLA.get_value_str(self._term))
 
     def __lt__(self, other: Self, /) -> Constraint:
         return Constraint._from_expr(Kind.BV_SLT, self, other)
@@ -283,10 +606,18 @@ class Int(BitVector[N]):
             term = BZLA.mk_term(Kind.BV_EXTRACT, (self._term,), (other.width - 1, 0))
         else:
             term = self._term
+        shadow = self._shadow
+        if shadow is not None:
+            shadow = ops.signed(shadow, self.width) & ((1 << other.width) - 1)
         result = other.__new__(other)
-        Symbolic.__init__(result, term)
+        Symbolic.__init__(result, term, shadow)
         return result
 
+    def witness(self) -> int | None:
+        if self._shadow is None:
+            return None
+        return ops.signed(self._shadow, self.width)
+
 
 K = TypeVar("K", bound=Union[Uint[Any], Int[Any]])
 V = TypeVar("V", bound=Union[Uint[Any], Int[Any]])
@@ -296,34 +627,72 @@ class Array(Generic[K, V], metaclass=ArrayMeta):
     _key: type[K]
     _value: type[V]
     _sort: ClassVar[BitwuzlaSort]
-    __slots__ = ("_term",)
+    __slots__ = ("_term", "_items", "_flat", "_shadow")
 
     def __init__(self, value: V | str, /) -> None:
+        shadow = None
         if isinstance(value, str):
             term = _mk_const(self, value)
         else:
             term = BZLA.mk_const_array(self._sort, value._term)  # pyright: ignore[reportPrivateUsage]
+            if _util.current_seed is not None:
+                shadow = ops.propagate_array(value)
+        # Stores to concrete keys are kept in a dict, on top of the base term.
+        # They're flattened into a chain of stores only when necessary, and the
+        # result is cached until the next store.
         self._term: BitwuzlaTerm = term
+        self._items: Dict[int, Tuple[K, V]] = {}
+        self._flat: BitwuzlaTerm | None = term
+        self._shadow: Tuple[int, Dict[int, int]] | None = shadow
 
     @classmethod
     def _make_sort(cls, key: K, value: V) -> BitwuzlaSort:
         return BZLA.mk_array_sort(key._sort, value._sort)  # pyright: ignore[reportPrivateUsage]
 
+    def _flatten(self) -> BitwuzlaTerm:
+        if self._flat is None:
+            term = self._term
+            for key, value in self._items.values():
+                term = BZLA.mk_term(
+                    Kind.ARRAY_STORE,
+                    (term, key._term, value._term),  # pyright: ignore[reportPrivateUsage]
+                )
+            self._flat = term
+        return self._flat
+
+    def _evaluate(self) -> DefaultDict[int, int]:
+        # Bitwuzla returns a dict of bitstrings. If the array has a default
+        # value, the dict is a defaultdict that computes it on demand.
+        raw = BZLA.get_value_str(self._flatten())
+        k, v = self._key, self._value
+        items = {k._decode(a): v._decode(b) for a, b in raw.items()}  # pyright: ignore[reportPrivateUsage]
+        if (factory := getattr(raw, "default_factory", None)) is None:
+            default = 0
+        else:
+            default = v._decode(factory())  # pyright: ignore[reportPrivateUsage]
+        return defaultdict(lambda: default, items)
+
     def __copy__(self) -> Self:
         result = self.__new__(self.__class__)
         result._term = self._term
+        result._items = self._items.copy()
+        result._flat = self._flat
+        if (shadow := self._shadow) is not None:
+            shadow = (shadow[0], shadow[1].copy())
+        result._shadow = shadow
         return result
 
     def __deepcopy__(self, memo: Any, /) -> Self:
         return self.__copy__()
 
     def __repr__(self) -> str:
-        if (sym := self._term.get_symbol()) is not None:
+        term = self._flatten()
+        if (sym := term.get_symbol()) is not None:
             r = sym
-        elif self._term.is_const_array():
-            r = self._term.get_children()[0].dump("smt2")
+        elif term.is_const_array():
+            r = term.get_children()[0].dump("smt2")
         else:
-            r = self._term.dump("smt2")
+            r = term.dump("smt2")
         return f"{self.__class__.__name__}(`{r}`)"
 
     def __eq__(self, other: Never, /) -> Never:
@@ -333,52 +702,329 @@ class Array(Generic[K, V], metaclass=ArrayMeta):
         raise TypeError("arrays cannot be compared for equality.")
 
     def __getitem__(self, key: K) -> V:
-        return self._value._from_expr(  # pyright: ignore[reportPrivateUsage]
-            Kind.ARRAY_SELECT, self, key
+        if (k := key.reveal()) is None:
+            base = self._flatten()
+        elif k in self._items:
+            return self._items[k][1]
+        else:
+            # Skip over stores to other concrete keys, which can't alias.
+            base = self._term
+        term = BZLA.mk_term(
+            Kind.ARRAY_SELECT,
+            (base, key._term),  # pyright: ignore[reportPrivateUsage]
         )
+        result = self._value.__new__(self._value)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            Symbolic.__init__(result, term, ops.propagate_load(self, key))
+        return result
 
     def __setitem__(self, key: K, value: V) -> None:
+        self._shadow = ops.propagate_store(self, key, value)
+        if (k := key.reveal()) is not None:
+            # Overwrites any earlier store to the same key.
+            self._items[k] = (key, value)
+            self._flat = None
+            return
         self._term = BZLA.mk_term(
             Kind.ARRAY_STORE,
-            (self._term, key._term, value._term),  # pyright: ignore[reportPrivateUsage]
+            (self._flatten(), key._term, value._term),  # pyright: ignore[reportPrivateUsage]
         )
+        self._items = {}
+        self._flat = self._term
+
+
+def _sort_name(cls: Any) -> str:
+    if cls._sort.is_array():
+        return f"(Array {_sort_name(cls._key)} {_sort_name(cls._value)})"
+    elif cls is Constraint:
+        return "(_ BitVec 1)"  # Bitwuzla dumps Boolean constants this way
+    return f"(_ BitVec {cls.width})"
+
+
+def _is_predicate(term: BitwuzlaTerm) -> bool:
+    # Bitwuzla represents Booleans as 1-bit vectors, and only prints a term as a
+    # Boolean if it's a predicate or a connective over predicates.
+    stack, seen = [term], {term}
+    while stack:
+        t = stack.pop()
+        kind = t.get_kind()
+        if kind in CONNECTIVES:
+            children = t.get_children()
+        elif kind == Kind.ITE:
+            children = t.get_children()[1:]
+        elif kind in PREDICATES:
+            continue
+        else:
+            return False
+        stack.extend(c for c in children if c not in seen)
+        seen.update(children)
+    return True
+
+
+def _smtlib_term(term: BitwuzlaTerm) -> str:
+    # Constants are dumped as declarations, so refer to them by name instead.
+    if (text := term.get_symbol()) is None:
+        text = term.dump("smt2")
+    return text if _is_predicate(term) else f"(= {text} #b1)"
+
+
+def _array_value(cls: Any, raw: Any) -> BitwuzlaTerm:
+    # Build an array term from a dict of bitstrings, as returned by Bitwuzla.
+    k, v = cls._key, cls._value
+    factory = getattr(raw, "default_factory", None)
+    default = 0 if factory is None else int(factory(), 2)
+    term = BZLA.mk_const_array(cls._sort, BZLA.mk_bv_value(v._sort, default))
+    for a, b in raw.items():
+        key, value = (
+            BZLA.mk_bv_value(k._sort, int(a, 2)),
+            BZLA.mk_bv_value(v._sort, int(b, 2)),
+        )
+        term = BZLA.mk_term(Kind.ARRAY_STORE, (term, key, value))
+    return term
 
 
-class Solver:
-    __slots__ = ("_assertions", "_current")
+def _zero(cls: Any, term: BitwuzlaTerm) -> BitwuzlaTerm:
+    if term.is_array():
+        return BZLA.mk_const_array(cls._sort, BZLA.mk_bv_value(cls._value._sort, 0))
+    return BZLA.mk_bv_value(cls._sort, 0)
+
+
+# Bitwuzla's engine option for each of its keys in `Options`.
+OPTIONS: Dict[str, Option] = {
+    "engine": Option.ENGINE,
+    "sat_engine": Option.SAT_ENGINE,
+    "seed": Option.SEED,
+    "rw_level": Option.RW_LEVEL,
+    "pp_ackermann": Option.PP_ACKERMANN,
+    "pp_beta_reduce": Option.PP_BETA_REDUCE,
+    "pp_eliminate_extracts": Option.PP_ELIMINATE_EXTRACTS,
+    "pp_eliminate_ites": Option.PP_ELIMINATE_ITES,
+    "pp_extract_lambdas": Option.PP_EXTRACT_LAMBDAS,
+    "pp_merge_lambdas": Option.PP_MERGE_LAMBDAS,
+    "pp_nondestr_subst": Option.PP_NONDESTR_SUBST,
+    "pp_normalize_add": Option.PP_NORMALIZE_ADD,
+    "pp_skeleton_preproc": Option.PP_SKELETON_PREPROC,
+    "pp_var_subst": Option.PP_VAR_SUBST,
+    "fun_preprop": Option.FUN_PREPROP,
+    "fun_presls": Option.FUN_PRESLS,
+    "prop_nprops": Option.PROP_NPROPS,
+    "prop_nupdates": Option.PROP_NUPDATES,
+}
+
+# For each engine option that a check has changed on BZLA, which is shared by
+# every solver: its default value, and the value it's currently set to. See
+# `_configure()`.
+DEFAULTS: Dict[Option, Any] = {}
+CONFIGURED: Dict[Option, Any] = {}
+
+
+def _options(options: Options | None, per_check: bool = False) -> Dict[Option, Any]:
+    # Validate the options and convert the Bitwuzla ones to engine options.
+    # Options for Z3 are ignored.
+    if not options:
+        return {}
+    _util.check_options(options, per_check)
+    result: Dict[Option, Any] = {}
+    for key, value in options.items():
+        if key in _util.SOLVER_OPTIONS:
+            continue
+        elif (opt := OPTIONS.get(key)) is None:
+            raise ValueError(f"solver option not supported by Bitwuzla: {key}")
+        result[opt] = int(value) if isinstance(value, bool) else value
+    return result
+
+
+def _configure(options: Dict[Option, Any]) -> None:
+    # Apply the given options to BZLA before a check, and restore any others
+    # that an earlier check changed. Most checks use no options at all, and
+    # this does nothing.
+    for opt in options:
+        if opt not in DEFAULTS:
+            DEFAULTS[opt] = BZLA.get_option(opt)
+    for opt, default in DEFAULTS.items():
+        value = options.get(opt, default)
+        if CONFIGURED.get(opt, default) != value:
+            BZLA.set_option(opt, value)
+            CONFIGURED[opt] = value
 
-    def __init__(self) -> None:
+
+class Solver:
+    __slots__ = (
+        "_assertions",
+        "_current",
+        "_failed",
+        "_assumed",
+        "_snapshot",
+        "_options",
+        "_core",
+    )
+
+    def __init__(self, options: Options | None = None) -> None:
+        self._options = _options(options)
         self._assertions: List[Constraint] = []
         self._current = False
+        # The assumptions passed to the last check, if it was unsatisfiable.
+        self._failed: Tuple[Constraint, ...] | None = None
+        # The assumptions passed to the last check, if it was satisfiable, and
+        # the values of its constants once another check has replaced the
+        # model in BZLA. See `_save()`.
+        self._assumed: Tuple[Constraint, ...] = ()
+        self._snapshot: Dict[BitwuzlaTerm, BitwuzlaTerm] | None = None
+        # The failed assumptions of the last check, once another check has
+        # replaced them in BZLA. See `_save_core()`.
+        self._core: List[Constraint] | None = None
 
     def add(self, assertion: Constraint, /) -> None:
         self._assertions.append(assertion)
-        self._current = False
+        self._current, self._failed, self._snapshot = False, None, None
+        self._core = None
 
-    def check(self, *assumptions: Constraint) -> bool:
+    def check(self, *assumptions: Constraint, options: Options | None = None) -> bool:
         # Unfortunately, we have only the single global solver instance, BZLA,
         # because all terms are tied to it. This means we can't build up
         # assumptions using `assert_formula`. Instead, assume them all on every
         # call to `check`:
-        global last_check
-        self._current, last_check = False, False
+        global last_check, last_unsat
+        if isinstance(last_check, Solver) and last_check is not self:
+            last_check._save()
+        if last_unsat is not None and last_unsat is not self:
+            last_unsat._save_core()
+        self._current, last_check, last_unsat = False, False, None
+        self._failed, self._snapshot, self._core = None, None, None
+        if options:
+            _configure({**self._options, **_options(options, True)})
+        else:
+            _configure(self._options)
 
         for c in self._assertions:
             BZLA.assume_formula(c._term)  # pyright: ignore[reportPrivateUsage]
         for c in assumptions:
             BZLA.assume_formula(c._term)  # pyright: ignore[reportPrivateUsage]
 
+        start = time.perf_counter()
         r = BZLA.check_sat()
+        elapsed = _util.counters.check(OUTCOMES[r], start)
         if r == Result.SAT:
             self._current, last_check = True, self
-            return True
+            self._assumed = assumptions
         elif r == Result.UNSAT:
-            return False
-        else:
+            self._failed, last_unsat = assumptions, self
+        if elapsed > _util.counters.threshold:
+            query = functools.partial(self._smtlib, assumptions)
+            _util.counters.capture(query, elapsed, OUTCOMES[r], {})
+        if r == Result.UNKNOWN:
             raise RuntimeError("Bitwuzla could not solve this instance")
-
-    def evaluate(self, bv: BitVector[N], /) -> int:
-        global last_check
-        if not self._current or last_check is not self:
+        return r == Result.SAT
+
+    def _smtlib(self, assumptions: Tuple[Constraint, ...]) -> str:
+        constraints = (*self._assertions, *assumptions)
+        names: Set[str] = set()
+        for c in constraints:
+            names.update(c._analyze().constants)  # pyright: ignore[reportPrivateUsage]
+        declarations = {n: _sort_name(CACHE[n][0]) for n in sorted(names)}
+        terms = (_smtlib_term(c._term) for c in constraints)  # pyright: ignore[reportPrivateUsage]
+        return _util.smtlib(declarations, terms)
+
+    def failed_assumptions(self) -> List[Constraint]:
+        if self._core is not None:
+            return list(self._core)
+        elif self._failed is None or last_unsat is not self:
+            raise ValueError("solver is not ready for unsat core extraction.")
+        # The solver's assertions are assumed too, but aren't reported. This
+        # only needs incremental mode, not PRODUCE_UNSAT_CORES.
+        failed = set(BZLA.get_unsat_assumptions())
+        return [c for c in self._failed if c._term in failed]  # pyright: ignore[reportPrivateUsage]
+
+    def minimize(self, expr: BitVector[N], /) -> int | None:
+        return _util.optimize(self, expr, isinstance(expr, Int), False)
+
+    def maximize(self, expr: BitVector[N], /) -> int | None:
+        return _util.optimize(self, expr, isinstance(expr, Int), True)
+
+    def iter_models(
+        self,
+        terms: Sequence[BitVector[Any]],
+        /,
+        limit: int | None = None,
+        seed: int | None = None,
+    ) -> Generator[Tuple[int, ...]]:
+        n = len(self._assertions)
+        try:
+            yield from _util.iter_models(self, terms, limit, seed)
+        finally:
+            del self._assertions[n:]
+
+    def evaluate(
+        self, bv: BitVector[N] | Array[K, V], /
+    ) -> int | DefaultDict[int, int]:
+        if not self._current:
             raise ValueError("solver is not ready for model evaluation.")
-        return bv._evaluate()  # pyright: ignore[reportPrivateUsage]
+        elif last_check is self:
+            return bv._evaluate()  # pyright: ignore[reportPrivateUsage]
+        assert self._snapshot is not None
+        return self._evaluate_snapshot(bv)
+
+    def _save(self) -> None:
+        # BZLA is about to be checked again, which will replace this solver's
+        # model. Record the values of the constants that appear in the checked
+        # formulas, since that's enough to evaluate any term later on.
+        if not self._current or self._snapshot is not None:
+            return
+        snapshot: Dict[BitwuzlaTerm, BitwuzlaTerm] = {}
+        for c in (*self._assertions, *self._assumed):
+            for name in c._analyze().constants:  # pyright: ignore[reportPrivateUsage]
+                cls, term = CACHE[name]
+                if term in snapshot:
+                    continue
+                elif term.is_array():
+                    value = BZLA.get_value_str(term)
+                    snapshot[term] = _array_value(cls, value)
+                else:
+                    snapshot[term] = BZLA.get_value(term)
+        self._snapshot = snapshot
+
+    def _save_core(self) -> None:
+        # BZLA is about to be checked again, which will discard the failed
+        # assumptions of this solver's last check. Record them first.
+        if self._core is None and self._failed is not None:
+            self._core = self.failed_assumptions()
+
+    def _evaluate_snapshot(
+        self, bv: BitVector[N] | Array[K, V]
+    ) -> int | DefaultDict[int, int]:
+        # Replace every constant with its saved value, or with zero if it
+        # wasn't in the checked formulas (so any value would do). The result is
+        # a ground term, which can be evaluated in whatever model BZLA has now.
+        global last_check, last_unsat
+        assert self._snapshot is not None
+        if isinstance(bv, Array):
+            term = bv._flatten()  # pyright: ignore[reportPrivateUsage]
+        else:
+            term = bv._term  # pyright: ignore[reportPrivateUsage]
+        subst: Dict[BitwuzlaTerm, BitwuzlaTerm] = {}
+        for name in _analyze(term).constants:
+            cls, const = CACHE[name]
+            if const not in self._snapshot:
+                self._snapshot[const] = _zero(cls, const)
+            subst[const] = self._snapshot[const]
+        if subst:
+            (term,) = BZLA.substitute([term], subst)
+        if not isinstance(bv, Array) and term.is_bv_value():
+            return bv._decode(_literal(term))  # pyright: ignore[reportPrivateUsage]
+        if last_check is False:
+            # There's no model to evaluate in, so check with no assumptions.
+            if last_unsat is not None:
+                last_unsat._save_core()
+            r = BZLA.check_sat()
+            if r != Result.SAT:
+                raise RuntimeError(f"empty check returned {OUTCOMES[r]}")
+            last_check, last_unsat = True, None
+
+        result = bv.__new__(bv.__class__)
+        if isinstance(result, Array):
+            result._term, result._items, result._flat = term, {}, term  # pyright: ignore[reportPrivateUsage]
+        else:
+            Symbolic.__init__(result, term)
+        return result._evaluate()  # pyright: ignore[reportPrivateUsage]
@@ -0,0 +1,1049 @@
+"""
+Backend implementation in pure Python, for concrete evaluation.
+
+Concrete values are represented directly as Python ints, so operations on them
+cost no more than the equivalent integer arithmetic. Symbolic variables are
+supported too, but only as simple expression trees: this backend is intended
+for fuzzing and concrete replay, and its solver is limited to small searches.
+"""
+
+from __future__ import annotations
+
+import abc
+import functools
+import itertools
+import time
+from collections import defaultdict
+from typing import (
+    Any,
+    ClassVar,
+    Container,
+    DefaultDict,
+    Dict,
+    Final,
+    FrozenSet,
+    Generator,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from typing_extensions import Never, Self
+
+from . import _ops as ops
+from . import _util
+from ._memory import Memory as Memory
+from ._util import ArrayMeta, BitVectorMeta, Segment
+from ._util import Options as Options
+from ._util import concolic as concolic
+
+N = TypeVar("N", bound=int)
+M = TypeVar("M", bound=int)
+S = TypeVar("S", bound="Symbolic")
+
+# pyright: reportIncompatibleMethodOverride=false
+# pyright: reportUnknownArgumentType=false
+# pyright: reportUnknownLambdaType=false
+# pyright: reportUnknownMemberType=false
+# pyright: reportUnknownVariableType=false
+
+# A term is either a concrete value (an int) or a symbolic expression, which is
+# represented as a tuple: (op, sort, *args). For bitvectors, the sort is the
+# width; for booleans it's zero; and for arrays it's a (key, value) pair of
+# sorts. Concrete arguments to a symbolic expression are wrapped in a _LIT node
+# so that every node carries its own sort.
+Term = Union[int, Tuple[Any, ...]]
+
+
+_VAR = ops.Op("var", lambda w: 0)
+_LIT = ops.Op("lit", lambda w: 0)
+_CONST_ARRAY = ops.Op("const", lambda w, d: (d, {}))
+_SELECT = ops.Op("select", lambda w, a, k: a[1].get(k, a[0]))
+_STORE = ops.Op("store", lambda w, a, k, v: (a[0], {**a[1], k: v}))
+
+
+def _lift(term: Term, sort: Any) -> Tuple[Any, ...]:
+    if type(term) is int:
+        return (_LIT, sort, term)
+    return term  # pyright: ignore[reportReturnType]
+
+
+def _unlift(term: Tuple[Any, ...]) -> Term:
+    if term[0] is _LIT:
+        return term[2]
+    return term
+
+
+def _apply(op: ops.Op, sort: int, *args: Tuple[Term, Any]) -> Term:
+    for term, _ in args:
+        if type(term) is not int:
+            break
+    else:
+        return op.fn(args[0][1], *(t for t, _ in args)) & ops.mask(sort)
+
+    if op is ops.AND or op is ops.OR:
+        absorb = 0 if op is ops.AND else 1
+        if any(t == absorb for t, _ in args):
+            return absorb
+        args = tuple(a for a in args if type(a[0]) is not int)
+        if len(args) == 1:
+            return args[0][0]
+    elif op is ops.EQ or op is ops.DISTINCT:
+        (a, _), (b, _) = args
+        if _equal(a, b):
+            return int(op is ops.EQ)
+    elif op is ops.ITE:
+        (c, _), (t, _), (e, _) = args
+        if type(c) is int:
+            return t if c else e
+        elif _equal(t, e):
+            return t
+    return (op, sort, *(_lift(t, s) for t, s in args))
+
+
+def _select(array: Tuple[Any, ...], key: Term) -> Term:
+    if type(key) is not int:
+        return (_SELECT, array[1][1], array, key)
+    # Skip over stores to other concrete keys, which can't alias.
+    term = array
+    while term[0] is _STORE and term[3][0] is _LIT:
+        if term[3][2] == key:
+            return _unlift(term[4])
+        term = term[2]
+    if term[0] is _CONST_ARRAY:
+        return _unlift(term[2])
+    return (_SELECT, array[1][1], term, (_LIT, array[1][0], key))
+
+
+def _postorder(
+    term: Tuple[Any, ...], done: Container[int]
+) -> Iterator[Tuple[Any, ...]]:
+    # Yield the symbolic subterms of `term`, children first, using an explicit
+    # stack so that deep terms don't overflow Python's. Terms whose ids are in
+    # `done` are skipped: callers record each term there as it's yielded, so
+    # shared subterms are only visited once.
+    stack: List[Tuple[Tuple[Any, ...], bool]] = [(term, False)]
+    while stack:
+        t, expanded = stack.pop()
+        if id(t) in done:
+            continue
+        elif expanded:
+            yield t
+            continue
+        stack.append((t, True))
+        stack.extend((a, False) for a in t[2:] if type(a) is tuple)
+
+
+def _evaluate(term: Term, model: Dict[str, Any], memo: Dict[int, Any]) -> Any:
+    if type(term) is int:
+        return term
+    for t in _postorder(term, memo):  # pyright: ignore[reportArgumentType]
+        op, sort, *args = t
+        if op is _LIT:
+            value = args[0]
+        elif op is _VAR:
+            value = model.get(args[0], (0, {}) if isinstance(sort, tuple) else 0)
+        else:
+            width = args[0][1] if type(args[0]) is tuple else 0
+            value = op.fn(
+                width, *(memo[id(a)] if type(a) is tuple else a for a in args)
+            )
+            if type(sort) is int:
+                value &= ops.mask(sort)
+        memo[id(t)] = value
+    return memo[id(term)]
+
+
+def _equal(a: Term, b: Term) -> bool:
+    # Compare terms by structure, comparing each pair of shared subterms once.
+    # (Comparing the tuples directly would take time proportional to the size
+    # of the tree.)
+    pairs: List[Tuple[Any, Any]] = [(a, b)]
+    seen: Set[Tuple[int, int]] = set()
+    while pairs:
+        a, b = pairs.pop()
+        if a is b or (id(a), id(b)) in seen:
+            continue
+        elif type(a) is not tuple or type(b) is not tuple:
+            if a != b:
+                return False
+            continue
+        elif len(a) != len(b) or a[0] is not b[0] or a[1] != b[1]:
+            return False
+        seen.add((id(a), id(b)))
+        pairs.extend(zip(a[2:], b[2:]))
+    return True
+
+
+def _hash(term: Term) -> int:
+    # Hash a term by structure, visiting each shared subterm once, for the same
+    # reason.
+    if type(term) is int:
+        return hash(term)
+    memo: Dict[int, int] = {}
+    for t in _postorder(term, memo):  # pyright: ignore[reportArgumentType]
+        args = (memo[id(a)] if type(a) is tuple else a for a in t[2:])
+        memo[id(t)] = hash((t[0], t[1], *args))
+    return memo[id(term)]
+
+
+def _literal(value: int, sort: int) -> str:
+    if sort == 0:
+        return "true" if value else "false"
+    elif sort % 4 == 0:
+        return "#x" + format(value, f"0{sort // 4}x")
+    return "#b" + format(value, f"0{sort}b")
+
+
+def _sort_name(sort: Any) -> str:
+    if isinstance(sort, tuple):
+        k, v = sort
+        return f"(Array {_sort_name(k)} {_sort_name(v)})"
+    elif sort == 0:
+        return "Bool"
+    return f"(_ BitVec {sort})"
+
+
+def _dump(term: Tuple[Any, ...]) -> str:
+    # Subterms with more than one parent are bound with `let` and printed once,
+    # so the output is linear in the size of the DAG rather than the tree.
+    parents: Dict[int, int] = {}
+    seen: Set[int] = set()
+    for t in _postorder(term, seen):
+        seen.add(id(t))
+        for a in t[2:]:
+            if type(a) is tuple:
+                parents[id(a)] = parents.get(id(a), 0) + 1
+    text: Dict[int, str] = {}
+    bindings: List[str] = []
+    for t in _postorder(term, text):
+        text[id(t)] = r = _render(t, text)
+        if parents.get(id(t), 0) > 1 and t[0] is not _LIT and t[0] is not _VAR:
+            text[id(t)] = f"$e{len(bindings) + 1}"
+            bindings.append(f"(let (({text[id(t)]} {r})) ")
+    return "".join(bindings) + text[id(term)] + ")" * len(bindings)
+
+
+def _render(term: Tuple[Any, ...], text: Dict[int, str]) -> str:
+    # Print a single node, given the text of each of its children.
+    op, sort, *args = term
+    if op is _LIT:
+        return _literal(args[0], sort)
+    elif op is _VAR:
+        return args[0]
+    elif op is _CONST_ARRAY:
+        return f"((as const {_sort_name(sort)}) {text[id(args[0])]})"
+    elif op is ops.EXTRACT:
+        child, lo = args
+        return f"((_ extract {lo + sort - 1} {lo}) {text[id(child)]})"
+    elif op is ops.CONCAT:
+        hi, lo, _ = args
+        return f"(concat {text[id(hi)]} {text[id(lo)]})"
+    elif op is ops.ZERO_EXTEND or op is ops.SIGN_EXTEND:
+        (child,) = args
+        return f"((_ {op.name} {sort - child[1]}) {text[id(child)]})"
+    return f"({op.name} {' '.join(text[id(a)] for a in args)})"
+
+
+def _substitute(term: Term, subst: Dict[str, Term], memo: Dict[int, Term]) -> Term:
+    # Rebuild the term bottom-up with the given variables replaced, simplifying
+    # along the way. Subterms that are unaffected are returned as-is.
+    if type(term) is int:
+        return term
+    for t in _postorder(term, memo):  # pyright: ignore[reportArgumentType]
+        memo[id(t)] = _substitute_node(t, subst, memo)
+    return memo[id(term)]
+
+
+def _substitute_node(
+    term: Tuple[Any, ...], subst: Dict[str, Term], memo: Dict[int, Term]
+) -> Term:
+    # Rebuild a single node, given the rebuilt children in `memo`.
+    op, sort, *args = term
+    if op is _LIT:
+        return args[0]
+    elif op is _VAR:
+        return subst.get(args[0], term)
+
+    if op is ops.EXTRACT or op is ops.CONCAT:
+        children = [memo[id(a)] for a in args[:-1]]
+    else:
+        children = [memo[id(a)] for a in args]
+    if all(c is _unlift(a) for c, a in zip(children, args)):
+        return term
+    elif op is ops.EXTRACT:
+        (child,), lo = children, args[-1]
+        segments = list(_segments(child, args[0][1]))
+        segments = _util.slice_segments(segments, lo, sort)
+        return _assemble(_util.merge_segments(segments))
+    elif op is ops.CONCAT:
+        (hi, lo), w = children, args[-1]
+        segments = [*_segments(hi, sort - w), *_segments(lo, w)]
+        return _assemble(_util.merge_segments(segments))
+    elif op is _SELECT:
+        return _select(_lift(children[0], args[0][1]), children[1])
+    elif isinstance(sort, tuple):
+        return (op, sort, *(_lift(c, a[1]) for c, a in zip(children, args)))
+    return _apply(op, sort, *zip(children, (a[1] for a in args)))
+
+
+def _constants(terms: Iterable[Term]) -> Dict[str, Any]:
+    # Return the name and sort of every variable in the given terms.
+    seen: Set[int] = set()
+    result: Dict[str, Any] = {}
+    queue = [t for t in terms if type(t) is tuple]
+    while queue:
+        term = queue.pop()
+        if id(term) in seen:
+            continue
+        seen.add(id(term))
+        if term[0] is _VAR:
+            result[term[2]] = term[1]
+        else:
+            queue.extend(a for a in term[2:] if type(a) is tuple)
+    return result
+
+
+def _literals(terms: Iterable[Term]) -> Set[int]:
+    # Return the set of concrete values that appear in the given terms.
+    seen: Set[int] = set()
+    result: Set[int] = set()
+    queue = [t for t in terms if type(t) is tuple]
+    while queue:
+        term = queue.pop()
+        if id(term) in seen:
+            continue
+        seen.add(id(term))
+        if term[0] is _LIT:
+            result.add(term[2])
+        elif term[0] is not _VAR:
+            queue.extend(a for a in term[2:] if type(a) is tuple)
+    return result
+
+
+def _segments(term: Term, width: int) -> Iterator[Segment]:
+    # Decompose a bitvector term into a sequence of constants and slices, from
+    # most to least significant.
+    if isinstance(term, int):
+        yield Segment(width, term)
+    elif term[0] is _LIT:
+        yield Segment(width, term[2])
+    elif term[0] is ops.CONCAT:
+        _, _, hi, lo, w = term
+        yield from _segments(hi, width - w)
+        yield from _segments(lo, w)
+    elif term[0] is ops.EXTRACT:
+        _, _, source, lo = term
+        yield Segment(width, 0, source, id(source), lo)
+    else:
+        yield Segment(width, 0, term, id(term))
+
+
+def _assemble(segments: List[Segment]) -> Term:
+    term: Term = 0
+    width = 0
+    for s in segments:
+        if s.key is None:
+            t: Term = s.value
+        elif s.lo == 0 and s.width == s.source[1]:
+            t = s.source
+        else:
+            t = (ops.EXTRACT, s.width, s.source, s.lo)
+        if width == 0:
+            term = t
+        elif type(term) is int and type(t) is int:
+            term = (term << s.width) | t
+        else:
+            term = (
+                ops.CONCAT,
+                width + s.width,
+                _lift(term, width),
+                _lift(t, s.width),
+                s.width,
+            )
+        width += s.width
+    return term
+
+
+CACHE: Dict[str, Tuple[type, Term]] = {}
+
+
+def _mk_const(instance: Symbolic | Array[K, V], name: str) -> Term:
+    if name not in CACHE:
+        term = (_VAR, instance._sort, name)  # pyright: ignore[reportPrivateUsage]
+        CACHE[name] = (instance.__class__, term)
+        _util.counters.constants += 1
+    cls, term = CACHE[name]
+    if not isinstance(instance, cls):
+        raise ValueError(
+            f'cannot create {instance.__class__.__name__}("{name}") '
+            f'because {cls.__name__}("{name}") already exists'
+        )
+    return term
+
+
+def _substitution(mapping: Mapping[str, Symbolic | Array[Any, Any]]) -> Dict[str, Term]:
+    # Look up the variables to be replaced, and check that each value has the
+    # same type as the variable it replaces.
+    result: Dict[str, Term] = {}
+    for name, value in mapping.items():
+        if name not in CACHE:
+            continue  # no expression can refer to this variable
+        cls, _ = CACHE[name]
+        if not isinstance(value, cls):
+            raise ValueError(
+                f"cannot substitute {value.__class__.__name__} "
+                f'for {cls.__name__}("{name}")'
+            )
+        if isinstance(value, Array):
+            result[name] = value._flatten()  # pyright: ignore[reportPrivateUsage]
+        else:
+            result[name] = value._term  # pyright: ignore[reportPrivateUsage]
+    return result
+
+
+class Symbolic(abc.ABC):
+    _sort: ClassVar[Any]
+    __slots__ = ("_term", "_shadow", "_info")
+
+    @abc.abstractmethod
+    def __init__(self, term: Term, shadow: int | None = None, /) -> None:
+        # Concrete terms are their own shadow values.
+        self._term: Term = term
+        self._shadow: int | None = term if type(term) is int else shadow
+        self._info: _util.TermInfo | None = None
+
+    @classmethod
+    def _from_expr(cls, op: ops.Op, *syms: Symbolic) -> Self:
+        term = _apply(op, cls._sort, *((s._term, s._sort) for s in syms))
+        _util.counters.terms[op] += 1
+        result = cls.__new__(cls)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            Symbolic.__init__(result, term, ops.propagate(op, cls._sort, *syms))
+        return result
+
+    def __copy__(self) -> Self:
+        return self
+
+    def __deepcopy__(self, memo: Any, /) -> Self:
+        return self
+
+    def __repr__(self) -> str:
+        term = self._term
+        if type(term) is int:
+            r = _literal(term, self._sort)
+        else:
+            r = _dump(term)  # pyright: ignore[reportArgumentType]
+        return f"{self.__class__.__name__}(`{r}`)"
+
+    def __eq__(self, other: Self, /) -> Constraint:
+        return Constraint._from_expr(ops.EQ, self, other)
+
+    def __ne__(self, other: Self, /) -> Constraint:
+        return Constraint._from_expr(ops.DISTINCT, self, other)
+
+    def __hash__(self) -> int:
+        return _hash(self._term)
+
+    def free_constants(self) -> FrozenSet[str]:
+        return self._analyze().constants
+
+    def dag_size(self) -> int:
+        return self._analyze().size
+
+    def depth(self) -> int:
+        return self._analyze().depth
+
+    def _analyze(self) -> _util.TermInfo:
+        if self._info is None:
+            if isinstance(term := self._term, int):
+                self._info = _util.TermInfo(frozenset(), 1, 0)
+            else:
+                self._info = _util.analyze(
+                    term,
+                    id,
+                    lambda t: [a for a in t[2:] if type(a) is tuple],
+                    lambda t: t[2] if t[0] is _VAR else None,
+                )
+        return self._info
+
+    def substitute(self, mapping: Mapping[str, Symbolic | Array[Any, Any]], /) -> Self:
+        return self.substitute_many((self,), mapping)[0]
+
+    @classmethod
+    def substitute_many(
+        cls, exprs: Iterable[S], mapping: Mapping[str, Symbolic | Array[Any, Any]], /
+    ) -> List[S]:
+        exprs = list(exprs)
+        subst = _substitution(mapping)
+        if not subst or not exprs:
+            return exprs
+        memo: Dict[int, Term] = {}
+        results: List[S] = []
+        for e in exprs:
+            result = e.__new__(e.__class__)
+            Symbolic.__init__(result, _substitute(e._term, subst, memo))
+            results.append(result)
+        return results
+
+
+class Constraint(Symbolic):
+    _sort: ClassVar[int] = 0
+    __slots__ = ()
+
+    def __init__(self, value: bool | str, /):
+        shadow = None
+        if isinstance(value, str):
+            term = _mk_const(self, value)
+            shadow = _util.seeded(value)
+            if shadow is not None:
+                shadow &= 1
+        else:
+            term = int(value)
+        super().__init__(term, shadow)
+
+    def __invert__(self) -> Self:
+        return self._from_expr(ops.NOT, self)
+
+    def __and__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.AND, self, other)
+
+    def __or__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.OR, self, other)
+
+    def __xor__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.XOR, self, other)
+
+    @classmethod
+    def all(cls, constraints: Iterable[Constraint], /) -> Constraint:
+        return cls._reduce(ops.AND, constraints, True)
+
+    @classmethod
+    def any(cls, constraints: Iterable[Constraint], /) -> Constraint:
+        return cls._reduce(ops.OR, constraints, False)
+
+    @classmethod
+    def _reduce(
+        cls, op: ops.Op, constraints: Iterable[Constraint], unit: bool
+    ) -> Constraint:
+        # Drop duplicates and constants, then build a single n-ary term.
+        args: Dict[int, Constraint] = {}
+        for c in constraints:
+            if type(t := c._term) is not int:
+                args.setdefault(id(t), c)
+            elif t != unit:
+                return Constraint(not unit)
+        if not args:
+            return Constraint(unit)
+        elif len(args) == 1:
+            return next(iter(args.values()))
+        return Constraint._from_expr(op, *args.values())
+
+    def __bool__(self) -> Never:
+        raise TypeError("cannot use Constraint in a boolean context")
+
+    def ite(self, then: Symbolic, else_: Symbolic, /) -> Symbolic:
+        return then._from_expr(ops.ITE, self, then, else_)
+
+    def witness(self) -> bool | None:
+        if self._shadow is None:
+            return None
+        return bool(self._shadow)
+
+    def reveal(self) -> bool | None:
+        if type(self._term) is not int:
+            return None
+        return bool(self._term)
+
+
+class BitVector(Symbolic, Generic[N], metaclass=BitVectorMeta):
+    width: Final[int]  # type: ignore
+    _sort: ClassVar[int]
+    __slots__ = ()
+
+    def __init__(self, value: int | str, /) -> None:
+        shadow = None
+        if isinstance(value, str):
+            term = _mk_const(self, value)
+            shadow = _util.seeded(value)
+            if shadow is not None:
+                shadow &= (1 << self._sort) - 1
+        else:
+            term = value & ((1 << self._sort) - 1)
+        super().__init__(term, shadow)
+
+    @classmethod
+    def _make_sort(cls, width: int) -> int:
+        return width
+
+    @classmethod
+    def of_width(cls, width: int, /) -> type[Self]:
+        return _util.of_width(cls, width)
+
+    @classmethod
+    def concat(cls, *parts: BitVector[Any]) -> Self:
+        if sum(p.width for p in parts) != cls.width:
+            raise ValueError(
+                f"cannot concatenate {', '.join(p.__class__.__name__ for p in parts)} "
+                f"into {cls.__name__}"
+            )
+        segments = _util.merge_segments(
+            s for p in parts for s in _segments(p._term, p.width)
+        )
+        result = cls.__new__(cls)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, _assemble(segments))
+        else:
+            shadow = ops.propagate_concat(*parts)
+            Symbolic.__init__(result, _assemble(segments), shadow)
+        return result
+
+    def extract(self, hi: int, lo: int, other: type[BitVector[M]], /) -> BitVector[M]:
+        if not 0 <= lo <= hi < self.width or hi - lo + 1 != other.width:
+            raise ValueError(
+                f"cannot extract bits {hi}:{lo} of {self.__class__.__name__} "
+                f"into {other.__name__}"
+            )
+        segments = list(_segments(self._term, self.width))
+        segments = _util.slice_segments(segments, lo, other.width)
+        term = _assemble(_util.merge_segments(segments))
+        result = other.__new__(other)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            shadow = ops.propagate_extract(self, lo, other.width)
+            Symbolic.__init__(result, term, shadow)
+        return result
+
+    @classmethod
+    def select(
+        cls, index: Uint[Any], table: Sequence[Self], default: Self | None = None, /
+    ) -> Self:
+        if default is None:
+            default = cls(0)
+        if (i := index.reveal()) is not None:
+            return table[i] if i < len(table) else default
+        table = table[: 1 << index.width]
+        if not table:
+            return default
+
+        term = _util.mux(
+            [t._term for t in table],
+            lambda j: _apply(ops.EQ, 0, ((ops.EXTRACT, 1, index._term, j), 1), (1, 1)),
+            lambda c, t, e: _apply(
+                ops.ITE, cls.width, (c, 0), (t, cls.width), (e, cls.width)
+            ),
+            lambda t: t if type(t) is int else (id(t),),
+        )
+        if len(table) < 1 << index.width:
+            limit = (len(table), index.width)
+            guard = _apply(ops.BVULT, 0, (index._term, index.width), limit)
+            term = _apply(
+                ops.ITE,
+                cls.width,
+                (guard, 0),
+                (term, cls.width),
+                (default._term, cls.width),
+            )
+
+        result = cls.__new__(cls)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            shadow = ops.propagate_select(index, table, default)
+            Symbolic.__init__(result, term, shadow)
+        return result
+
+    @abc.abstractmethod
+    def __lt__(self, other: Self, /) -> Constraint: ...
+
+    @abc.abstractmethod
+    def __le__(self, other: Self, /) -> Constraint: ...
+
+    def __invert__(self) -> Self:
+        return self._from_expr(ops.BVNOT, self)
+
+    def __and__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.BVAND, self, other)
+
+    def __or__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.BVOR, self, other)
+
+    def __xor__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.BVXOR, self, other)
+
+    def __add__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.BVADD, self, other)
+
+    def __sub__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.BVSUB, self, other)
+
+    def __mul__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.BVMUL, self, other)
+
+    @abc.abstractmethod
+    def __truediv__(self, other: Self, /) -> Self: ...
+
+    @abc.abstractmethod
+    def __mod__(self, other: Self, /) -> Self: ...
+
+    def __lshift__(self, other: Uint[N], /) -> Self:
+        return self._from_expr(ops.BVSHL, self, other)
+
+    @abc.abstractmethod
+    def __rshift__(self, other: Uint[N], /) -> Self: ...
+
+
+class Uint(BitVector[N]):
+    __slots__ = ()
+
+    def __lt__(self, other: Self, /) -> Constraint:
+        return Constraint._from_expr(ops.BVULT, self, other)
+
+    def __le__(self, other: Self, /) -> Constraint:
+        return Constraint._from_expr(ops.BVULE, self, other)
+
+    def __truediv__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.BVUDIV, self, other)
+
+    def __mod__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.BVUREM, self, other)
+
+    def __rshift__(self, other: Uint[N], /) -> Self:
+        return self._from_expr(ops.BVLSHR, self, other)
+
+    def into(self, other: type[BitVector[M]], /) -> BitVector[M]:
+        term = self._term
+        if self.width < other.width:
+            if type(term) is not int:
+                term = (ops.ZERO_EXTEND, other.width, term)
+        elif self.width > other.width:
+            if type(term) is int:
+                term &= (1 << other.width) - 1
+            else:
+                term = (ops.EXTRACT, other.width, term, 0)
+        shadow = self._shadow
+        if shadow is not None:
+            shadow &= (1 << other.width) - 1
+        result = other.__new__(other)
+        Symbolic.__init__(result, term, shadow)
+        return result
+
+    def reveal(self) -> int | None:
+        if type(self._term) is not int:
+            return None
+        return self._term
+
+    def witness(self) -> int | None:
+        return self._shadow
+
+
+class Int(BitVector[N]):
+    __slots__ = ()
+
+    def __lt__(self, other: Self, /) -> Constraint:
+        return Constraint._from_expr(ops.BVSLT, self, other)
+
+    def __le__(self, other: Self, /) -> Constraint:
+        return Constraint._from_expr(ops.BVSLE, self, other)
+
+    def __truediv__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.BVSDIV, self, other)
+
+    def __mod__(self, other: Self, /) -> Self:
+        return self._from_expr(ops.BVSREM, self, other)
+
+    def __rshift__(self, other: Uint[N], /) -> Self:
+        return self._from_expr(ops.BVASHR, self, other)
+
+    def into(self, other: type[BitVector[M]], /) -> BitVector[M]:
+        term = self._term
+        if self.width < other.width:
+            if type(term) is int:
+                term = ops.signed(term, self.width) & ((1 << other.width) - 1)
+            else:
+                term = (ops.SIGN_EXTEND, other.width, term)
+        elif self.width > other.width:
+            if type(term) is int:
+                term &= (1 << other.width) - 1
+            else:
+                term = (ops.EXTRACT, other.width, term, 0)
+        shadow = self._shadow
+        if shadow is not None:
+            shadow = ops.signed(shadow, self.width) & ((1 << other.width) - 1)
+        result = other.__new__(other)
+        Symbolic.__init__(result, term, shadow)
+        return result
+
+    def reveal(self) -> int | None:
+        if type(self._term) is not int:
+            return None
+        return ops.signed(self._term, self.width)
+
+    def witness(self) -> int | None:
+        if self._shadow is None:
+            return None
+        return ops.signed(self._shadow, self.width)
+
+
+K = TypeVar("K", bound=Union[Uint[Any], Int[Any]])
+V = TypeVar("V", bound=Union[Uint[Any], Int[Any]])
+
+
+class Array(Generic[K, V], metaclass=ArrayMeta):
+    _key: type[K]
+    _value: type[V]
+    _sort: ClassVar[Tuple[int, int]]
+    __slots__ = ("_term", "_items", "_shadow")
+
+    def __init__(self, value: V | str, /) -> None:
+        shadow = None
+        if isinstance(value, str):
+            term = _mk_const(self, value)
+        else:
+            term = (_CONST_ARRAY, self._sort, _lift(value._term, value._sort))  # pyright: ignore[reportPrivateUsage]
+            if _util.current_seed is not None:
+                shadow = ops.propagate_array(value)
+        # Stores to concrete keys are kept in a dict, on top of the base term.
+        # They're flattened into a chain of stores only when necessary.
+        self._term: Tuple[Any, ...] = term  # pyright: ignore[reportAttributeAccessIssue]
+        self._items: Dict[int, Term] = {}
+        self._shadow: Tuple[int, Dict[int, int]] | None = shadow
+
+    @classmethod
+    def _make_sort(cls, key: K, value: V) -> Tuple[int, int]:
+        return (key._sort, value._sort)  # pyright: ignore[reportPrivateUsage]
+
+    def _flatten(self) -> Tuple[Any, ...]:
+        term = self._term
+        k, v = self._sort
+        for key, value in self._items.items():
+            term = (_STORE, self._sort, term, (_LIT, k, key), _lift(value, v))
+        return term
+
+    def __copy__(self) -> Self:
+        result = self.__new__(self.__class__)
+        result._term = self._term
+        result._items = self._items.copy()
+        if (shadow := self._shadow) is not None:
+            shadow = (shadow[0], shadow[1].copy())
+        result._shadow = shadow
+        return result
+
+    def __deepcopy__(self, memo: Any, /) -> Self:
+        return self.__copy__()
+
+    def __repr__(self) -> str:
+        term = self._term
+        if self._items:
+            r = _dump(self._flatten())
+        elif term[0] is _CONST_ARRAY:
+            r = _dump(term[2])
+        else:
+            r = _dump(term)
+        return f"{self.__class__.__name__}(`{r}`)"
+
+    def __eq__(self, other: Never, /) -> Never:
+        raise TypeError("arrays cannot be compared for equality.")
+
+    def __ne__(self, other: Never, /) -> Never:
+        raise TypeError("arrays cannot be compared for equality.")
+
+    def __getitem__(self, key: K) -> V:
+        k = key._term  # pyright: ignore[reportPrivateUsage]
+        if type(k) is not int:
+            term = _select(self._flatten(), k)
+        elif k in self._items:
+            term = self._items[k]
+        else:
+            term = _select(self._term, k)
+        result = self._value.__new__(self._value)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            Symbolic.__init__(result, term, ops.propagate_load(self, key))
+        return result
+
+    def __setitem__(self, key: K, value: V) -> None:
+        self._shadow = ops.propagate_store(self, key, value)
+        k = key._term  # pyright: ignore[reportPrivateUsage]
+        if type(k) is int:
+            self._items[k] = value._term  # pyright: ignore[reportPrivateUsage]
+        else:
+            self._term = (
+                _STORE,
+                self._sort,
+                self._flatten(),
+                k,
+                _lift(value._term, self._sort[1]),  # pyright: ignore[reportPrivateUsage]
+            )
+            self._items = {}
+
+
+# Searches are exhaustive if the variables have at most this many bits in total.
+_EXHAUSTIVE_BITS = 16
+
+# Otherwise, at most this many candidate assignments are tried.
+_MAX_CANDIDATES = 1 << 16
+
+
+class Solver:
+    __slots__ = ("_assertions", "_model", "_failed")
+
+    def __init__(self, options: Options | None = None) -> None:
+        # There's nothing to tune, so options are only validated.
+        _util.check_options(options or {})
+        self._assertions: List[Constraint] = []
+        self._model: Dict[str, Any] | None = None
+        # The assumptions passed to the last check, if it was unsatisfiable.
+        self._failed: Tuple[Constraint, ...] | None = None
+
+    def add(self, assertion: Constraint, /) -> None:
+        self._assertions.append(assertion)
+        self._model, self._failed = None, None
+
+    def check(self, *assumptions: Constraint, options: Options | None = None) -> bool:
+        _util.check_options(options or {}, per_check=True)
+        self._model, self._failed = None, None
+        start = time.perf_counter()
+        try:
+            model = self._solve((*self._assertions, *assumptions))
+        except RuntimeError:
+            self._report("unknown", start, assumptions)
+            raise
+        if model is None:
+            self._failed = assumptions
+        else:
+            self._model = model
+        self._report("unsat" if model is None else "sat", start, assumptions)
+        return model is not None
+
+    def _report(
+        self, outcome: str, start: float, assumptions: Tuple[Constraint, ...]
+    ) -> None:
+        elapsed = _util.counters.check(outcome, start)
+        if elapsed > _util.counters.threshold:
+            query = functools.partial(self._smtlib, assumptions)
+            _util.counters.capture(query, elapsed, outcome, {})
+
+    def _smtlib(self, assumptions: Tuple[Constraint, ...]) -> str:
+        terms = [c._term for c in (*self._assertions, *assumptions)]  # pyright: ignore[reportPrivateUsage]
+        constants = _constants(terms)
+        declarations = {n: _sort_name(constants[n]) for n in sorted(constants)}
+        return _util.smtlib(
+            declarations,
+            (_literal(t, 0) if type(t) is int else _dump(t) for t in terms),  # pyright: ignore[reportArgumentType]
+        )
+
+    def _solve(self, constraints: Iterable[Constraint]) -> Dict[str, Any] | None:
+        terms: List[Term] = []
+        for c in constraints:
+            t = c._term  # pyright: ignore[reportPrivateUsage]
+            if type(t) is int:
+                if not t:
+                    return None
+            else:
+                terms.append(t)
+        return self._search(terms)
+
+    def failed_assumptions(self) -> List[Constraint]:
+        if self._failed is None:
+            raise ValueError("solver is not ready for unsat core extraction.")
+        # Without a real solver there's no unsat core to read off, so drop the
+        # assumptions one at a time, keeping only those that are needed.
+        core, i = list(self._failed), 0
+        while i < len(core):
+            rest = core[:i] + core[i + 1 :]
+            if self._solve((*self._assertions, *rest)) is None:
+                core = rest
+            else:
+                i += 1
+        self._failed = tuple(core)
+        return core
+
+    def minimize(self, expr: BitVector[N], /) -> int | None:
+        return _util.optimize(self, expr, isinstance(expr, Int), False)
+
+    def maximize(self, expr: BitVector[N], /) -> int | None:
+        return _util.optimize(self, expr, isinstance(expr, Int), True)
+
+    def iter_models(
+        self,
+        terms: Sequence[BitVector[Any]],
+        /,
+        limit: int | None = None,
+        seed: int | None = None,
+    ) -> Generator[Tuple[int, ...]]:
+        n = len(self._assertions)
+        try:
+            yield from _util.iter_models(self, terms, limit, seed)
+        finally:
+            del self._assertions[n:]
+
+    @staticmethod
+    def _search(terms: List[Term]) -> Dict[str, Any] | None:
+        # Without a real solver, we can only check candidate assignments one at
+        # a time. If the variables are small enough, try them all; otherwise,
+        # try some interesting values taken from the constraints themselves.
+        constants = _constants(terms)
+        names = list(constants)
+        bits = sum(max(s, 1) for s in constants.values() if isinstance(s, int))
+        arrays = any(isinstance(s, tuple) for s in constants.values())
+
+        exhaustive = not arrays and bits <= _EXHAUSTIVE_BITS
+        domains: List[Iterable[int]] = []
+        if exhaustive:
+            for name in names:
+                domains.append(range(1 << max(constants[name], 1)))
+        else:
+            literals = _literals(terms)
+            for name in names:
+                sort = constants[name]
+                if isinstance(sort, tuple):
+                    domains.append([0])  # arrays take the default value
+                    continue
+                mask = ops.mask(sort)
+                values = {0, 1, mask}
+                for lit in literals:
+                    values.update((lit & mask, (lit + 1) & mask, (lit - 1) & mask))
+                domains.append(sorted(values))
+
+        for values in itertools.islice(itertools.product(*domains), _MAX_CANDIDATES):
+            model: Dict[str, Any] = {}
+            for name, value in zip(names, values):
+                model[name] = (0, {}) if isinstance(constants[name], tuple) else value
+            memo: Dict[int, Any] = {}
+            if all(_evaluate(t, model, memo) for t in terms):
+                return model
+
+        if exhaustive:
+            return None
+        raise RuntimeError("concrete backend could not solve this instance")
+
+    def evaluate(
+        self, bv: BitVector[N] | Array[K, V], /
+    ) -> int | DefaultDict[int, int]:
+        if self._model is None:
+            raise ValueError("solver is not ready for model evaluation.")
+        if isinstance(bv, Array):
+            k, v = bv._key, bv._value  # pyright: ignore[reportPrivateUsage]
+            default, items = _evaluate(bv._flatten(), self._model, {})  # pyright: ignore[reportPrivateUsage]
+            if issubclass(k, Int):
+                items = {ops.signed(a, k.width): b for a, b in items.items()}
+            if issubclass(v, Int):
+                default = ops.signed(default, v.width)
+                items = {a: ops.signed(b, v.width) for a, b in items.items()}
+            return defaultdict(lambda: default, items)
+        r = _evaluate(bv._term, self._model, {})  # pyright: ignore[reportPrivateUsage]
+        if isinstance(bv, Int):
+            return ops.signed(r, bv.width)
+        return r
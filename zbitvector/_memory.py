@@ -0,0 +1,263 @@
+"""
+A byte-addressed memory model, shared by all backends.
+
+Memory is built entirely on the public :class:`Array` and
+:meth:`BitVector.concat` / :meth:`BitVector.extract` interfaces.
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ClassVar,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Literal,
+    Set,
+    TypeVar,
+    Union,
+    overload,
+)
+
+from typing_extensions import Self, TypeAlias
+
+if TYPE_CHECKING:
+    from ._abstract import Array, BitVector, Int, Uint
+
+    Byte: TypeAlias = Union[Uint[Literal[8]], Int[Literal[8]]]
+
+K = TypeVar("K", bound="Union[Uint[Any], Int[Any]]")
+M = TypeVar("M", bound=int)
+
+
+class Memory(Generic[K]):
+    r"""
+    Represents a mutable, byte-addressed memory, backed by an :class:`Array`.
+
+    Writes to concrete addresses are kept in a Python dictionary and are only
+    written through to the underlying :class:`Array` when a symbolic address
+    needs to see them. Multi-byte values are loaded and stored as a single
+    concatenation or extraction, rather than one term per byte.
+
+    To create a :class:`Memory`, pass an :class:`Array` of bytes to the
+    constructor. The array is copied, not modified.
+
+    >>> M = Memory(Array[Uint64, Uint8](Uint8(0)))
+    >>> M.write(Uint64(0x1000), b"\x01\x02\x03\x04")
+    >>> M.load(Uint64(0x1000), Uint32)
+    Uint32(`#x04030201`)
+    """
+
+    __slots__ = ("_array", "_overlay", "_dirty")
+    __hash__: ClassVar[None] = None  # pyright: ignore[reportIncompatibleMethodOverride]
+
+    def __init__(self, array: Array[K, Any], /) -> None:
+        if array._value.width != 8:  # pyright: ignore[reportPrivateUsage]
+            raise TypeError("memory must be backed by an array of 8-bit values")
+        self._array: Array[K, Any] = copy.copy(array)
+        # Known bytes at concrete addresses, as ints (for concrete values) or
+        # bitvectors. Addresses in `_dirty` have not been written to `_array`.
+        self._overlay: Dict[int, int | Byte] = {}
+        self._dirty: Set[int] = set()
+
+    def __copy__(self) -> Self:
+        result = self.__new__(self.__class__)
+        result._array = copy.copy(self._array)
+        result._overlay = self._overlay.copy()
+        result._dirty = self._dirty.copy()
+        return result
+
+    def __deepcopy__(self, memo: Any, /) -> Self:
+        return self.__copy__()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._array!r}, {len(self._dirty)} pending)"
+
+    def _address(self, address: K) -> int | None:
+        if (a := address.reveal()) is None:
+            return None
+        return a & ((1 << address.width) - 1)
+
+    def _addresses(self, a: int, n: int) -> Iterable[int]:
+        limit = 1 << self._array._key.width  # pyright: ignore[reportPrivateUsage]
+        if a + n <= limit:
+            return range(a, a + n)
+        return [(a + i) % limit for i in range(n)]
+
+    def _offset(self, address: K, i: int) -> K:
+        if i == 0:
+            return address
+        offset: Any = self._array._key(i)  # pyright: ignore[reportPrivateUsage]
+        return address + offset
+
+    def _read(self, a: int) -> Byte:
+        v = self._overlay.get(a)
+        if v is None:
+            key = self._array._key(a)  # pyright: ignore[reportPrivateUsage]
+            v = self._overlay[a] = self._array[key]
+        elif isinstance(v, int):
+            v = self._array._value(v)  # pyright: ignore[reportPrivateUsage]
+        return v
+
+    def _flush(self) -> None:
+        # Write pending concrete-address bytes through to the array, so that
+        # symbolic reads and writes can see them.
+        if not self._dirty:
+            return
+        key = self._array._key  # pyright: ignore[reportPrivateUsage]
+        value = self._array._value  # pyright: ignore[reportPrivateUsage]
+        for a, v in self._overlay.items():
+            if a in self._dirty:
+                self._array[key(a)] = value(v) if isinstance(v, int) else v
+        self._dirty.clear()
+
+    def _store_symbolic(self, address: K, parts: List[Byte]) -> None:
+        # A store to a symbolic address may alias any concrete address, so the
+        # overlay is written through and then discarded.
+        self._flush()
+        for i, part in enumerate(parts):
+            self._array[self._offset(address, i)] = part
+        self._overlay.clear()
+
+    def __getitem__(self, address: K) -> Byte:
+        """
+        Load the byte at the given address.
+
+        >>> M = Memory(Array[Uint64, Uint8]("MG"))
+        >>> M[Uint64(1)] = Uint8(0xAB)
+        >>> M[Uint64(1)]
+        Uint8(`#xab`)
+        """
+        if (a := self._address(address)) is None:
+            self._flush()
+            return self._array[address]
+        return self._read(a)
+
+    def __setitem__(self, address: K, value: Byte) -> None:
+        """Store a byte at the given address."""
+        if (a := self._address(address)) is None:
+            self._store_symbolic(address, [value])
+        elif (r := value.reveal()) is not None:
+            self._overlay[a] = r & 0xFF
+            self._dirty.add(a)
+        else:
+            self._overlay[a] = value
+            self._dirty.add(a)
+
+    @overload
+    def load(
+        self,
+        address: K,
+        width: type[Uint[M]],
+        /,
+        byteorder: Literal["little", "big"] = "little",
+    ) -> Uint[M]: ...
+
+    @overload
+    def load(
+        self,
+        address: K,
+        width: type[Int[M]],
+        /,
+        byteorder: Literal["little", "big"] = "little",
+    ) -> Int[M]: ...
+
+    def load(
+        self,
+        address: K,
+        width: type[BitVector[M]],
+        /,
+        byteorder: Literal["little", "big"] = "little",
+    ) -> BitVector[M]:
+        r"""
+        Load a multi-byte value starting at the given address. The width of the
+        value must be a multiple of 8.
+
+        >>> M = Memory(Array[Uint64, Uint8](Uint8(0)))
+        >>> M.write(Uint64(0), b"\x12\x34")
+        >>> M.load(Uint64(0), Uint16, byteorder="big")
+        Uint16(`#x1234`)
+        """
+        n, r = divmod(width.width, 8)
+        if r != 0:
+            raise ValueError(
+                f"cannot load {width.__name__}: width must be a multiple of 8"
+            )
+
+        if (a := self._address(address)) is None:
+            self._flush()
+            parts = [self._array[self._offset(address, i)] for i in range(n)]
+        else:
+            addresses = self._addresses(a, n)
+            raw = [self._overlay.get(i) for i in addresses]
+            if all(isinstance(v, int) for v in raw):
+                return width(int.from_bytes(bytes(raw), byteorder))  # type: ignore
+            parts = [self._read(i) for i in addresses]
+
+        if byteorder == "little":
+            parts.reverse()
+        return width.concat(*parts)
+
+    def store(
+        self,
+        address: K,
+        value: Uint[M] | Int[M],
+        /,
+        byteorder: Literal["little", "big"] = "little",
+    ) -> None:
+        """
+        Store a multi-byte value starting at the given address. The width of the
+        value must be a multiple of 8.
+
+        >>> M = Memory(Array[Uint64, Uint8](Uint8(0)))
+        >>> M.store(Uint64(0), Uint16(0x1234))
+        >>> M[Uint64(0)], M[Uint64(1)]
+        (Uint8(`#x34`), Uint8(`#x12`))
+        """
+        n, r = divmod(value.width, 8)
+        if r != 0:
+            raise ValueError(
+                f"cannot store {value.__class__.__name__}: "
+                "width must be a multiple of 8"
+            )
+
+        a = self._address(address)
+        byte: type[Byte] = self._array._value  # pyright: ignore[reportPrivateUsage]
+        if (c := value.reveal()) is not None:
+            data = (c & ((1 << value.width) - 1)).to_bytes(n, byteorder)
+            if a is not None:
+                return self._write(a, data)
+            parts = [byte(b) for b in data]
+        else:
+            parts = [value.extract(8 * i + 7, 8 * i, byte) for i in range(n)]
+            if byteorder == "big":
+                parts.reverse()
+
+        if a is None:
+            self._store_symbolic(address, parts)
+        else:
+            for i, part in zip(self._addresses(a, n), parts):
+                self._overlay[i] = part
+                self._dirty.add(i)
+
+    def write(self, address: K, data: bytes | bytearray | memoryview, /) -> None:
+        """
+        Store a buffer of concrete bytes starting at the given address. If the
+        address is concrete, this adds no terms to the underlying :class:`Array`
+        until a symbolic address is used.
+        """
+        data = memoryview(data).cast("B")
+        if (a := self._address(address)) is None:
+            byte = self._array._value  # pyright: ignore[reportPrivateUsage]
+            self._store_symbolic(address, [byte(b) for b in data])
+        else:
+            self._write(a, data)
+
+    def _write(self, a: int, data: bytes | memoryview) -> None:
+        addresses = self._addresses(a, len(data))
+        self._overlay.update(zip(addresses, data))
+        self._dirty.update(addresses)
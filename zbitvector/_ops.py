@@ -0,0 +1,182 @@
+"""Reference semantics for bitvector operations, over Python ints."""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Tuple
+
+# pyright: reportUnknownArgumentType=false
+# pyright: reportUnknownLambdaType=false
+
+
+class Op:
+    """
+    A bitvector operation, implemented in Python.
+
+    The implementation is called with the width of the first argument (zero for
+    booleans), followed by the argument values as unsigned ints. The caller is
+    responsible for masking the result to the width of the output.
+    """
+
+    __slots__ = ("name", "fn")
+
+    def __init__(self, name: str, fn: Callable[..., Any]) -> None:
+        self.name = name
+        self.fn = fn
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+def mask(width: int) -> int:
+    """Return the all-ones value of the given width (or 1, for booleans)."""
+    return ((1 << width) - 1) or 1
+
+
+def signed(value: int, width: int) -> int:
+    """Reinterpret an unsigned value as a two's complement signed integer."""
+    if value & (1 << (width - 1)):
+        return value - (1 << width)
+    return value
+
+
+def _udiv(width: int, a: int, b: int) -> int:
+    return a // b if b else (1 << width) - 1
+
+
+def _urem(width: int, a: int, b: int) -> int:
+    return a % b if b else a
+
+
+def _sdiv(width: int, a: int, b: int) -> int:
+    # Follows the SMT-LIB definition of bvsdiv in terms of bvudiv.
+    m = (1 << width) - 1
+    sa, sb = a >> (width - 1), b >> (width - 1)
+    if sa and sb:
+        return _udiv(width, -a & m, -b & m)
+    elif sa:
+        return -_udiv(width, -a & m, b)
+    elif sb:
+        return -_udiv(width, a, -b & m)
+    return _udiv(width, a, b)
+
+
+def _srem(width: int, a: int, b: int) -> int:
+    # Follows the SMT-LIB definition of bvsrem in terms of bvurem.
+    m = (1 << width) - 1
+    sa, sb = a >> (width - 1), b >> (width - 1)
+    if sa and sb:
+        return -_urem(width, -a & m, -b & m)
+    elif sa:
+        return -_urem(width, -a & m, b)
+    elif sb:
+        return _urem(width, a, -b & m)
+    return _urem(width, a, b)
+
+
+NOT = Op("not", lambda w, a: ~a)
+AND = Op("and", lambda w, *args: int(all(args)))
+OR = Op("or", lambda w, *args: int(any(args)))
+XOR = Op("xor", lambda w, a, b: a ^ b)
+EQ = Op("=", lambda w, a, b: int(a == b))
+DISTINCT = Op("distinct", lambda w, a, b: int(a != b))
+ITE = Op("ite", lambda w, c, t, e: t if c else e)
+
+BVNOT = Op("bvnot", lambda w, a: ~a)
+BVAND = Op("bvand", lambda w, a, b: a & b)
+BVOR = Op("bvor", lambda w, a, b: a | b)
+BVXOR = Op("bvxor", lambda w, a, b: a ^ b)
+BVADD = Op("bvadd", lambda w, a, b: a + b)
+BVSUB = Op("bvsub", lambda w, a, b: a - b)
+BVMUL = Op("bvmul", lambda w, a, b: a * b)
+BVUDIV = Op("bvudiv", _udiv)
+BVUREM = Op("bvurem", _urem)
+BVSDIV = Op("bvsdiv", _sdiv)
+BVSREM = Op("bvsrem", _srem)
+BVSHL = Op("bvshl", lambda w, a, b: a << b if b < w else 0)
+BVLSHR = Op("bvlshr", lambda w, a, b: a >> b)
+BVASHR = Op("bvashr", lambda w, a, b: signed(a, w) >> b)
+BVULT = Op("bvult", lambda w, a, b: int(a < b))
+BVULE = Op("bvule", lambda w, a, b: int(a <= b))
+BVSLT = Op("bvslt", lambda w, a, b: int(signed(a, w) < signed(b, w)))
+BVSLE = Op("bvsle", lambda w, a, b: int(signed(a, w) <= signed(b, w)))
+
+ZERO_EXTEND = Op("zero_extend", lambda w, a: a)
+SIGN_EXTEND = Op("sign_extend", lambda w, a: signed(a, w))
+EXTRACT = Op("extract", lambda w, a, lo: a >> lo)
+CONCAT = Op("concat", lambda w, a, b, wb: (a << wb) | b)
+
+
+def propagate(op: Op | None, width: int, *syms: Any) -> int | None:
+    """
+    Compute the shadow value of an expression from the shadow values of its
+    arguments. Returns `None` if any argument has no shadow value, or if the
+    operation has no reference implementation.
+    """
+    if op is None:
+        return None
+    values: List[int] = []
+    for s in syms:
+        if (v := s._shadow) is None:
+            return None
+        values.append(v)
+    return op.fn(getattr(syms[0], "width", 0), *values) & mask(width)
+
+
+def propagate_concat(*syms: Any) -> int | None:
+    """
+    Compute the shadow value of the concatenation of the given bitvectors, with
+    the first argument in the most significant position.
+    """
+    result = 0
+    for s in syms:
+        if (v := s._shadow) is None:
+            return None
+        result = (result << s.width) | v
+    return result
+
+
+def propagate_extract(sym: Any, lo: int, width: int) -> int | None:
+    """Compute the shadow value of `width` bits of a bitvector, from `lo` up."""
+    if (v := sym._shadow) is None:
+        return None
+    return (v >> lo) & mask(width)
+
+
+def propagate_select(index: Any, table: Any, default: Any) -> int | None:
+    """Compute the shadow value of a table lookup."""
+    if (i := index._shadow) is None:
+        return None
+    return (table[i] if i < len(table) else default)._shadow
+
+
+def propagate_array(default: Any) -> Tuple[int, Dict[int, int]] | None:
+    """
+    Compute the shadow value of a constant array: the shadow value of the
+    default, and a dict of the values stored so far (initially empty).
+    """
+    if (d := default._shadow) is None:
+        return None
+    return (d, {})
+
+
+def propagate_store(
+    array: Any, key: Any, value: Any
+) -> Tuple[int, Dict[int, int]] | None:
+    """
+    Update the shadow value of an array after a store, in place, and return it.
+    Returns `None` if the array, key or value has no shadow value.
+    """
+    if (shadow := array._shadow) is None:
+        return None
+    elif (k := key._shadow) is None or (v := value._shadow) is None:
+        return None
+    shadow[1][k] = v
+    return shadow
+
+
+def propagate_load(array: Any, key: Any) -> int | None:
+    """Compute the shadow value of an array read."""
+    if (shadow := array._shadow) is None or (k := key._shadow) is None:
+        return None
+    default, items = shadow
+    return items.get(k, default)
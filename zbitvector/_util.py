@@ -1,11 +1,419 @@
 from __future__ import annotations
 
 import abc
-from typing import Any, Dict, Literal, Tuple, TypeVar, Union, cast, get_args, get_origin
+import contextlib
+import math
+import random
+import time
+from collections import defaultdict
+from typing import (
+    Any,
+    Callable,
+    DefaultDict,
+    Dict,
+    FrozenSet,
+    Generator,
+    Iterable,
+    List,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Sequence,
+    Set,
+    Tuple,
+    TypedDict,
+    TypeVar,
+    Union,
+    cast,
+    get_args,
+    get_origin,
+)
+
+T = TypeVar("T")
+
+# The seed assignment for concolic mode, if active. See `concolic()`.
+current_seed: Dict[str, int] | None = None
+
+
+@contextlib.contextmanager
+def concolic(seed: Mapping[str, int | bool], /) -> Generator[None]:
+    """Attach concrete shadow values to symbolic expressions."""
+    global current_seed
+    prior, current_seed = current_seed, {k: int(v) for k, v in seed.items()}
+    try:
+        yield
+    finally:
+        current_seed = prior
+
+
+def seeded(name: str) -> int | None:
+    """Look up the seed value of the named variable, if in concolic mode."""
+    return None if current_seed is None else current_seed.get(name)
+
+
+class Options(TypedDict, total=False):
+    """
+    Options for tuning the solver, passed to :class:`Solver` or to a single
+    :meth:`Solver.check`. Options passed to a check take precedence over the
+    solver's, and unset options keep the backend's defaults.
+
+    Each option applies to one backend and is ignored by the others, so the
+    same options can be used whichever backend is selected. Unknown options
+    raise :class:`ValueError`.
+
+    The Bitwuzla options map onto the engine options of the same name, which
+    are documented by Bitwuzla. All solvers share a single Bitwuzla instance,
+    so options are applied before each check. Bitwuzla may reject changes to
+    some options, such as the rewrite level, once terms have been created, in
+    which case the check raises Bitwuzla's error.
+
+    The Z3 options choose how the solver is built, so they can't be passed to
+    a single check. A `tactic` pipeline is tried first on each check, falling
+    back to the incremental solver for checks with assumptions and for queries
+    the tactic can't decide. It solves each query from scratch, which pays off
+    for one-shot queries over pure bitvectors.
+
+    >>> s = Solver({"pp_var_subst": False})
+    >>> s.check(Uint8("OPT") == Uint8(1), options={"seed": 7})
+    True
+    >>> Solver({"colour": "blue"})
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown solver option: colour
+    """
+
+    #: Bitwuzla: the solver engine, e.g. "fun" or "prop".
+    engine: str
+    #: Bitwuzla: the SAT solver, e.g. "cadical" or "kissat".
+    sat_engine: str
+    #: Bitwuzla: the random seed.
+    seed: int
+    #: Bitwuzla: the rewrite level, from 0 (none) to 3 (full).
+    rw_level: int
+    #: Bitwuzla: preprocessing passes.
+    pp_ackermann: bool
+    pp_beta_reduce: bool
+    pp_eliminate_extracts: bool
+    pp_eliminate_ites: bool
+    pp_extract_lambdas: bool
+    pp_merge_lambdas: bool
+    pp_nondestr_subst: bool
+    pp_normalize_add: bool
+    pp_skeleton_preproc: bool
+    pp_var_subst: bool
+    #: Bitwuzla: run propagation-based or stochastic local search before the
+    #: "fun" engine.
+    fun_preprop: bool
+    fun_presls: bool
+    #: Bitwuzla: limits on propagation-based local search.
+    prop_nprops: int
+    prop_nupdates: int
+    #: Z3: the SMT-LIB logic to specialize the solver for, e.g. "QF_BV" or
+    #: "ALL". By default, it's QF_BV until the first Array is created, and
+    #: QF_ABV from then on.
+    logic: str
+    #: Z3: a pipeline of tactics separated by semicolons, e.g.
+    #: "simplify; bit-blast; sat".
+    tactic: str
+
+
+OPTIONS: FrozenSet[str] = frozenset(Options.__annotations__)
+
+# Options that configure the solver as a whole, and can't be set per check.
+SOLVER_OPTIONS: FrozenSet[str] = frozenset(("logic", "tactic"))
+
+
+def check_options(options: Mapping[str, Any], per_check: bool = False) -> None:
+    """Raise ValueError if any of the given options is unknown."""
+    for key in options:
+        if key not in OPTIONS:
+            raise ValueError(f"unknown solver option: {key}")
+        elif per_check and key in SOLVER_OPTIONS:
+            raise ValueError(f"solver option cannot be set per check: {key}")
+
+
+class Counters:
+    """
+    Running totals behind `zbitvector.stats`. The backends update these
+    directly, so counting costs no more than a dictionary update.
+    """
+
+    __slots__ = (
+        "terms",
+        "constants",
+        "checks",
+        "check_time",
+        "native",
+        "scopes",
+        "threshold",
+        "slow",
+    )
+
+    def __init__(self) -> None:
+        # Terms are keyed by the backend's own representation of the operation,
+        # and only converted to names when a snapshot is taken.
+        self.terms: DefaultDict[Any, int] = defaultdict(int)
+        self.constants = 0
+        self.checks: Dict[str, int] = {"sat": 0, "unsat": 0, "unknown": 0}
+        self.check_time = 0.0
+        self.native: DefaultDict[str, float] = defaultdict(float)
+        # The number of active scopes collecting native solver statistics.
+        self.scopes = 0
+        # Checks slower than the threshold are passed to `slow`, along with a
+        # function that formats the query as SMT-LIB.
+        self.threshold = math.inf
+        self.slow: (
+            Callable[[Callable[[], str], float, str, Mapping[str, float]], None] | None
+        ) = None
+
+    def check(self, outcome: str, start: float) -> float:
+        """
+        Record the outcome of a check that began at `start`, and return how
+        long it took.
+        """
+        elapsed = time.perf_counter() - start
+        self.checks[outcome] += 1
+        self.check_time += elapsed
+        return elapsed
+
+    def collect(self, native: Mapping[str, float]) -> None:
+        """Add a check's native solver statistics to the running totals."""
+        for k, v in native.items():
+            if k not in GAUGES:
+                self.native[k] += v
+
+    def capture(
+        self,
+        query: Callable[[], str],
+        elapsed: float,
+        outcome: str,
+        native: Mapping[str, float],
+    ) -> None:
+        """Report a check that took longer than the threshold."""
+        if self.slow is not None:
+            self.slow(query, elapsed, outcome, native)
+
+
+# Native statistics that measure the whole process, not the work done by a
+# single check, and so can't be summed.
+GAUGES = frozenset(("max-memory", "memory", "num-allocs", "rlimit-count"))
+
+counters = Counters()
+
+
+def smtlib(declarations: Mapping[str, str], assertions: Iterable[str]) -> str:
+    """
+    Format a query as an SMT-LIB script, given the sort of each constant and
+    the assertions in SMT-LIB syntax.
+    """
+    lines = ["(set-logic QF_ABV)"]
+    lines.extend(f"(declare-fun {n} () {s})" for n, s in declarations.items())
+    lines.extend(f"(assert {a})" for a in assertions)
+    lines.append("(check-sat)")
+    return "\n".join(lines) + "\n"
+
+
+class Segment(NamedTuple):
+    """
+    A run of bits in a concatenation: either a constant `value`, or bits
+    `[lo, lo + width)` of the backend term `source`. Segments from the same
+    source have equal `key`s; constants have a key of `None`.
+    """
+
+    width: int
+    value: int = 0
+    source: Any = None
+    key: Any = None
+    lo: int = 0
+
+
+def merge_segments(segments: Iterable[Segment]) -> List[Segment]:
+    """
+    Merge adjacent constants, and adjacent slices of the same term. Segments are
+    ordered from most to least significant.
+    """
+    result: List[Segment] = []
+    for s in segments:
+        if result:
+            p = result[-1]
+            if p.key is None and s.key is None:
+                value = (p.value << s.width) | s.value
+                result[-1] = Segment(p.width + s.width, value)
+                continue
+            elif (
+                p.key is not None
+                and s.key is not None
+                and p.key == s.key
+                and p.lo == s.lo + s.width
+            ):
+                result[-1] = Segment(p.width + s.width, 0, s.source, s.key, s.lo)
+                continue
+        result.append(s)
+    return result
+
+
+def slice_segments(segments: List[Segment], lo: int, width: int) -> List[Segment]:
+    """Select bits `[lo, lo + width)` from a list of segments."""
+    result: List[Segment] = []
+    pos = 0
+    for s in reversed(segments):
+        start, end = max(lo, pos), min(lo + width, pos + s.width)
+        if start < end:
+            if s.key is None:
+                value = (s.value >> (start - pos)) & ((1 << (end - start)) - 1)
+                result.append(Segment(end - start, value))
+            else:
+                offset = s.lo + start - pos
+                result.append(Segment(end - start, 0, s.source, s.key, offset))
+        pos += s.width
+    result.reverse()
+    return result
+
+
+def mux(
+    table: Sequence[T],
+    bit: Callable[[int], Any],
+    ite: Callable[[Any, T, T], T],
+    key: Callable[[T], Any],
+) -> T:
+    """
+    Build a balanced tree of if-then-elses selecting `table[i]`, where `bit(j)`
+    is the backend condition for bit `j` of the index `i`. Entries past the end
+    of the table are left unconstrained, and subtrees whose branches have equal
+    `key`s are collapsed.
+    """
+    conditions: Dict[int, Any] = {}
+
+    def build(lo: int, j: int) -> T:
+        if j < 0:
+            return table[lo]
+        elif lo + (1 << j) >= len(table):
+            return build(lo, j - 1)
+        then, else_ = build(lo + (1 << j), j - 1), build(lo, j - 1)
+        if key(then) == key(else_):
+            return then
+        if j not in conditions:
+            conditions[j] = bit(j)
+        return ite(conditions[j], then, else_)
+
+    return build(0, (len(table) - 1).bit_length() - 1)
+
+
+def optimize(solver: Any, expr: Any, signed: bool, maximize: bool) -> int | None:
+    """
+    Find the smallest (or largest) value of a bitvector that's consistent with
+    the solver's assertions, or `None` if there is none. Values are ordered as
+    two's complement if `signed` is set. On success, the solver's model is left
+    at the optimum.
+
+    The search fixes one bit of the value at a time, from the most significant
+    down. Each model found along the way fixes as many bits as it can, so a bit
+    that already has the preferred value costs no call to the solver.
+    """
+    if not solver.check():
+        return None
+    cls, width = expr.__class__, expr.width
+    mask = (1 << width) - 1
+    best = solver.evaluate(expr) & mask
+    fixed, current = 0, True
+    for i in reversed(range(width)):
+        bit = 1 << i
+        # Prefer zeros to minimize, except in the sign bit of a signed value.
+        want = bit if maximize != (signed and i == width - 1) else 0
+        fixed |= bit
+        if best & bit == want:
+            continue
+        target = (best & fixed & ~bit) | want
+        current = solver.check((expr & cls(fixed)) == cls(target))
+        if current:
+            best = solver.evaluate(expr) & mask
+    if not current:
+        # The last check was unsatisfiable, so recover a model of the optimum.
+        solver.check(expr == cls(best))
+    return solver.evaluate(expr)
+
+
+def iter_models(
+    solver: Any, terms: Sequence[Any], limit: int | None, seed: int | None
+) -> Generator[Tuple[int, ...]]:
+    """
+    Enumerate distinct values of the given terms, adding a constraint to the
+    solver after each solution to block it. The caller is responsible for
+    removing the blocking constraints afterwards.
+    """
+    if not terms:
+        # There's only one (empty) solution to enumerate.
+        if (limit is None or limit > 0) and solver.check():
+            yield ()
+        return
+
+    rng = None if seed is None else random.Random(seed)
+    count, previous = 0, None
+    while limit is None or count < limit:
+        found = False
+        if rng is not None and previous is not None:
+            # Steer the solver away from the last solution by requiring one
+            # random bit to differ. If that's impossible, take any solution.
+            i = rng.randrange(len(terms))
+            t, bit = terms[i], 1 << rng.randrange(terms[i].width)
+            flip = (t & t.__class__(bit)) != t.__class__(previous[i] & bit)
+            found = solver.check(flip)
+        if not found and not solver.check():
+            return
+        previous = tuple(solver.evaluate(t) for t in terms)
+        yield previous
+        count += 1
+        diffs = [t != t.__class__(v) for t, v in zip(terms, previous)]
+        solver.add(diffs[0].any(diffs))
+
+
+class TermInfo(NamedTuple):
+    """Metrics of the DAG below a term. See `analyze()`."""
+
+    constants: FrozenSet[str]
+    size: int
+    depth: int
+
+
+def analyze(
+    root: T,
+    key: Callable[[T], Any],
+    children: Callable[[T], Iterable[T]],
+    name: Callable[[T], str | None],
+) -> TermInfo:
+    """
+    Compute the free constants, size and depth of a backend term, visiting each
+    distinct subterm once. Subterms are identified by `key`; `name` returns the
+    name of a variable, or `None` for other leaves.
+    """
+    depths: Dict[Any, int] = {}
+    constants: Set[str] = set()
+    # Each term is pushed once to expand it, and again (with the keys of its
+    # children) to compute its depth once the children are done.
+    root_key = key(root)
+    stack: List[Tuple[T, Any, List[Any] | None]] = [(root, root_key, None)]
+    while stack:
+        term, k, keys = stack.pop()
+        if keys is not None:
+            depths[k] = 1 + max(depths[c] for c in keys)
+            continue
+        elif k in depths:
+            continue
+        args = list(children(term))
+        if not args:
+            depths[k] = 0
+            if (n := name(term)) is not None:
+                constants.add(n)
+            continue
+        keys = [key(c) for c in args]
+        stack.append((term, k, keys))
+        stack.extend((c, ck, None) for c, ck in zip(args, keys) if ck not in depths)
+    return TermInfo(frozenset(constants), len(depths), depths[root_key])
 
 
 class BitVectorMeta(abc.ABCMeta):
-    _ccache: Dict[str, type] = {}
+    # Parameterized classes, keyed by base class and width.
+    _ccache: Dict[Tuple[type, int], type] = {}
 
     def __getitem__(self, N: Any, /) -> Any:
         """
@@ -21,6 +429,14 @@ class BitVectorMeta(abc.ABCMeta):
         checker. So, during type checking, "Uint[N]" is treated as an instance
         of the generic class Uint with type parameter N.
         """
+        # Fast path for Literal[n]. Hashing a Literal[...] is slow, so classes
+        # are cached by width instead, and typing.get_args() is slow too.
+        if getattr(N, "__origin__", None) is Literal:
+            args = N.__args__
+            if len(args) == 1 and type(args[0]) is int:
+                cls = self._ccache.get((self, args[0]))
+                return of_width(self, args[0]) if cls is None else cls
+
         if isinstance(N, int):
             raise TypeError(
                 f"integer passed to {self.__name__}[...]; use {self.__name__}[Literal[{N}]] instead"
@@ -30,29 +446,41 @@ class BitVectorMeta(abc.ABCMeta):
             # No-op unbound type variables, unions, etc. These kind of Uint[...]
             # can be used in type signatures. Note that trying to instantiate
             # one will raise an error because _sort is not defined.
-            return self
+            cls = self
+        else:
+            args = get_args(N)
+            if len(args) != 1 or not isinstance(args[0], int):
+                raise TypeError(
+                    f"unsupported type parameter passed to {self.__name__}[...]"
+                )
+            cls = of_width(self, args[0])
+        return cls
 
-        args = get_args(N)
-        if len(args) != 1 or not isinstance(args[0], int):
-            raise TypeError(
-                f"unsupported type parameter passed to {self.__name__}[...]"
-            )
 
-        n = args[0]
-        if n <= 0:
-            raise TypeError(f"{self.__name__} requires a positive width")
-
-        name = self.__name__ + str(n)
-        if name not in self._ccache:
-            sort = cast(Any, self)._make_sort(n)
-            cls = type(name, (self,), {"width": n, "_sort": sort, "__slots__": ()})
-            cls.__module__ = self.__module__
-            self._ccache[name] = cls
-        return self._ccache[name]
+def of_width(base: Any, n: int, /) -> Any:
+    """Return the subclass of `base` (Uint or Int) with the given width."""
+    if "width" in vars(base):
+        base = base.__base__  # already parameterized, e.g. Uint8
+    cls = BitVectorMeta._ccache.get((base, n))  # pyright: ignore[reportPrivateUsage]
+    if cls is None:
+        if type(n) is not int:
+            raise TypeError(f"{base.__name__} requires an integer width")
+        elif n <= 0:
+            raise TypeError(f"{base.__name__} requires a positive width")
+        sort = base._make_sort(n)
+        cls = type(
+            base.__name__ + str(n),
+            (base,),
+            {"width": n, "_sort": sort, "__slots__": ()},
+        )
+        cls.__module__ = base.__module__
+        BitVectorMeta._ccache[(base, n)] = cls  # pyright: ignore[reportPrivateUsage]
+    return cls
 
 
 class ArrayMeta(abc.ABCMeta):
-    _ccache: Dict[str, type] = {}
+    # Parameterized classes, keyed by base class, key type and value type.
+    _ccache: Dict[Tuple[type, Any, Any], type] = {}
 
     def __getitem__(self, args: Any, /) -> Any:
         """
@@ -67,6 +495,14 @@ class ArrayMeta(abc.ABCMeta):
             )
 
         k, v = cast("Tuple[Any, Any]", args)
+        # Classes hash by identity, so this is a single fast lookup.
+        try:
+            cls = self._ccache.get((self, k, v))
+        except TypeError:
+            cls = None  # unhashable; rejected below
+        if cls is not None:
+            return cls
+
         for a in (k, v):
             if hasattr(a, "_sort"):
                 continue  # `a` is a usable BitVector
@@ -88,11 +524,10 @@ class ArrayMeta(abc.ABCMeta):
             )
 
         name = self.__name__ + "[" + k.__name__ + ", " + v.__name__ + "]"
-        if name not in self._ccache:
-            sort = cast(Any, self)._make_sort(k, v)
-            cls = type(
-                name, (self,), {"_sort": sort, "_key": k, "_value": v, "__slots__": ()}
-            )
-            cls.__module__ = self.__module__
-            self._ccache[name] = cls
-        return self._ccache[name]
+        sort = cast(Any, self)._make_sort(k, v)
+        cls = type(
+            name, (self,), {"_sort": sort, "_key": k, "_value": v, "__slots__": ()}
+        )
+        cls.__module__ = self.__module__
+        self._ccache[(self, k, v)] = cls
+        return cls
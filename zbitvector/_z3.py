@@ -3,12 +3,37 @@
 from __future__ import annotations
 
 import abc
-from typing import Any, Callable, Dict, Final, Generic, Tuple, TypeVar, Union
+import functools
+import time
+from collections import defaultdict
+from typing import (
+    Any,
+    Callable,
+    DefaultDict,
+    Dict,
+    Final,
+    FrozenSet,
+    Generator,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 import z3
 from typing_extensions import Never, Self
 
-from ._util import ArrayMeta, BitVectorMeta
+from . import _ops as ops
+from . import _util
+from ._memory import Memory as Memory
+from ._util import ArrayMeta, BitVectorMeta, Segment
+from ._util import Options as Options
+from ._util import concolic as concolic
 
 # pyright: reportIncompatibleMethodOverride=false
 # pyright: reportMissingTypeStubs=false
@@ -17,11 +42,53 @@ from ._util import ArrayMeta, BitVectorMeta
 
 CTX = z3.Z3_mk_context(z3.Z3_mk_config())
 
+# Z3 exits the process on errors unless there's a handler. With one that does
+# nothing, the API wrappers raise Z3Exception instead.
+ERROR_HANDLER = z3.Z3_set_error_handler(CTX, lambda ctx, error: None)  # pyright: ignore[reportUnknownLambdaType]
+
 N = TypeVar("N", bound=int)
 M = TypeVar("M", bound=int)
+S = TypeVar("S", bound="Symbolic")
 
 CACHE: Dict[str, Tuple[type, Any]] = {}
 
+# Check results, by name, for `zbitvector.stats`.
+OUTCOMES: Final = {
+    z3.Z3_L_TRUE: "sat",
+    z3.Z3_L_FALSE: "unsat",
+    z3.Z3_L_UNDEF: "unknown",
+}
+
+# Reference implementations of each kind, for computing shadow values in
+# concolic mode.
+SHADOWS: Dict[Callable[..., Any], ops.Op] = {
+    z3.Z3_mk_not: ops.NOT,
+    z3.Z3_mk_and: ops.AND,
+    z3.Z3_mk_or: ops.OR,
+    z3.Z3_mk_xor: ops.XOR,
+    z3.Z3_mk_eq: ops.EQ,
+    z3.Z3_mk_distinct: ops.DISTINCT,
+    z3.Z3_mk_ite: ops.ITE,
+    z3.Z3_mk_bvnot: ops.BVNOT,
+    z3.Z3_mk_bvand: ops.BVAND,
+    z3.Z3_mk_bvor: ops.BVOR,
+    z3.Z3_mk_bvxor: ops.BVXOR,
+    z3.Z3_mk_bvadd: ops.BVADD,
+    z3.Z3_mk_bvsub: ops.BVSUB,
+    z3.Z3_mk_bvmul: ops.BVMUL,
+    z3.Z3_mk_bvudiv: ops.BVUDIV,
+    z3.Z3_mk_bvurem: ops.BVUREM,
+    z3.Z3_mk_bvsdiv: ops.BVSDIV,
+    z3.Z3_mk_bvsrem: ops.BVSREM,
+    z3.Z3_mk_bvshl: ops.BVSHL,
+    z3.Z3_mk_bvlshr: ops.BVLSHR,
+    z3.Z3_mk_bvashr: ops.BVASHR,
+    z3.Z3_mk_bvult: ops.BVULT,
+    z3.Z3_mk_bvule: ops.BVULE,
+    z3.Z3_mk_bvslt: ops.BVSLT,
+    z3.Z3_mk_bvsle: ops.BVSLE,
+}
+
 
 def _mk_const(instance: Symbolic | Array[K, V], name: str) -> Any:
     if name not in CACHE:
@@ -31,6 +98,7 @@ def _mk_const(instance: Symbolic | Array[K, V], name: str) -> Any:
             instance._sort,  # pyright: ignore[reportPrivateUsage]
         )
         CACHE[name] = (instance.__class__, term)
+        _util.counters.constants += 1
     cls, term = CACHE[name]
     if not isinstance(instance, cls):
         raise ValueError(
@@ -40,13 +108,92 @@ def _mk_const(instance: Symbolic | Array[K, V], name: str) -> Any:
     return term
 
 
+def _substitution(
+    mapping: Mapping[str, Symbolic | Array[Any, Any]],
+) -> Tuple[List[Any], List[Any]]:
+    # Look up the variables to be replaced, and check that each value has the
+    # same type as the variable it replaces.
+    src: List[Any] = []
+    dst: List[Any] = []
+    for name, value in mapping.items():
+        if name not in CACHE:
+            continue  # no expression can refer to this variable
+        cls, term = CACHE[name]
+        if not isinstance(value, cls):
+            raise ValueError(
+                f"cannot substitute {value.__class__.__name__} "
+                f'for {cls.__name__}("{name}")'
+            )
+        src.append(term)
+        if isinstance(value, Array):
+            dst.append(value._flatten())  # pyright: ignore[reportPrivateUsage]
+        else:
+            dst.append(value._term)  # pyright: ignore[reportPrivateUsage]
+    return src, dst
+
+
+def _children(term: Any) -> List[Any]:
+    if z3.Z3_get_ast_kind(CTX, term) != z3.Z3_APP_AST:
+        return []
+    return [
+        z3.Z3_get_app_arg(CTX, term, i)
+        for i in range(z3.Z3_get_app_num_args(CTX, term))
+    ]
+
+
+def _name(term: Any) -> str | None:
+    if z3.Z3_get_ast_kind(CTX, term) != z3.Z3_APP_AST:
+        return None
+    decl = z3.Z3_get_app_decl(CTX, term)
+    if z3.Z3_get_decl_kind(CTX, decl) != z3.Z3_OP_UNINTERPRETED:
+        return None
+    return z3.Z3_get_symbol_string(CTX, z3.Z3_get_decl_name(CTX, decl))
+
+
+def _segments(term: Any) -> Iterator[Segment]:
+    # Decompose a bitvector term into a sequence of constants and slices, from
+    # most to least significant.
+    width = z3.Z3_get_bv_sort_size(CTX, z3.Z3_get_sort(CTX, term))
+    if z3.Z3_is_numeral_ast(CTX, term):
+        yield Segment(width, int(z3.Z3_get_numeral_string(CTX, term)))
+        return
+    decl = z3.Z3_get_app_decl(CTX, term)
+    kind = z3.Z3_get_decl_kind(CTX, decl)
+    if kind == z3.Z3_OP_CONCAT:
+        for i in range(z3.Z3_get_app_num_args(CTX, term)):
+            yield from _segments(z3.Z3_get_app_arg(CTX, term, i))
+    elif kind == z3.Z3_OP_EXTRACT:
+        source = z3.Z3_get_app_arg(CTX, term, 0)
+        lo = z3.Z3_get_decl_int_parameter(CTX, decl, 1)
+        yield Segment(width, 0, source, z3.Z3_get_ast_id(CTX, source), lo)
+    else:
+        yield Segment(width, 0, term, z3.Z3_get_ast_id(CTX, term))
+
+
+def _assemble(segments: List[Segment]) -> Any:
+    term = None
+    for s in segments:
+        if s.key is None:
+            t = z3.Z3_mk_numeral(CTX, str(s.value), z3.Z3_mk_bv_sort(CTX, s.width))
+        elif s.lo == 0 and s.width == z3.Z3_get_bv_sort_size(
+            CTX, z3.Z3_get_sort(CTX, s.source)
+        ):
+            t = s.source
+        else:
+            t = z3.Z3_mk_extract(CTX, s.lo + s.width - 1, s.lo, s.source)
+        term = t if term is None else z3.Z3_mk_concat(CTX, term, t)
+    return term
+
+
 class Symbolic(abc.ABC):
     _sort: Any
-    __slots__ = ("_term",)
+    __slots__ = ("_term", "_shadow", "_info")
 
     @abc.abstractmethod
-    def __init__(self, term: Any, /) -> None:
+    def __init__(self, term: Any, shadow: int | None = None, /) -> None:
         self._term: Any = term
+        self._shadow: int | None = shadow
+        self._info: _util.TermInfo | None = None
 
     @classmethod
     def _from_expr(
@@ -57,8 +204,13 @@ class Symbolic(abc.ABC):
             *(s._term for s in syms),  # pyright: ignore[reportPrivateUsage]
         )
         term = z3.Z3_simplify(CTX, term)
+        _util.counters.terms[kind] += 1
         result = cls.__new__(cls)
-        Symbolic.__init__(result, term)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            shadow = ops.propagate(SHADOWS.get(kind), getattr(cls, "width", 0), *syms)
+            Symbolic.__init__(result, term, shadow)
         return result
 
     @classmethod
@@ -70,8 +222,13 @@ class Symbolic(abc.ABC):
         )
         term = kind(CTX, len(syms), args)
         term = z3.Z3_simplify(CTX, term)
+        _util.counters.terms[kind] += 1
         result = cls.__new__(cls)
-        Symbolic.__init__(result, term)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            shadow = ops.propagate(SHADOWS.get(kind), getattr(cls, "width", 0), *syms)
+            Symbolic.__init__(result, term, shadow)
         return result
 
     def __copy__(self) -> Self:
@@ -92,6 +249,61 @@ class Symbolic(abc.ABC):
     def __hash__(self) -> int:
         return z3.Z3_get_ast_hash(CTX, self._term)
 
+    def free_constants(self) -> FrozenSet[str]:
+        return self._analyze().constants
+
+    def dag_size(self) -> int:
+        return self._analyze().size
+
+    def depth(self) -> int:
+        return self._analyze().depth
+
+    def _analyze(self) -> _util.TermInfo:
+        if self._info is None:
+            self._info = _util.analyze(
+                self._term, lambda t: z3.Z3_get_ast_id(CTX, t), _children, _name
+            )
+        return self._info
+
+    def substitute(self, mapping: Mapping[str, Symbolic | Array[Any, Any]], /) -> Self:
+        return self.substitute_many((self,), mapping)[0]
+
+    @classmethod
+    def substitute_many(
+        cls, exprs: Iterable[S], mapping: Mapping[str, Symbolic | Array[Any, Any]], /
+    ) -> List[S]:
+        exprs = list(exprs)
+        src, dst = _substitution(mapping)
+        if not src or not exprs:
+            return exprs
+        n = len(src)
+        src_arr, dst_arr = (z3.Ast * n)(*src), (z3.Ast * n)(*dst)
+        if len(exprs) == 1:
+            terms = [z3.Z3_substitute(CTX, exprs[0]._term, n, src_arr, dst_arr)]
+        else:
+            # Z3 only shares rewrites within a single call to substitute, so
+            # wrap the expressions in an application of a dummy function.
+            m = len(exprs)
+            domain = (z3.Sort * m)(*(z3.Z3_get_sort(CTX, e._term) for e in exprs))
+            decl = z3.Z3_mk_func_decl(
+                CTX,
+                z3.Z3_mk_string_symbol(CTX, "substitute"),
+                m,
+                domain,
+                z3.Z3_mk_bool_sort(CTX),
+            )
+            args = (z3.Ast * m)(*(e._term for e in exprs))
+            app = z3.Z3_mk_app(CTX, decl, m, args)
+            app = z3.Z3_substitute(CTX, app, n, src_arr, dst_arr)
+            terms = [z3.Z3_get_app_arg(CTX, app, i) for i in range(m)]
+
+        results: List[S] = []
+        for e, term in zip(exprs, terms):
+            result = e.__new__(e.__class__)
+            Symbolic.__init__(result, z3.Z3_simplify(CTX, term))
+            results.append(result)
+        return results
+
 
 class Constraint(Symbolic):
     _sort: Final[Any] = z3.Z3_mk_bool_sort(CTX)
@@ -100,9 +312,13 @@ class Constraint(Symbolic):
     def __init__(self, value: bool | str, /):
         if isinstance(value, str):
             term = _mk_const(self, value)
+            shadow = _util.seeded(value)
+            if shadow is not None:
+                shadow &= 1
         else:
             term = z3.Z3_mk_true(CTX) if value else z3.Z3_mk_false(CTX)
-        Symbolic.__init__(self, term)
+            shadow = int(value)
+        Symbolic.__init__(self, term, shadow)
 
     def __invert__(self) -> Self:
         return self._from_expr(z3.Z3_mk_not, self)
@@ -116,12 +332,42 @@ class Constraint(Symbolic):
     def __xor__(self, other: Self, /) -> Self:
         return self._from_expr(z3.Z3_mk_xor, self, other)
 
+    @classmethod
+    def all(cls, constraints: Iterable[Constraint], /) -> Constraint:
+        return cls._reduce(z3.Z3_mk_and, constraints, True)
+
+    @classmethod
+    def any(cls, constraints: Iterable[Constraint], /) -> Constraint:
+        return cls._reduce(z3.Z3_mk_or, constraints, False)
+
+    @classmethod
+    def _reduce(
+        cls, kind: Callable[..., Any], constraints: Iterable[Constraint], unit: bool
+    ) -> Constraint:
+        # Drop duplicates and constants, then build a single n-ary term.
+        args: Dict[int, Constraint] = {}
+        for c in constraints:
+            if (r := c.reveal()) is None:
+                args.setdefault(z3.Z3_get_ast_id(CTX, c._term), c)
+            elif r != unit:
+                return Constraint(not unit)
+        if not args:
+            return Constraint(unit)
+        elif len(args) == 1:
+            return next(iter(args.values()))
+        return Constraint._from_expr_tuple(kind, *args.values())
+
     def __bool__(self) -> Never:
         raise TypeError("cannot use Constraint in a boolean context")
 
     def ite(self, then: Symbolic, else_: Symbolic, /) -> Symbolic:
         return then._from_expr(z3.Z3_mk_ite, self, then, else_)
 
+    def witness(self) -> bool | None:
+        if self._shadow is None:
+            return None
+        return bool(self._shadow)
+
     def reveal(self) -> bool | None:
         kind = z3.Z3_get_decl_kind(CTX, z3.Z3_get_app_decl(CTX, self._term))
         if kind == z3.Z3_OP_TRUE:
@@ -140,14 +386,87 @@ class BitVector(Symbolic, Generic[N], metaclass=BitVectorMeta):
     def __init__(self, value: int | str, /) -> None:
         if isinstance(value, str):
             term = _mk_const(self, value)
+            shadow = _util.seeded(value)
         else:
             term = z3.Z3_mk_numeral(CTX, str(value), self._sort)
-        Symbolic.__init__(self, term)
+            shadow = value
+        if shadow is not None:
+            shadow &= (1 << self.width) - 1
+        Symbolic.__init__(self, term, shadow)
 
     @classmethod
     def _make_sort(cls, width: int) -> Any:
         return z3.Z3_mk_bv_sort(CTX, width)
 
+    @classmethod
+    def of_width(cls, width: int, /) -> type[Self]:
+        return _util.of_width(cls, width)
+
+    @classmethod
+    def concat(cls, *parts: BitVector[Any]) -> Self:
+        if sum(p.width for p in parts) != cls.width:
+            raise ValueError(
+                f"cannot concatenate {', '.join(p.__class__.__name__ for p in parts)} "
+                f"into {cls.__name__}"
+            )
+        segments = _util.merge_segments(s for p in parts for s in _segments(p._term))
+        term = z3.Z3_simplify(CTX, _assemble(segments))
+        result = cls.__new__(cls)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            Symbolic.__init__(result, term, ops.propagate_concat(*parts))
+        return result
+
+    def extract(self, hi: int, lo: int, other: type[BitVector[M]], /) -> BitVector[M]:
+        if not 0 <= lo <= hi < self.width or hi - lo + 1 != other.width:
+            raise ValueError(
+                f"cannot extract bits {hi}:{lo} of {self.__class__.__name__} "
+                f"into {other.__name__}"
+            )
+        segments = _util.slice_segments(list(_segments(self._term)), lo, other.width)
+        term = z3.Z3_simplify(CTX, _assemble(_util.merge_segments(segments)))
+        result = other.__new__(other)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            shadow = ops.propagate_extract(self, lo, other.width)
+            Symbolic.__init__(result, term, shadow)
+        return result
+
+    @classmethod
+    def select(
+        cls, index: Uint[Any], table: Sequence[Self], default: Self | None = None, /
+    ) -> Self:
+        if default is None:
+            default = cls(0)
+        if (i := index.reveal()) is not None:
+            return table[i] if i < len(table) else default
+        table = table[: 1 << index.width]
+        if not table:
+            return default
+
+        one = z3.Z3_mk_numeral(CTX, "1", z3.Z3_mk_bv_sort(CTX, 1))
+        term = _util.mux(
+            [t._term for t in table],
+            lambda j: z3.Z3_mk_eq(CTX, z3.Z3_mk_extract(CTX, j, j, index._term), one),
+            lambda c, t, e: z3.Z3_mk_ite(CTX, c, t, e),
+            lambda t: z3.Z3_get_ast_id(CTX, t),
+        )
+        if len(table) < 1 << index.width:
+            limit = z3.Z3_mk_numeral(CTX, str(len(table)), index._sort)
+            guard = z3.Z3_mk_bvult(CTX, index._term, limit)
+            term = z3.Z3_mk_ite(CTX, guard, term, default._term)
+        term = z3.Z3_simplify(CTX, term)
+
+        result = cls.__new__(cls)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            shadow = ops.propagate_select(index, table, default)
+            Symbolic.__init__(result, term, shadow)
+        return result
+
     @abc.abstractmethod
     def __lt__(self, other: Self, /) -> Constraint: ...
 
@@ -214,8 +533,11 @@ class Uint(BitVector[N]):
         else:
             term = self._term
         term = z3.Z3_simplify(CTX, term)
+        shadow = self._shadow
+        if shadow is not None:
+            shadow &= (1 << other.width) - 1
         result = other.__new__(other)
-        Symbolic.__init__(result, term)
+        Symbolic.__init__(result, term, shadow)
         return result
 
     def reveal(self) -> int | None:
@@ -223,6 +545,9 @@ class Uint(BitVector[N]):
             return None
         return int(z3.Z3_get_numeral_string(CTX, self._term))
 
+    def witness(self) -> int | None:
+        return self._shadow
+
 
 class Int(BitVector[N]):
     __slots__ = ()
@@ -250,8 +575,11 @@ class Int(BitVector[N]):
         else:
             term = self._term
         term = z3.Z3_simplify(CTX, term)
+        shadow = self._shadow
+        if shadow is not None:
+            shadow = ops.signed(shadow, self.width) & ((1 << other.width) - 1)
         result = other.__new__(other)
-        Symbolic.__init__(result, term)
+        Symbolic.__init__(result, term, shadow)
         return result
 
     def reveal(self) -> int | None:
@@ -262,6 +590,11 @@ class Int(BitVector[N]):
             return r
         return r - (1 << self.width)
 
+    def witness(self) -> int | None:
+        if self._shadow is None:
+            return None
+        return ops.signed(self._shadow, self.width)
+
 
 K = TypeVar("K", bound=Union[Uint[Any], Int[Any]])
 V = TypeVar("V", bound=Union[Uint[Any], Int[Any]])
@@ -271,33 +604,62 @@ class Array(Generic[K, V], metaclass=ArrayMeta):
     _key: type[K]
     _value: type[V]
     _sort: Any
-    __slots__ = ("_term",)
+    __slots__ = ("_term", "_items", "_flat", "_shadow")
 
     def __init__(self, value: V | str, /) -> None:
+        global arrays_created
+        arrays_created = True
+        shadow = None
         if isinstance(value, str):
             term = _mk_const(self, value)
         else:
             self._sort  # for error message consistency
             term = z3.Z3_mk_const_array(CTX, self._key._sort, value._term)  # pyright: ignore[reportPrivateUsage]
+            if _util.current_seed is not None:
+                shadow = ops.propagate_array(value)
+        # Stores to concrete keys are kept in a dict, on top of the base term.
+        # They're flattened into a chain of stores only when necessary, and the
+        # result is cached until the next store.
         self._term = term
+        self._items: Dict[int, Tuple[K, V]] = {}
+        self._flat: Any = term
+        self._shadow: Tuple[int, Dict[int, int]] | None = shadow
 
     @classmethod
     def _make_sort(cls, key: K, value: V) -> Any:
         return z3.Z3_mk_array_sort(CTX, key._sort, value._sort)  # pyright: ignore[reportPrivateUsage]
 
+    def _flatten(self) -> Any:
+        if self._flat is None:
+            term = self._term
+            for key, value in self._items.values():
+                term = z3.Z3_mk_store(
+                    CTX,
+                    term,
+                    key._term,  # pyright: ignore[reportPrivateUsage]
+                    value._term,  # pyright: ignore[reportPrivateUsage]
+                )
+            self._flat = z3.Z3_simplify(CTX, term)
+        return self._flat
+
     def __copy__(self) -> Self:
         result = self.__new__(self.__class__)
         result._term = self._term
+        result._items = self._items.copy()
+        result._flat = self._flat
+        if (shadow := self._shadow) is not None:
+            shadow = (shadow[0], shadow[1].copy())
+        result._shadow = shadow
         return result
 
     def __deepcopy__(self, memo: Any, /) -> Self:
         return self.__copy__()
 
     def __repr__(self) -> str:
-        render = self._term
-        decl = z3.Z3_get_app_decl(CTX, self._term)
+        render = self._flatten()
+        decl = z3.Z3_get_app_decl(CTX, render)
         if z3.Z3_get_decl_kind(CTX, decl) == z3.Z3_OP_CONST_ARRAY:
-            render = z3.Z3_get_app_arg(CTX, self._term, 0)
+            render = z3.Z3_get_app_arg(CTX, render, 0)
         return f"{self.__class__.__name__}(`{z3.Z3_ast_to_string(CTX, render)}`)"
 
     def __eq__(self, other: Never, /) -> Never:
@@ -307,32 +669,112 @@ class Array(Generic[K, V], metaclass=ArrayMeta):
         raise TypeError("arrays cannot be compared for equality.")
 
     def __getitem__(self, key: K) -> V:
-        return self._value._from_expr(  # pyright: ignore[reportPrivateUsage]
-            z3.Z3_mk_select, self, key
+        if (k := key.reveal()) is None:
+            base = self._flatten()
+        elif k in self._items:
+            return self._items[k][1]
+        else:
+            # Skip over stores to other concrete keys, which can't alias.
+            base = self._term
+        term = z3.Z3_simplify(
+            CTX,
+            z3.Z3_mk_select(CTX, base, key._term),  # pyright: ignore[reportPrivateUsage]
         )
+        result = self._value.__new__(self._value)
+        if _util.current_seed is None:
+            Symbolic.__init__(result, term)
+        else:
+            Symbolic.__init__(result, term, ops.propagate_load(self, key))
+        return result
 
     def __setitem__(self, key: K, value: V) -> None:
+        self._shadow = ops.propagate_store(self, key, value)
+        if (k := key.reveal()) is not None:
+            # Overwrites any earlier store to the same key.
+            self._items[k] = (key, value)
+            self._flat = None
+            return
         self._term = z3.Z3_simplify(
             CTX,
             z3.Z3_mk_store(
                 CTX,
-                self._term,
+                self._flatten(),
                 key._term,  # pyright: ignore[reportPrivateUsage]
                 value._term,  # pyright: ignore[reportPrivateUsage]
             ),
         )
+        self._items = {}
+        self._flat = self._term
 
 
-class Solver:
-    __slots__ = ("_solver", "_model")
+# Whether any arrays have been created. Until then, solvers without a `logic`
+# option are specialized for QF_BV. See `Solver._upgrade()`.
+arrays_created = False
+
+TACTICS: Dict[str, Any] = {}
+
+
+def _mk_solver(logic: str) -> Any:
+    try:
+        return z3.Z3_mk_solver_for_logic(CTX, z3.Z3_mk_string_symbol(CTX, logic))
+    except z3.Z3Exception:
+        raise ValueError(f"unknown logic: {logic}") from None
+
 
-    def __init__(self) -> None:
-        self._solver = z3.Z3_mk_solver(CTX)
+def _mk_tactic(pipeline: str) -> Any:
+    # Tactics are cached and never freed, since there are only ever a few.
+    if (tactic := TACTICS.get(pipeline)) is not None:
+        return tactic
+    for name in pipeline.split(";"):
+        try:
+            t = z3.Z3_mk_tactic(CTX, name.strip())
+        except z3.Z3Exception:
+            raise ValueError(f"unknown tactic: {name.strip()}") from None
+        tactic = t if tactic is None else z3.Z3_tactic_and_then(CTX, tactic, t)
+        z3.Z3_tactic_inc_ref(CTX, tactic)
+    TACTICS[pipeline] = tactic
+    return tactic
+
+
+class Solver:
+    __slots__ = (
+        "_solver",
+        "_logic",
+        "_auto",
+        "_scopes",
+        "_tactic",
+        "_model",
+        "_failed",
+    )
+
+    def __init__(self, options: Options | None = None) -> None:
+        # Bitwuzla's options are ignored.
+        options = options or {}
+        _util.check_options(options)
+        # Unless a logic is given, it's chosen automatically: QF_BV, or QF_ABV
+        # once arrays are in use.
+        self._auto = "logic" not in options
+        self._logic = options.get("logic", "QF_ABV" if arrays_created else "QF_BV")
+        self._solver = _mk_solver(self._logic)
         z3.Z3_solver_inc_ref(CTX, self._solver)
+        # The number of assertions at each scope pushed by `iter_models()`.
+        self._scopes: List[int] = []
+        # A non-incremental solver, tried before `_solver` on checks without
+        # assumptions. Both receive every assertion.
+        self._tactic = None
+        if (pipeline := options.get("tactic")) is not None:
+            self._tactic = z3.Z3_mk_solver_from_tactic(CTX, _mk_tactic(pipeline))
+            z3.Z3_solver_inc_ref(CTX, self._tactic)
         self._model = None
+        # The assumptions passed to the last check, if it was unsatisfiable.
+        self._failed: Tuple[Constraint, ...] | None = None
 
     def __del__(self) -> None:
-        z3.Z3_solver_dec_ref(CTX, self._solver)
+        # The solvers are missing if the options were invalid.
+        if (solver := getattr(self, "_solver", None)) is not None:
+            z3.Z3_solver_dec_ref(CTX, solver)
+        if (tactic := getattr(self, "_tactic", None)) is not None:
+            z3.Z3_solver_dec_ref(CTX, tactic)
 
     def _set_model(self, model: Any) -> None:
         if self._model is not None:
@@ -343,29 +785,213 @@ class Solver:
 
     def add(self, assertion: Constraint, /) -> None:
         z3.Z3_solver_assert(CTX, self._solver, assertion._term)  # pyright: ignore[reportPrivateUsage]
+        if self._tactic is not None:
+            z3.Z3_solver_assert(CTX, self._tactic, assertion._term)  # pyright: ignore[reportPrivateUsage]
         self._set_model(None)
+        self._failed = None
+
+    def _upgrade(self) -> None:
+        # The QF_BV solver treats array operations as uninterpreted functions,
+        # so it gives wrong answers once arrays are used. Replace it with a
+        # QF_ABV solver with the same assertions, in the same scopes.
+        solver = _mk_solver("QF_ABV")
+        z3.Z3_solver_inc_ref(CTX, solver)
+        assertions = z3.Z3_solver_get_assertions(CTX, self._solver)
+        z3.Z3_ast_vector_inc_ref(CTX, assertions)
+        try:
+            scopes = iter(self._scopes)
+            boundary = next(scopes, None)
+            for i in range(z3.Z3_ast_vector_size(CTX, assertions)):
+                while boundary == i:
+                    z3.Z3_solver_push(CTX, solver)
+                    boundary = next(scopes, None)
+                term = z3.Z3_ast_vector_get(CTX, assertions, i)
+                z3.Z3_solver_assert(CTX, solver, term)
+            while boundary is not None:
+                z3.Z3_solver_push(CTX, solver)
+                boundary = next(scopes, None)
+        finally:
+            z3.Z3_ast_vector_dec_ref(CTX, assertions)
+        z3.Z3_solver_dec_ref(CTX, self._solver)
+        self._solver, self._logic, self._auto = solver, "QF_ABV", False
 
-    def check(self, *assumptions: Constraint) -> bool:
+    def check(self, *assumptions: Constraint, options: Options | None = None) -> bool:
+        _util.check_options(options or {}, per_check=True)
+        if self._auto and arrays_created:
+            self._upgrade()
         self._set_model(None)
-        arr = (z3.Ast * len(assumptions))(
-            *(a._term for a in assumptions)  # pyright: ignore[reportPrivateUsage]
-        )
-        r = z3.Z3_solver_check_assumptions(CTX, self._solver, len(assumptions), arr)
+        self._failed = None
+        start = time.perf_counter()
+        solver, r = self._tactic, z3.Z3_L_UNDEF
+        if solver is not None and not assumptions:
+            r = z3.Z3_solver_check(CTX, solver)
+        if r == z3.Z3_L_UNDEF:
+            # The tactic doesn't track assumptions, or gave up on the query.
+            solver = self._solver
+            arr = (z3.Ast * len(assumptions))(
+                *(a._term for a in assumptions)  # pyright: ignore[reportPrivateUsage]
+            )
+            r = z3.Z3_solver_check_assumptions(CTX, solver, len(assumptions), arr)
+        elapsed = _util.counters.check(OUTCOMES[r], start)
+        if _util.counters.scopes or elapsed > _util.counters.threshold:
+            self._report(solver, OUTCOMES[r], elapsed, assumptions)
         if r == z3.Z3_L_TRUE:
-            self._set_model(z3.Z3_solver_get_model(CTX, self._solver))
+            self._set_model(z3.Z3_solver_get_model(CTX, solver))
             return True
         elif r == z3.Z3_L_FALSE:
+            self._failed = assumptions
             return False
         else:
             reason = z3.Z3_solver_get_reason_unknown(CTX, self._solver)
             raise RuntimeError(f"Z3 could not solve this instance: {reason}")
 
-    def evaluate(self, bv: BitVector[N], /) -> int:
-        if self._model is None:
-            raise ValueError("solver is not ready for model evaluation.")
+    def _report(
+        self,
+        solver: Any,
+        outcome: str,
+        elapsed: float,
+        assumptions: Tuple[Constraint, ...],
+    ) -> None:
+        # Pass the statistics of the solver that answered the last check to
+        # `zbitvector.stats`, and capture the query if it was slow.
+        stats = z3.Z3_solver_get_statistics(CTX, solver)
+        z3.Z3_stats_inc_ref(CTX, stats)
+        try:
+            native: Dict[str, float] = {}
+            for i in range(z3.Z3_stats_size(CTX, stats)):
+                key = z3.Z3_stats_get_key(CTX, stats, i)
+                if z3.Z3_stats_is_uint(CTX, stats, i):
+                    native[key] = z3.Z3_stats_get_uint_value(CTX, stats, i)
+                else:
+                    native[key] = z3.Z3_stats_get_double_value(CTX, stats, i)
+        finally:
+            z3.Z3_stats_dec_ref(CTX, stats)
+        if _util.counters.scopes:
+            _util.counters.collect(native)
+        if elapsed > _util.counters.threshold:
+            query = functools.partial(self._smtlib, assumptions)
+            _util.counters.capture(query, elapsed, outcome, native)
+
+    def _smtlib(self, assumptions: Tuple[Constraint, ...]) -> str:
+        assertions = z3.Z3_solver_get_assertions(CTX, self._solver)
+        z3.Z3_ast_vector_inc_ref(CTX, assertions)
+        try:
+            n = z3.Z3_ast_vector_size(CTX, assertions)
+            terms = [z3.Z3_ast_vector_get(CTX, assertions, i) for i in range(n)]
+            terms.extend(a._term for a in assumptions)  # pyright: ignore[reportPrivateUsage]
+            arr = (z3.Ast * len(terms))(*terms)
+            true = z3.Z3_mk_true(CTX)
+            return z3.Z3_benchmark_to_smtlib_string(
+                CTX, "", self._logic, "unknown", "", len(terms), arr, true
+            )
+        finally:
+            z3.Z3_ast_vector_dec_ref(CTX, assertions)
+
+    def failed_assumptions(self) -> List[Constraint]:
+        if self._failed is None:
+            raise ValueError("solver is not ready for unsat core extraction.")
+        core = z3.Z3_solver_get_unsat_core(CTX, self._solver)
+        z3.Z3_ast_vector_inc_ref(CTX, core)
+        try:
+            ids = {
+                z3.Z3_get_ast_id(CTX, z3.Z3_ast_vector_get(CTX, core, i))
+                for i in range(z3.Z3_ast_vector_size(CTX, core))
+            }
+        finally:
+            z3.Z3_ast_vector_dec_ref(CTX, core)
+        return [
+            c
+            for c in self._failed
+            if z3.Z3_get_ast_id(CTX, c._term) in ids  # pyright: ignore[reportPrivateUsage]
+        ]
+
+    def minimize(self, expr: BitVector[N], /) -> int | None:
+        return _util.optimize(self, expr, isinstance(expr, Int), False)
+
+    def maximize(self, expr: BitVector[N], /) -> int | None:
+        return _util.optimize(self, expr, isinstance(expr, Int), True)
+
+    def iter_models(
+        self,
+        terms: Sequence[BitVector[Any]],
+        /,
+        limit: int | None = None,
+        seed: int | None = None,
+    ) -> Generator[Tuple[int, ...]]:
+        # Blocking constraints go in their own scope, so the solver can keep
+        # what it has learned between checks and discard them all at the end.
+        solvers = (
+            [self._solver] if self._tactic is None else [self._solver, self._tactic]
+        )
+        assertions = z3.Z3_solver_get_assertions(CTX, self._solver)
+        z3.Z3_ast_vector_inc_ref(CTX, assertions)
+        self._scopes.append(z3.Z3_ast_vector_size(CTX, assertions))
+        z3.Z3_ast_vector_dec_ref(CTX, assertions)
+        for solver in solvers:
+            z3.Z3_solver_push(CTX, solver)
+        try:
+            yield from _util.iter_models(self, terms, limit, seed)
+        finally:
+            # The solver may have been upgraded during iteration.
+            solvers[0] = self._solver
+            for solver in solvers:
+                z3.Z3_solver_pop(CTX, solver, 1)
+            self._scopes.pop()
+
+    def _eval(self, term: Any, cls: type[BitVector[N]]) -> int:
         t = (z3.Ast * 1)()
-        assert z3.Z3_model_eval(CTX, self._model, bv._term, True, t)  # pyright: ignore[reportPrivateUsage]
+        assert z3.Z3_model_eval(CTX, self._model, term, True, t)
         r = int(z3.Z3_get_numeral_string(CTX, t[0]))
-        if isinstance(bv, Uint) or (r & (1 << (bv.width - 1)) == 0):
+        if issubclass(cls, Uint) or (r & (1 << (cls.width - 1)) == 0):
             return r
-        return r - (1 << bv.width)
+        return r - (1 << cls.width)
+
+    def _eval_array(self, arr: Array[K, V]) -> DefaultDict[int, int]:
+        t = (z3.Ast * 1)()
+        assert z3.Z3_model_eval(CTX, self._model, arr._flatten(), True, t)  # pyright: ignore[reportPrivateUsage]
+        term = t[0]
+        entries: Dict[int, int] = {}
+        k, v = arr._key, arr._value  # pyright: ignore[reportPrivateUsage]
+
+        # Z3 represents array values either as a chain of stores over a constant
+        # array, or as a reference to a function in the model. Outer stores take
+        # precedence.
+        while not z3.Z3_is_as_array(CTX, term):
+            decl = z3.Z3_get_decl_kind(CTX, z3.Z3_get_app_decl(CTX, term))
+            if decl == z3.Z3_OP_CONST_ARRAY:
+                default = self._eval(z3.Z3_get_app_arg(CTX, term, 0), v)
+                return defaultdict(lambda: default, entries)
+            elif decl != z3.Z3_OP_STORE:
+                raise RuntimeError(
+                    f"unexpected array value: {z3.Z3_ast_to_string(CTX, term)}"
+                )
+            key = self._eval(z3.Z3_get_app_arg(CTX, term, 1), k)
+            if key not in entries:
+                entries[key] = self._eval(z3.Z3_get_app_arg(CTX, term, 2), v)
+            term = z3.Z3_get_app_arg(CTX, term, 0)
+
+        fn = z3.Z3_get_as_array_func_decl(CTX, term)
+        interp = z3.Z3_model_get_func_interp(CTX, self._model, fn)
+        z3.Z3_func_interp_inc_ref(CTX, interp)
+        try:
+            for i in range(z3.Z3_func_interp_get_num_entries(CTX, interp)):
+                entry = z3.Z3_func_interp_get_entry(CTX, interp, i)
+                z3.Z3_func_entry_inc_ref(CTX, entry)
+                key = self._eval(z3.Z3_func_entry_get_arg(CTX, entry, 0), k)
+                if key not in entries:
+                    value = z3.Z3_func_entry_get_value(CTX, entry)
+                    entries[key] = self._eval(value, v)
+                z3.Z3_func_entry_dec_ref(CTX, entry)
+            default = self._eval(z3.Z3_func_interp_get_else(CTX, interp), v)
+        finally:
+            z3.Z3_func_interp_dec_ref(CTX, interp)
+        return defaultdict(lambda: default, entries)
+
+    def evaluate(
+        self, bv: BitVector[N] | Array[K, V], /
+    ) -> int | DefaultDict[int, int]:
+        if self._model is None:
+            raise ValueError("solver is not ready for model evaluation.")
+        if isinstance(bv, Array):
+            return self._eval_array(bv)
+        return self._eval(bv._term, bv.__class__)  # pyright: ignore[reportPrivateUsage]
@@ -5,12 +5,16 @@ from typing import Any, Dict, Literal
 import pytest
 from typing_extensions import TypeAlias
 
-from . import Array, Constraint, Int, Solver, Uint
+from . import Array, Constraint, Int, Memory, Solver, Symbolic, Uint, concolic
 
 Uint8: TypeAlias = Uint[Literal[8]]
+Uint16: TypeAlias = Uint[Literal[16]]
+Uint32: TypeAlias = Uint[Literal[32]]
 Uint64: TypeAlias = Uint[Literal[64]]
 
 Int8: TypeAlias = Int[Literal[8]]
+Int16: TypeAlias = Int[Literal[16]]
+Int32: TypeAlias = Int[Literal[32]]
 Int64: TypeAlias = Int[Literal[64]]
 
 # Don't check  _z3.py for doctests: it doesn't have any, and importing the
@@ -25,9 +29,14 @@ def setup_doctest(doctest_namespace: Dict[str, Any]) -> None:
             "Array": Array,
             "Solver": Solver,
             "Constraint": Constraint,
+            "Memory": Memory,
+            "Symbolic": Symbolic,
             "Uint8": Uint8,
+            "Uint16": Uint16,
+            "Uint32": Uint32,
             "Uint64": Uint64,
             "Int8": Int8,
             "Int64": Int64,
+            "concolic": concolic,
         }
     )
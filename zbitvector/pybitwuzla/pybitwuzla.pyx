@@ -24,6 +24,23 @@ from collections import defaultdict
 import math, os, sys
 import tempfile
 
+# open_memstream() is POSIX-only, and macOS only has it since 10.13. Elsewhere,
+# _open_memstream() returns NULL and callers fall back to a temporary file.
+cdef extern from *:
+    """
+    #include <stdio.h>
+    #if defined(__APPLE__)
+    #include <AvailabilityMacros.h>
+    #endif
+    #if defined(__linux__) || (defined(__APPLE__) && \\
+        MAC_OS_X_VERSION_MIN_REQUIRED >= 101300)
+    #define _open_memstream(ptr, sizeloc) open_memstream(ptr, sizeloc)
+    #else
+    #define _open_memstream(ptr, sizeloc) ((FILE *) NULL)
+    #endif
+    """
+    FILE *_open_memstream(char **ptr, size_t *sizeloc)
+
 include "pybitwuzla_enums.pxd"
 
 class BitwuzlaException(Exception):
@@ -263,12 +280,24 @@ cdef class BitwuzlaTerm:
            :return: String representation of the term in format ``fmt``.
            :rtype: str
         """
-        cdef FILE * out
-        with tempfile.NamedTemporaryFile('r') as f:
-            out = fopen(_to_cstr(f.name), 'w')
-            bitwuzla_api.bitwuzla_term_dump(self.ptr(), _to_cstr(fmt), out)
+        cdef bytes c_fmt = fmt.encode()
+        cdef char * buf = NULL
+        cdef size_t size = 0
+        cdef FILE * out = _open_memstream(&buf, &size)
+        if out is NULL:
+            with tempfile.NamedTemporaryFile('r') as f:
+                out = fopen(_to_cstr(f.name), 'w')
+                bitwuzla_api.bitwuzla_term_dump(self.ptr(), c_fmt, out)
+                fclose(out)
+                return f.read().strip()
+        try:
+            bitwuzla_api.bitwuzla_term_dump(self.ptr(), c_fmt, out)
+        finally:
             fclose(out)
-            return f.read().strip()
+        try:
+            return buf[:size].decode().strip()
+        finally:
+            free(buf)
 
     def get_children(self):
         """:return: The children of the term.
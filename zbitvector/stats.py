@@ -0,0 +1,237 @@
+"""
+Counters for term construction and solver checks.
+
+Statistics are always collected, at the cost of a dictionary update per term
+and a clock read per check. Native solver statistics are more expensive to
+read, and are only collected inside a :func:`scope` that asks for them.
+
+Checks that exceed a time limit can also be captured as SMT-LIB queries, with
+:func:`capture_slow_queries`.
+
+>>> from zbitvector import stats
+>>> with stats.scope() as s:
+...     x = Uint8("STX") + Uint8(1)
+...     Solver().check(x == Uint8(2))
+True
+>>> s.result.constants, sum(s.result.checks.values())
+(1, 1)
+"""
+
+from __future__ import annotations
+
+import contextlib
+import math
+import os
+import time
+from typing import Callable, Dict, Generator, Mapping, NamedTuple, TypeVar, Union
+
+from . import _util
+
+__all__ = (
+    "Scope",
+    "SlowQuery",
+    "Snapshot",
+    "capture_slow_queries",
+    "reset",
+    "scope",
+    "snapshot",
+)
+
+V = TypeVar("V", int, float)
+
+
+class Snapshot(NamedTuple):
+    """
+    Running totals at a point in time, or the difference between two snapshots.
+
+    Term counts are keyed by the name of the operation, which depends on the
+    backend. Check counts are keyed by outcome: "sat", "unsat" or "unknown".
+    Native statistics are summed across checks.
+    """
+
+    terms: Mapping[str, int]
+    constants: int
+    checks: Mapping[str, int]
+    check_time: float
+    native: Mapping[str, float]
+
+    def __sub__(self, other: Snapshot, /) -> Snapshot:
+        """Return the change in each total since the `other` snapshot."""
+        return Snapshot(
+            _diff(self.terms, other.terms),
+            self.constants - other.constants,
+            {k: v - other.checks.get(k, 0) for k, v in self.checks.items()},
+            self.check_time - other.check_time,
+            _diff(self.native, other.native),
+        )
+
+    def flatten(self) -> Dict[str, float]:
+        """
+        Flatten the snapshot into a single dictionary of metrics, with dotted
+        names like "terms.bvadd" and "checks.sat".
+        """
+        result: Dict[str, float] = {}
+        result.update((f"terms.{k}", v) for k, v in self.terms.items())
+        result["constants"] = self.constants
+        result.update((f"checks.{k}", v) for k, v in self.checks.items())
+        result["check_time"] = self.check_time
+        result.update((f"native.{k}", v) for k, v in self.native.items())
+        return result
+
+
+def _diff(a: Mapping[str, V], b: Mapping[str, V]) -> Dict[str, V]:
+    result: Dict[str, V] = {}
+    for k, v in a.items():
+        if d := v - b.get(k, 0):
+            result[k] = d
+    return result
+
+
+def _name(kind: object) -> str:
+    # Reference ops and Bitwuzla kinds have a `name`; Z3 operations are
+    # functions in the C API, like `Z3_mk_bvadd`.
+    name = getattr(kind, "name", None)
+    if isinstance(name, str):
+        return name.lower()
+    name = getattr(kind, "__name__", str(kind))
+    return name[len("Z3_mk_") :] if name.startswith("Z3_mk_") else name
+
+
+def snapshot() -> Snapshot:
+    """Return the running totals since the process started or the last reset."""
+    c = _util.counters
+    terms: Dict[str, int] = {}
+    for kind, n in c.terms.items():
+        name = _name(kind)
+        terms[name] = terms.get(name, 0) + n
+    return Snapshot(terms, c.constants, dict(c.checks), c.check_time, dict(c.native))
+
+
+def reset() -> None:
+    """Reset the running totals to zero."""
+    c = _util.counters
+    c.terms.clear()
+    c.constants = 0
+    c.checks = dict.fromkeys(c.checks, 0)
+    c.check_time = 0.0
+    c.native.clear()
+
+
+class Scope:
+    """
+    Statistics collected within a :func:`scope`. The :attr:`result` is
+    available once the scope exits.
+    """
+
+    __slots__ = ("start", "result")
+
+    def __init__(self, start: Snapshot) -> None:
+        """Start a scope at the `start` snapshot. Use :func:`scope` instead."""
+        self.start = start
+        self.result: Snapshot | None = None
+
+
+@contextlib.contextmanager
+def scope(native: bool = False) -> Generator[Scope]:
+    """
+    Measure the statistics of a block of code. Scopes may be nested.
+
+    If `native` is set, also collect the solver's own statistics (such as the
+    number of conflicts) after each check in the block. This is supported by
+    the Z3 backend.
+    """
+    c = _util.counters
+    result = Scope(snapshot())
+    c.scopes += native
+    try:
+        yield result
+    finally:
+        c.scopes -= native
+        result.result = snapshot() - result.start
+
+
+class SlowQuery(NamedTuple):
+    """
+    A check that took longer than the threshold set with
+    :func:`capture_slow_queries`.
+
+    The `smtlib` script asserts both the solver's assertions and the check's
+    assumptions. The `elapsed` time is in seconds, and `native` holds the
+    solver's own statistics for the check, if available. The `path` is the
+    file the query was written to, if any.
+    """
+
+    smtlib: str
+    elapsed: float
+    outcome: str
+    native: Mapping[str, float]
+    path: str | None
+
+
+def capture_slow_queries(
+    threshold: float | None,
+    /,
+    directory: Union[str, os.PathLike[str], None] = None,
+    callback: Callable[[SlowQuery], None] | None = None,
+    keep: int = 100,
+) -> None:
+    """
+    Capture every check that takes longer than `threshold` seconds. Pass
+    `None` to stop capturing.
+
+    If `directory` is set, each slow query is written to a new ``.smt2`` file
+    in it, with its timing and statistics in a comment at the top. Only the
+    `keep` most recent files are kept. If `callback` is set, it's called with
+    each :class:`SlowQuery`.
+
+    The query is only formatted when a check is slow, so capturing costs
+    nothing otherwise.
+
+    >>> found = []
+    >>> capture_slow_queries(0.0, callback=found.append)
+    >>> Solver().check(Uint8("SQ") == Uint8(1))
+    True
+    >>> capture_slow_queries(None)
+    >>> found[0].outcome, "SQ" in found[0].smtlib
+    ('sat', True)
+    """
+    c = _util.counters
+    if threshold is None:
+        c.threshold, c.slow = math.inf, None
+        return
+    elif keep < 1:
+        raise ValueError("keep must be at least 1")
+
+    def slow(
+        query: Callable[[], str],
+        elapsed: float,
+        outcome: str,
+        native: Mapping[str, float],
+    ) -> None:
+        smtlib, path = query(), None
+        if directory is not None:
+            header = [f"; elapsed: {elapsed:.6f}s", f"; outcome: {outcome}"]
+            header.extend(f"; {k}: {v}" for k, v in sorted(native.items()))
+            path = _write(os.fspath(directory), keep, "\n".join(header) + "\n" + smtlib)
+        if callback is not None:
+            callback(SlowQuery(smtlib, elapsed, outcome, native, path))
+
+    c.threshold, c.slow = threshold, slow
+
+
+def _write(directory: str, keep: int, text: str) -> str:
+    # Files are named by creation time, so the oldest sort first.
+    os.makedirs(directory, exist_ok=True)
+    name = f"query-{time.time_ns()}-{os.getpid()}.smt2"
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write(text)
+    files = sorted(
+        f
+        for f in os.listdir(directory)
+        if f.startswith("query-") and f.endswith(".smt2")
+    )
+    for f in files[:-keep]:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(directory, f))
+    return path
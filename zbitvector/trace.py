@@ -0,0 +1,427 @@
+"""
+Record the calls a program makes to zbitvector, and replay them later.
+
+A trace logs each call to the public classes -- constructors, operators and
+solver methods -- along with its arguments, with every expression, array and
+solver replaced by an integer identity. Replaying the trace re-executes the
+same calls against whichever backend is selected by ``ZBITVECTOR_SOLVER``, so
+backends can be compared on a real workload without rerunning the program
+that produced it::
+
+    $ ZBITVECTOR_SOLVER=z3 python -m zbitvector.trace app.trace
+    $ ZBITVECTOR_SOLVER=bitwuzla python -m zbitvector.trace app.trace
+
+Only calls made directly by the program are recorded; calls that zbitvector
+makes internally (such as :class:`Memory` building on :class:`Array`) are
+recorded as the public calls they make. Calls that raise are not recorded,
+nor are :meth:`Constraint.__bool__` and :meth:`~Uint.witness`, which depend on
+concolic state that isn't part of the trace.
+
+>>> import os, tempfile
+>>> from zbitvector import trace
+>>> path = os.path.join(tempfile.mkdtemp(), "example.trace")
+>>> with trace.record(path):
+...     x = Uint8("TRX") + Uint8(1)
+...     Solver().check(x == Uint8(2))
+True
+>>> trace.replay(path).calls
+7
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import functools
+import inspect
+import itertools
+import marshal
+import os
+import sys
+import time
+from types import GeneratorType
+from typing import (
+    IO,
+    AbstractSet,
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Literal,
+    NamedTuple,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
+
+from . import (
+    Array,
+    BitVector,
+    Constraint,
+    Int,
+    Solver,
+    Symbolic,
+    Uint,
+    _abstract,  # pyright: ignore[reportPrivateUsage]
+)
+
+__all__ = ("Replay", "record", "replay")
+
+# The first record in every trace.
+HEADER = ("zbitvector-trace", 1)
+
+# Encoded values are tagged tuples, so that they can't be confused with the
+# plain ints, strings and bools that are stored as-is.
+REF, CLASS, LIST, TUPLE, DICT = range(5)
+
+# The objects that are assigned identities in a trace.
+OBJECTS: Tuple[Any, ...] = (Symbolic, Array, Solver)
+
+# Methods that only depend on concolic state, or that have no effect.
+SKIP = frozenset(("__hash__", "__repr__", "__bool__", "witness"))
+
+CLASSES: Tuple[Any, ...] = (Symbolic, Constraint, BitVector, Uint, Int, Array, Solver)
+
+
+def _api(cls: Any) -> List[str]:
+    # Every public method declared in the abstract interface, wherever the
+    # backend happens to define it.
+    members = cast("Dict[str, Any]", vars(cls))
+    names: List[str] = []
+    for c in CLASSES:
+        declared = cast("Dict[str, Any]", vars(getattr(_abstract, c.__name__)))
+        for name in declared:
+            public = not name.startswith("_") or (
+                name.startswith("__") and name.endswith("__")
+            )
+            if public and name not in SKIP and name in members:
+                # Classmethods aren't callable, but wrap a function that is.
+                if callable(members[name]) or hasattr(members[name], "__func__"):
+                    names.append(name)
+    if cls is Symbolic and "__init__" in names:
+        # Symbolic.__init__ takes a backend term; it's only called internally.
+        names.remove("__init__")
+    return sorted(set(names))
+
+
+class _Recorder:
+    __slots__ = ("file", "ids", "next", "depth")
+
+    def __init__(self, file: IO[bytes]) -> None:
+        self.file = file
+        # Objects are identified by `id()`, which is reused once an object is
+        # freed. Every object returned by a recorded call gets a new identity,
+        # so a reused id never refers to an older object, and the recorder
+        # doesn't need to keep anything alive.
+        self.ids: Dict[int, int] = {}
+        self.next = 0
+        # The number of recorded calls in progress. Calls made while another
+        # call is in progress are internal, and aren't recorded.
+        self.depth = 0
+
+    def ref(self, obj: object, new: bool = False) -> Tuple[int, int]:
+        n = None if new else self.ids.get(id(obj))
+        if n is None:
+            n = self.ids[id(obj)] = self.next
+            self.next += 1
+        return (REF, n)
+
+    def encode(self, value: Any) -> Any:
+        if isinstance(value, OBJECTS):
+            # An object that wasn't returned by a recorded call gets an
+            # identity that replay can't resolve.
+            return self.ref(value)
+        elif isinstance(value, type):
+            return (CLASS, *_spec(value))
+        elif isinstance(value, list):
+            return (LIST, [self.encode(v) for v in value])  # pyright: ignore[reportUnknownVariableType]
+        elif isinstance(value, tuple):
+            return (TUPLE, tuple(self.encode(v) for v in value))  # pyright: ignore[reportUnknownVariableType]
+        elif isinstance(value, dict):
+            return (DICT, {self.encode(k): self.encode(v) for k, v in value.items()})  # pyright: ignore[reportUnknownVariableType]
+        elif value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        raise TypeError(f"cannot record argument of type {type(value).__name__}")
+
+    def bind(self, value: Any) -> Any:
+        # Assign identities to the objects returned by a call.
+        if isinstance(value, OBJECTS):
+            return self.ref(value, new=True)
+        elif isinstance(value, (list, tuple)):
+            return (LIST, [self.bind(v) for v in value])  # pyright: ignore[reportUnknownVariableType]
+        return None
+
+    def write(
+        self,
+        result: Any,
+        receiver: Any,
+        name: str,
+        args: Sequence[Any],
+        kwargs: Dict[str, Any],
+        bind: bool = True,
+    ) -> None:
+        # The arguments are encoded before the result is bound, since a call
+        # may return one of its arguments.
+        receiver = self.encode(receiver)
+        args = tuple(self.encode(a) for a in args)
+        kwargs = {k: self.encode(v) for k, v in kwargs.items()}
+        if bind:
+            result = self.bind(result)
+        marshal.dump((result, receiver, name, args, kwargs), self.file)
+
+
+_recorder: _Recorder | None = None
+
+
+def _spec(cls: Any) -> Tuple[Any, ...]:
+    if issubclass(cls, cast(Any, Array)):
+        if hasattr(cls, "_key"):
+            k, v = cls._key, cls._value
+            return ("Array", _spec(k), _spec(v))
+        return ("Array",)
+    for base in cast("Tuple[Any, ...]", (Uint, Int)):
+        if issubclass(cls, base) and hasattr(cls, "width"):
+            return (base.__name__, cls.width)
+    return (cls.__name__,)
+
+
+def _materialize(value: Any) -> Any:
+    # Iterators are consumed by the call, so record (and pass on) their items.
+    if isinstance(value, (Iterator, AbstractSet)):
+        return tuple(cast("Iterator[Any]", value))
+    return value
+
+
+def _wrap(name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+    # The receiver, `self`, is the class when wrapping a classmethod.
+    if inspect.isgeneratorfunction(fn):
+
+        @functools.wraps(fn)
+        def generator(self: Any, *args: Any, **kwargs: Any) -> Any:
+            r = _recorder
+            if r is None or r.depth:
+                result: Any = yield from cast(
+                    "Generator[Any, Any, Any]", fn(self, *args, **kwargs)
+                )
+                return result
+            args = tuple(_materialize(a) for a in args)
+            gen = fn(self, *args, **kwargs)
+            count = 0
+            try:
+                while True:
+                    r.depth += 1
+                    try:
+                        item = next(gen)
+                    except StopIteration:
+                        break
+                    finally:
+                        r.depth -= 1
+                    count += 1
+                    yield item
+            finally:
+                r.depth += 1
+                try:
+                    gen.close()
+                finally:
+                    r.depth -= 1
+                # Recorded when closed, along with the number of items taken,
+                # unless the generator raised or the recording has ended.
+                if _recorder is r and sys.exc_info()[0] in (None, GeneratorExit):
+                    r.write(count, self, name, args, kwargs, bind=False)
+
+        return generator
+
+    @functools.wraps(fn)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        r = _recorder
+        if r is None or r.depth:
+            return fn(self, *args, **kwargs)
+        args = tuple(_materialize(a) for a in args)
+        r.depth += 1
+        try:
+            result = fn(self, *args, **kwargs)
+        finally:
+            r.depth -= 1
+        if name == "__init__":
+            r.write(self, type(self), name, args, kwargs)
+        else:
+            r.write(result, self, name, args, kwargs)
+        return result
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def record(path: Union[str, os.PathLike[str]], /) -> Generator[None]:
+    """
+    Record every call to zbitvector in the block to a trace file at `path`.
+
+    Objects created before the block can't be replayed, so the block should
+    cover all of the work to be measured. Recording doesn't keep objects
+    alive, so it can run alongside a long-lived program, but the trace file
+    grows with every call.
+    """
+    global _recorder
+    if _recorder is not None:
+        raise RuntimeError("already recording a trace.")
+
+    patched: List[Tuple[type, str, Any]] = []
+    with open(path, "wb") as f:
+        marshal.dump(HEADER, f)
+        _recorder = _Recorder(f)
+        try:
+            for cls in CLASSES:
+                for name in _api(cls):
+                    original = cast(Any, vars(cls)[name])
+                    func = getattr(original, "__func__", None)
+                    if func is not None:
+                        # A classmethod.
+                        setattr(cls, name, classmethod(_wrap(name, func)))
+                    else:
+                        setattr(cls, name, _wrap(name, original))
+                    patched.append((cls, name, original))
+            yield
+        finally:
+            for cls, name, original in reversed(patched):
+                setattr(cls, name, original)
+            _recorder = None
+
+
+class Replay(NamedTuple):
+    """
+    The cost of replaying a trace. Times are in seconds.
+
+    Calls to :class:`Solver` methods, other than its constructor, count
+    towards `solve_time`; all other calls count towards `construction_time`.
+    The `peak_memory` is the process's maximum resident set size in bytes, or
+    `None` on platforms that don't report it.
+    """
+
+    calls: int
+    construction_time: float
+    solve_time: float
+    peak_memory: int | None
+
+
+def _load(spec: Sequence[Any]) -> Any:
+    name, *params = spec
+    if name == "Array" and params:
+        return Array[_load(params[0]), _load(params[1])]
+    elif name in ("Uint", "Int") and params:
+        base: Any = Uint if name == "Uint" else Int
+        return base[Literal[params[0]]]
+    for cls in CLASSES:
+        if cls.__name__ == name:
+            return cls
+    raise ValueError(f"unknown class in trace: {name}")
+
+
+def _decode(objects: Dict[int, Any], value: Any) -> Any:
+    if not isinstance(value, tuple):
+        return value
+    tag, *rest = cast("Tuple[int, Any]", value)
+    if tag == REF:
+        try:
+            return objects[rest[0]]
+        except KeyError:
+            raise ValueError(
+                f"trace uses object #{rest[0]} before creating it; was it created before recording started?"
+            ) from None
+    elif tag == CLASS:
+        return _load(rest)
+    elif tag == LIST:
+        return [_decode(objects, v) for v in rest[0]]
+    elif tag == TUPLE:
+        return tuple(_decode(objects, v) for v in rest[0])
+    elif tag == DICT:
+        return {_decode(objects, k): _decode(objects, v) for k, v in rest[0].items()}
+    raise ValueError(f"unknown tag in trace: {tag}")
+
+
+def _rebind(objects: Dict[int, Any], encoded: Any, value: Any) -> None:
+    if not isinstance(encoded, tuple):
+        return
+    tag, rest = cast("Tuple[int, Any]", encoded)
+    if tag == REF:
+        objects[rest] = value
+    elif tag == LIST:
+        for e, v in zip(rest, value):
+            _rebind(objects, e, v)
+
+
+def _peak_memory() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def replay(path: Union[str, os.PathLike[str]], /) -> Replay:
+    """Re-execute the calls in the trace at `path` against the current backend."""
+    objects: Dict[int, Any] = {}
+    calls, construction, solve = 0, 0.0, 0.0
+    with open(path, "rb") as f:
+        try:
+            header = marshal.load(f)
+        except (EOFError, ValueError, TypeError):
+            header = None
+        if header != HEADER:
+            raise ValueError(f"not a zbitvector trace: {os.fspath(path)}")
+        while True:
+            try:
+                result, receiver, name, args, kwargs = marshal.load(f)
+            except EOFError:
+                break
+            target = _decode(objects, receiver)
+            args = [_decode(objects, a) for a in args]
+            kwargs = {k: _decode(objects, v) for k, v in kwargs.items()}
+
+            start = time.perf_counter()
+            if name == "__init__":
+                value = target(*args, **kwargs)
+            else:
+                value = getattr(target, name)(*args, **kwargs)
+                if isinstance(value, GeneratorType):
+                    # Take as many items as the program did, then close.
+                    for _ in itertools.islice(cast("Iterator[Any]", value), result):
+                        pass
+                    value.close()
+                    result = None
+            elapsed = time.perf_counter() - start
+
+            if isinstance(target, Solver):
+                solve += elapsed
+            else:
+                construction += elapsed
+            _rebind(objects, result, value)
+            calls += 1
+    return Replay(calls, construction, solve, _peak_memory())
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m zbitvector.trace",
+        description="Replay zbitvector traces against the backend selected by ZBITVECTOR_SOLVER.",
+    )
+    parser.add_argument(
+        "traces", nargs="+", help="trace files written by zbitvector.trace.record()"
+    )
+    options = parser.parse_args(argv)
+    solver = os.getenv("ZBITVECTOR_SOLVER", "bitwuzla").lower()
+    for path in options.traces:
+        r = replay(path)
+        memory = "n/a" if r.peak_memory is None else f"{r.peak_memory / 2**20:.1f} MiB"
+        print(
+            f"{path} [{solver}]: {r.calls} calls, construction {r.construction_time:.3f}s, "
+            f"solve {r.solve_time:.3f}s, peak memory {memory}"
+        )
+
+
+if __name__ == "__main__":
+    main()